@@ -3,7 +3,16 @@ from flask_migrate import Migrate
 
 from api.config import DevConfig
 from api.db.database import db
+from api.db.pool_metrics import attach_pool_metrics, use_metered_pool
+from api.db.repositories.flights_repository import init_flight_cache
 from api.routes.routes import Routes
+from api.utilities.ids import set_id_generator
+from api.utilities.metrics import Metrics
+from api.utilities.password_hashing import password_hasher
+from api.utilities.profiling import Profiling
+from api.utilities.query_counter import QueryBudget
+from api.utilities.seed import seed_command
+from api.utilities.tracing import Tracing
 
 migrate = Migrate()
 
@@ -11,13 +20,24 @@ migrate = Migrate()
 def create_app(config_class=DevConfig):
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_object(config_class)
+    set_id_generator(app.config["ID_GENERATOR"])
+    Profiling.init_app(app)
+    Tracing.init_app(app)
+    Metrics.init_app(app)
+    QueryBudget.init_app(app)
+    password_hasher.init_app(app)
+    init_flight_cache(app)
     Routes.register_blueprints(app)
+    use_metered_pool(app)
     db.init_app(app)
 
     with app.app_context():
-        db.create_all()
+        attach_pool_metrics(db.engines)
+        # The replica gets its tables from the primary through replication
+        db.create_all(bind_key=None)
 
     migrate.init_app(app, db)
+    app.cli.add_command(seed_command)
 
     @app.route("/")
     def hello():
@@ -4,11 +4,87 @@ import os
 load_dotenv()
 
 
-class DevConfig:
+def env_flag(name, default):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def replica_binds(uri):
+    """Returns SQLALCHEMY_BINDS with the read replica (see api.db.database.RoutingSession), if its URI is set"""
+
+    return {"replica": uri} if uri else {}
+
+
+class BaseConfig:
+    # Connection pool of every engine, the metrics at /diagnostics/pool show how it copes with the load.
+    # pool_size, max_overflow and pool_timeout are only passed when set, as the StaticPool that
+    # in-memory SQLite databases use doesn't take them
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_pre_ping": env_flag("DB_POOL_PRE_PING", "true"),
+        # Below MySQL's wait_timeout, so the server never closes a connection that sits in the pool
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+        **{option: convert(os.environ[variable]) for option, variable, convert in (
+            ("pool_size", "DB_POOL_SIZE", int),
+            ("max_overflow", "DB_MAX_OVERFLOW", int),
+            ("pool_timeout", "DB_POOL_TIMEOUT", int)
+        ) if variable in os.environ}
+    }
+
+    # Connection search (see api.services.connections_service)
+    MIN_CONNECTION_MINUTES = int(os.getenv("MIN_CONNECTION_MINUTES", 45))
+    MAX_LAYOVER_HOURS = int(os.getenv("MAX_LAYOVER_HOURS", 24))
+    CONNECTION_MAX_STOPS = int(os.getenv("CONNECTION_MAX_STOPS", 2))
+    CONNECTION_GRAPH_MAX_AGE = int(os.getenv("CONNECTION_GRAPH_MAX_AGE", 300))
+
+    # Flights cached per process for single-flight lookups, and the seconds a cached flight is used for
+    # (see api.db.repositories.flights_repository.flight_cache). A size of 0 turns the cache off
+    FLIGHT_CACHE_SIZE = int(os.getenv("FLIGHT_CACHE_SIZE", 10000))
+    FLIGHT_CACHE_TTL = int(os.getenv("FLIGHT_CACHE_TTL", 60))
+
+    # Flight numbers a worker reserves from the sequences table at once (see api.services.flight_numbers_service)
+    FLIGHT_NUMBER_BLOCK_SIZE = int(os.getenv("FLIGHT_NUMBER_BLOCK_SIZE", 100))
+
+    # Largest number of flights inserted with one statement by POST /flights/bulk
+    BULK_INSERT_BATCH_SIZE = int(os.getenv("BULK_INSERT_BATCH_SIZE", 1000))
+
+    # Generator of the ids of new users and bookings, one of api.utilities.ids.ID_GENERATORS
+    ID_GENERATOR = os.getenv("ID_GENERATOR", "uuid7")
+
+    # Seconds a client keeps reading from the primary after a write, so replica lag never hides its own changes.
+    # 0 turns it off
+    READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+
+    # SQL statements a request may issue before a warning is logged, routes can override it with
+    # api.utilities.query_counter.query_budget. The same statement repeated this often is logged as an N+1 query
+    QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", 20))
+    N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", 10))
+
+    # Profiling (see api.utilities.profiling), off unless PROFILE_DIR is set. PROFILER is "cprofile" or "sampling"
+    PROFILE_DIR = os.getenv("PROFILE_DIR")
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+    PROFILER = os.getenv("PROFILER", "cprofile")
+    PROFILE_SAMPLING_INTERVAL_MS = int(os.getenv("PROFILE_SAMPLING_INTERVAL_MS", 5))
+
+    # Tracing (see api.utilities.tracing), TRACE_EXPORT is a file or the URL of an OTLP/HTTP collector
+    TRACING = env_flag("TRACING", "false")
+    TRACE_EXPORT = os.getenv("TRACE_EXPORT")
+    TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "flights-booking-api")
+
+    # bcrypt runs on PASSWORD_HASH_WORKERS processes (0 runs it in the request thread, see
+    # api.utilities.password_hashing). Requests beyond PASSWORD_HASH_QUEUE hashes running or waiting get a 503.
+    # BCRYPT_ROUNDS is the work factor of new hashes, existing ones keep theirs
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_QUEUE = int(os.getenv("PASSWORD_HASH_QUEUE", 16))
+    PASSWORD_HASH_TIMEOUT = int(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+
+
+class DevConfig(BaseConfig):
     SECRET_KEY = os.getenv("SECRET_KEY")
     SQLALCHEMY_DATABASE_URI = os.getenv("MYSQL_DATABASE_URI")
+    SQLALCHEMY_BINDS = replica_binds(os.getenv("MYSQL_REPLICA_DATABASE_URI"))
 
 
-class TestConfig:
+class TestConfig(BaseConfig):
     SECRET_KEY = os.getenv("TEST_SECRET_KEY")
     SQLALCHEMY_DATABASE_URI = os.getenv("MYSQL_TEST_DATABASE_URI")
+    SQLALCHEMY_BINDS = replica_binds(os.getenv("MYSQL_TEST_REPLICA_DATABASE_URI"))
@@ -1,3 +1,93 @@
+import sqlite3
+
+from flask import current_app
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Bind key of the read replica in SQLALCHEMY_BINDS
+REPLICA_BIND_KEY = "replica"
+# Execution option that marks a query as read-only, see on_replica
+READ_REPLICA = "read_replica"
+# Session.info key that is set once the session has written anything
+WROTE = "wrote"
+# Session.info key of the callbacks that run once the transaction is committed, see after_commit
+AFTER_COMMIT_CALLBACKS = "after_commit_callbacks"
+
+
+class RoutingSession(Session):
+    """Session that sends read-only queries to the replica bind, when one is configured.
+
+    Only the queries marked with on_replica() go to the replica, and only while READ_REPLICA is set in the
+    session info, which the unit of work does for GET requests of clients that haven't written recently.
+    Once the session writes, it reads from the primary too, so it always sees its own changes.
+    """
+
+    def replica(self):
+        """Returns the engine of the replica if this session may read from it, otherwise None"""
+
+        if not self.info.get(READ_REPLICA) or self.info.get(WROTE):
+            return None
+        return self._db.engines.get(REPLICA_BIND_KEY)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def route_to_replica(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info[WROTE] = True
+    elif orm_execute_state.execution_options.get(READ_REPLICA):
+        replica = orm_execute_state.session.replica()
+        if replica is not None:
+            orm_execute_state.bind_arguments["bind"] = replica
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def record_write(session, flush_context):
+    session.info[WROTE] = True
+
+
+def on_replica(query):
+    """Marks a read-only query, which may be answered by the replica"""
+
+    return query.execution_options(**{READ_REPLICA: True})
+
+
+def after_commit(callback, *args):
+    """Calls callback(*args) once the current transaction is committed, or never if it is rolled back.
+
+    For side effects outside the database, e.g. the connections graph or emails, which mustn't happen for
+    changes that end up rolled back. The callbacks run before the session expires its objects, so they may
+    still read the attributes loaded in the transaction, but they can't run SQL.
+    """
+
+    db.session.info.setdefault(AFTER_COMMIT_CALLBACKS, []).append((callback, args))
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def run_after_commit_callbacks(session):
+    for callback, args in session.info.pop(AFTER_COMMIT_CALLBACKS, ()):
+        try:
+            callback(*args)
+        except Exception:
+            # The changes are committed already, a failed side effect mustn't turn the response into an error
+            current_app.logger.exception("After commit callback %s failed", callback.__qualname__)
+
+
+@event.listens_for(RoutingSession, "after_soft_rollback")
+def discard_after_commit_callbacks(session, previous_transaction):
+    session.info.pop(AFTER_COMMIT_CALLBACKS, None)
+
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
+
+
+@event.listens_for(Engine, "connect")
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores foreign keys unless they are enabled per connection. The services rely on them
+    to detect bookings of users and flights that don't exist, so they are enforced for local databases too"""
 
-db = SQLAlchemy()
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
@@ -0,0 +1,163 @@
+"""Store users.id, user_bookings.booking_id and user_bookings.user_id as BINARY(16)
+
+The binary columns are added next to the string ones and backfilled in
+batches of BATCH_SIZE rows, each batch committed on its own. The keys of
+user_bookings are then rebuilt on the swapped columns. Constraints whose
+names are not known (the unnamed unique constraint on booking_id) are
+looked up in the database, on SQLite they go away with their column.
+The keys are dropped before the columns, so MySQL doesn't shrink them to
+the remaining columns, and recreated once the columns are swapped.
+
+Revision ID: 0d93b4f7a5e1
+Revises: c6a18e5f3d27
+Create Date: 2026-10-18 18:14:37.502913
+
+"""
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0d93b4f7a5e1'
+down_revision = 'c6a18e5f3d27'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+# Gives the unnamed primary keys reflected on SQLite the names they are dropped by, MySQL ignores the name
+NAMING_CONVENTION = {"pk": "pk_%(table_name)s"}
+BOOKING_FOREIGN_KEYS = [
+    # (name, column, referred table, referred column)
+    ('fk_user_bookings_flight_number_flights', 'flight_number', 'flights', 'flight_number'),
+    ('fk_user_bookings_user_id_users', 'user_id', 'users', 'id'),
+]
+
+
+def to_binary(value):
+    return uuid.UUID(value).bytes
+
+
+def to_string(value):
+    return str(uuid.UUID(bytes=bytes(value)))
+
+
+def backfill(table_name, key, source_types, target_types, convert):
+    """Copies every column into new_<column> converted with convert, walking the table by key in batches"""
+
+    columns = list(source_types)
+    table = sa.table(table_name,
+                     *[sa.column(column, source_types[column]) for column in columns],
+                     *[sa.column(f'new_{column}', target_types[column]) for column in columns])
+    update = table.update(). \
+        where(table.c[key] == sa.bindparam('b_key')). \
+        values({f'new_{column}': sa.bindparam(f'b_{column}') for column in columns})
+
+    connection = op.get_bind()
+    last_key = None
+    with op.get_context().autocommit_block():
+        while True:
+            query = sa.select(*[table.c[column] for column in columns]).order_by(table.c[key]).limit(BATCH_SIZE)
+            if last_key is not None:
+                query = query.where(table.c[key] > last_key)
+            rows = connection.execute(query).all()
+            if not rows:
+                break
+
+            connection.execute(update, [{'b_key': row._mapping[key],
+                                         **{f'b_{column}': convert(row._mapping[column]) for column in columns}}
+                                        for row in rows])
+            last_key = rows[-1]._mapping[key]
+
+
+def unique_constraint_name(table_name, columns):
+    for constraint in sa.inspect(op.get_bind()).get_unique_constraints(table_name):
+        if constraint['column_names'] == columns:
+            return constraint['name']
+    return None
+
+
+def drop_booking_keys():
+    """Drops every key of user_bookings that contains booking_id or user_id, so MySQL doesn't shrink
+    them to the remaining columns when those columns are dropped"""
+
+    booking_id_unique = unique_constraint_name('user_bookings', ['booking_id'])
+    with op.batch_alter_table('user_bookings', schema=None) as batch_op:
+        for name, _, _, _ in BOOKING_FOREIGN_KEYS:
+            batch_op.drop_constraint(name, type_='foreignkey')
+
+    with op.batch_alter_table('user_bookings', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_index('ix_user_bookings_flight_booking')
+        batch_op.drop_constraint('uq_user_bookings_user_flight', type_='unique')
+        if booking_id_unique:
+            batch_op.drop_constraint(booking_id_unique, type_='unique')
+        batch_op.drop_constraint('pk_user_bookings', type_='primary')
+
+    with op.batch_alter_table('users', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint('pk_users', type_='primary')
+
+
+def swap_columns(table_name, new_types):
+    """Replaces the columns with the backfilled ones"""
+
+    with op.batch_alter_table(table_name, schema=None) as batch_op:
+        for column in new_types:
+            batch_op.drop_column(column)
+
+    with op.batch_alter_table(table_name, schema=None) as batch_op:
+        for column, new_type in new_types.items():
+            batch_op.alter_column(f'new_{column}', new_column_name=column, existing_type=new_type, nullable=False)
+
+
+def create_keys():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_primary_key('pk_users', ['id'])
+
+    with op.batch_alter_table('user_bookings', schema=None) as batch_op:
+        batch_op.create_primary_key('pk_user_bookings', ['booking_id', 'flight_number', 'user_id'])
+        batch_op.create_unique_constraint('uq_user_bookings_booking_id', ['booking_id'])
+        batch_op.create_unique_constraint('uq_user_bookings_user_flight', ['user_id', 'flight_number'])
+        batch_op.create_index('ix_user_bookings_flight_booking', ['flight_number', 'booking_id', 'user_id'],
+                              unique=False)
+
+    with op.batch_alter_table('user_bookings', schema=None) as batch_op:
+        for name, column, referred_table, referred_column in BOOKING_FOREIGN_KEYS:
+            batch_op.create_foreign_key(name, referred_table, [column], [referred_column], ondelete='CASCADE')
+
+
+def convert(old_types, new_types, convert_value):
+    """Converts the id columns of users and user_bookings from old_types to new_types,
+    both dicts of column name to type"""
+
+    user_columns = ['id']
+    booking_columns = ['booking_id', 'user_id']
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        for column in user_columns:
+            batch_op.add_column(sa.Column(f'new_{column}', new_types[column], nullable=True))
+    with op.batch_alter_table('user_bookings', schema=None) as batch_op:
+        for column in booking_columns:
+            batch_op.add_column(sa.Column(f'new_{column}', new_types[column], nullable=True))
+
+    backfill('users', 'id', {column: old_types[column] for column in user_columns},
+             new_types, convert_value)
+    backfill('user_bookings', 'booking_id', {column: old_types[column] for column in booking_columns},
+             new_types, convert_value)
+
+    drop_booking_keys()
+    swap_columns('users', {column: new_types[column] for column in user_columns})
+    swap_columns('user_bookings', {column: new_types[column] for column in booking_columns})
+    create_keys()
+
+
+STRING_TYPES = {'id': sa.String(length=36), 'booking_id': sa.String(length=255), 'user_id': sa.String(length=36)}
+BINARY_TYPES = {column: sa.BINARY(length=16) for column in STRING_TYPES}
+
+
+def upgrade():
+    convert(STRING_TYPES, BINARY_TYPES, to_binary)
+
+
+def downgrade():
+    convert(BINARY_TYPES, STRING_TYPES, to_string)
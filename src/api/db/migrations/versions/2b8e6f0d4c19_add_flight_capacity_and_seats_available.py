@@ -0,0 +1,75 @@
+"""Add capacity and seats_available to flights
+
+seats_available is backfilled from the existing bookings in batches of
+BATCH_SIZE flights, each committed on its own, before the check constraint
+that keeps it between 0 and capacity is added. Flights had no seat limit
+before, so those with more bookings than DEFAULT_CAPACITY get a capacity of
+their bookings and no free seats, which keeps every row within the check.
+
+Revision ID: 2b8e6f0d4c19
+Revises: 9e3c5b27d1a4
+Create Date: 2026-10-18 15:52:10.286417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2b8e6f0d4c19'
+down_revision = '9e3c5b27d1a4'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+DEFAULT_CAPACITY = 180
+
+
+def upgrade():
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('capacity', sa.Integer(), nullable=False,
+                                      server_default=str(DEFAULT_CAPACITY)))
+        batch_op.add_column(sa.Column('seats_available', sa.Integer(), nullable=False,
+                                      server_default=str(DEFAULT_CAPACITY)))
+
+    flights = sa.table('flights',
+                       sa.column('flight_number', sa.String),
+                       sa.column('capacity', sa.Integer),
+                       sa.column('seats_available', sa.Integer))
+    user_bookings = sa.table('user_bookings', sa.column('flight_number', sa.String))
+    booked_seats = sa.select(sa.func.count()). \
+        where(user_bookings.c.flight_number == flights.c.flight_number). \
+        scalar_subquery()
+    # Overbooked flights get a capacity of their bookings, so seats_available never goes below 0
+    capacity = sa.case((booked_seats > DEFAULT_CAPACITY, booked_seats), else_=DEFAULT_CAPACITY)
+
+    connection = op.get_bind()
+    last_flight_number = ''
+    with op.get_context().autocommit_block():
+        while True:
+            batch = connection.execute(
+                sa.select(flights.c.flight_number).
+                where(flights.c.flight_number > last_flight_number).
+                order_by(flights.c.flight_number).
+                limit(BATCH_SIZE)).scalars().all()
+            if not batch:
+                break
+
+            connection.execute(flights.update().
+                               where(flights.c.flight_number > last_flight_number,
+                                     flights.c.flight_number <= batch[-1]).
+                               values(capacity=capacity, seats_available=capacity - booked_seats))
+            last_flight_number = batch[-1]
+
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.create_check_constraint('ck_flights_seats_available',
+                                         'seats_available >= 0 AND seats_available <= capacity')
+
+
+def downgrade():
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.drop_constraint('ck_flights_seats_available', type_='check')
+
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.drop_column('seats_available')
+        batch_op.drop_column('capacity')
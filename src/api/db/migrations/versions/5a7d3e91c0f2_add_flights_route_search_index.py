@@ -0,0 +1,27 @@
+"""Add flights route search index
+
+Revision ID: 5a7d3e91c0f2
+Revises: 8c1f4e2a9b3d
+Create Date: 2026-10-18 11:03:47.118254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7d3e91c0f2'
+down_revision = '8c1f4e2a9b3d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.create_index('ix_flights_route_takeoff_time',
+                              ['start_destination', 'end_destination', 'takeoff_time'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.drop_index('ix_flights_route_takeoff_time')
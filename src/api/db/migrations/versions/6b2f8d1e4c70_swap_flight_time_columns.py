@@ -0,0 +1,148 @@
+"""Swap the DATETIME flight times in for the string ones
+
+Second half of the conversion started in d41b7a6c2e80, run together with
+the release whose models map takeoff_time and landing_time to DATETIME.
+The triggers that kept new_takeoff_time and new_landing_time in sync are
+dropped, a last catch-up pass converts whatever they missed, and the
+columns and indexes are swapped. On MySQL the swap is a single in-place
+ALTER TABLE that allows concurrent reads and writes, so there is no moment
+without a takeoff_time column.
+
+Revision ID: 6b2f8d1e4c70
+Revises: d41b7a6c2e80
+Create Date: 2026-10-18 12:24:41.180326
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b2f8d1e4c70'
+down_revision = 'd41b7a6c2e80'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+MYSQL_DATETIME_FORMAT = "%Y-%m-%d %H:%i"
+TRIGGERS = ('flights_new_times_insert', 'flights_new_times_update')
+# Index on the old columns -> index on the new ones, which takes its name
+INDEXES = {
+    'ix_flights_takeoff_time_flight_number': 'ix_flights_new_takeoff_time_flight_number',
+    'ix_flights_route_takeoff_time': 'ix_flights_route_new_takeoff_time',
+}
+INDEX_COLUMNS = {
+    'ix_flights_takeoff_time_flight_number': ['takeoff_time', 'flight_number'],
+    'ix_flights_route_takeoff_time': ['start_destination', 'end_destination', 'takeoff_time'],
+}
+
+
+def is_mysql():
+    return op.get_bind().dialect.name == 'mysql'
+
+
+def catch_up(source, target, source_type, target_type, convert):
+    """Converts the source_* times of the flights whose target_takeoff_time is still NULL, in batches"""
+
+    flights = sa.table('flights',
+                       sa.column('flight_number', sa.String),
+                       sa.column(f'{source}takeoff_time', source_type),
+                       sa.column(f'{source}landing_time', source_type),
+                       sa.column(f'{target}takeoff_time', target_type),
+                       sa.column(f'{target}landing_time', target_type))
+    update = flights.update(). \
+        where(flights.c.flight_number == sa.bindparam('b_flight_number')). \
+        values({f'{target}takeoff_time': sa.bindparam('b_takeoff_time'),
+                f'{target}landing_time': sa.bindparam('b_landing_time')})
+    select = sa.select(flights.c.flight_number,
+                       flights.c[f'{source}takeoff_time'],
+                       flights.c[f'{source}landing_time']). \
+        where(flights.c[f'{target}takeoff_time'].is_(None)). \
+        order_by(flights.c.flight_number). \
+        limit(BATCH_SIZE)
+
+    connection = op.get_bind()
+    with op.get_context().autocommit_block():
+        while rows := connection.execute(select).all():
+            connection.execute(update, [{'b_flight_number': row[0],
+                                         'b_takeoff_time': convert(row[1]),
+                                         'b_landing_time': convert(row[2])} for row in rows])
+
+
+def upgrade():
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    catch_up('', 'new_', sa.String(length=16), sa.DateTime(),
+             lambda value: datetime.strptime(value, DATETIME_FORMAT))
+
+    if is_mysql():
+        op.execute(
+            "ALTER TABLE flights "
+            + ", ".join(f"DROP INDEX {old}" for old in INDEXES) + ", "
+            "DROP COLUMN takeoff_time, DROP COLUMN landing_time, "
+            "CHANGE COLUMN new_takeoff_time takeoff_time DATETIME NOT NULL, "
+            "CHANGE COLUMN new_landing_time landing_time DATETIME NOT NULL, "
+            + ", ".join(f"RENAME INDEX {new} TO {old}" for old, new in INDEXES.items()) + ", "
+            "ALGORITHM=INPLACE, LOCK=NONE")
+        return
+
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        for old, new in INDEXES.items():
+            batch_op.drop_index(old)
+            batch_op.drop_index(new)
+
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.drop_column('takeoff_time')
+        batch_op.drop_column('landing_time')
+
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.alter_column('new_takeoff_time', new_column_name='takeoff_time',
+                              existing_type=sa.DateTime(), nullable=False)
+        batch_op.alter_column('new_landing_time', new_column_name='landing_time',
+                              existing_type=sa.DateTime(), nullable=False)
+
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        for old, columns in INDEX_COLUMNS.items():
+            batch_op.create_index(old, columns, unique=False)
+
+
+def downgrade():
+    # Back to the state after d41b7a6c2e80: string times, DATETIME copies in new_*, with their indexes and
+    # triggers. Rolling back isn't expected to run under load, so this one isn't online
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('old_takeoff_time', sa.String(length=16), nullable=True))
+        batch_op.add_column(sa.Column('old_landing_time', sa.String(length=16), nullable=True))
+
+    catch_up('', 'old_', sa.DateTime(), sa.String(length=16), lambda value: value.strftime(DATETIME_FORMAT))
+
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        for old in INDEXES:
+            batch_op.drop_index(old)
+
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.alter_column('takeoff_time', new_column_name='new_takeoff_time',
+                              existing_type=sa.DateTime(), nullable=True)
+        batch_op.alter_column('landing_time', new_column_name='new_landing_time',
+                              existing_type=sa.DateTime(), nullable=True)
+
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.alter_column('old_takeoff_time', new_column_name='takeoff_time',
+                              existing_type=sa.String(length=16), nullable=False)
+        batch_op.alter_column('old_landing_time', new_column_name='landing_time',
+                              existing_type=sa.String(length=16), nullable=False)
+
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        for old, new in INDEXES.items():
+            batch_op.create_index(old, INDEX_COLUMNS[old], unique=False)
+            batch_op.create_index(new, [f'new_{column}' if column == 'takeoff_time' else column
+                                        for column in INDEX_COLUMNS[old]], unique=False)
+
+    if is_mysql():
+        for name, event in zip(TRIGGERS, ('INSERT', 'UPDATE')):
+            op.execute(sa.text(
+                f"CREATE TRIGGER {name} BEFORE {event} ON flights FOR EACH ROW SET "
+                f"NEW.new_takeoff_time = STR_TO_DATE(NEW.takeoff_time, '{MYSQL_DATETIME_FORMAT}'), "
+                f"NEW.new_landing_time = STR_TO_DATE(NEW.landing_time, '{MYSQL_DATETIME_FORMAT}')"))
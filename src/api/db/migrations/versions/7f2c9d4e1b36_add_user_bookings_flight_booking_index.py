@@ -0,0 +1,27 @@
+"""Add covering index for paginating bookings by flight
+
+Revision ID: 7f2c9d4e1b36
+Revises: 2b8e6f0d4c19
+Create Date: 2026-10-18 16:52:11.390274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7f2c9d4e1b36'
+down_revision = '2b8e6f0d4c19'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user_bookings', schema=None) as batch_op:
+        batch_op.create_index('ix_user_bookings_flight_booking', ['flight_number', 'booking_id', 'user_id'],
+                              unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user_bookings', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_bookings_flight_booking')
@@ -0,0 +1,27 @@
+"""Add flights keyset pagination index
+
+Revision ID: 8c1f4e2a9b3d
+Revises: e21e4aa65be5
+Create Date: 2026-10-18 10:12:31.402113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c1f4e2a9b3d'
+down_revision = 'e21e4aa65be5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.create_index('ix_flights_takeoff_time_flight_number', ['takeoff_time', 'flight_number'],
+                              unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.drop_index('ix_flights_takeoff_time_flight_number')
@@ -0,0 +1,56 @@
+"""Add unique user/flight constraint on user_bookings
+
+The booking check that the constraint replaces could race, so a user may
+have booked the same flight more than once. Only the booking with the lowest
+booking_id of each user and flight is kept, the others are deleted (and
+logged) before the constraint is added.
+
+Revision ID: 9e3c5b27d1a4
+Revises: 6b2f8d1e4c70
+Create Date: 2026-10-18 14:41:26.503318
+
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e3c5b27d1a4'
+down_revision = '6b2f8d1e4c70'
+branch_labels = None
+depends_on = None
+
+logger = logging.getLogger('alembic.env')
+
+
+def delete_duplicate_bookings():
+    user_bookings = sa.table('user_bookings',
+                             sa.column('booking_id', sa.String),
+                             sa.column('flight_number', sa.String),
+                             sa.column('user_id', sa.String))
+    connection = op.get_bind()
+    duplicates = connection.execute(
+        sa.select(user_bookings.c.user_id, user_bookings.c.flight_number, sa.func.min(user_bookings.c.booking_id)).
+        group_by(user_bookings.c.user_id, user_bookings.c.flight_number).
+        having(sa.func.count() > 1)).all()
+
+    for user_id, flight_number, kept_booking_id in duplicates:
+        deleted = connection.execute(user_bookings.delete().where(user_bookings.c.user_id == user_id,
+                                                                  user_bookings.c.flight_number == flight_number,
+                                                                  user_bookings.c.booking_id != kept_booking_id))
+        logger.warning("Deleted %d repeated bookings of flight %s by user %s, kept booking %s",
+                       deleted.rowcount, flight_number, user_id, kept_booking_id)
+
+
+def upgrade():
+    delete_duplicate_bookings()
+
+    with op.batch_alter_table('user_bookings', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_user_bookings_user_flight', ['user_id', 'flight_number'])
+
+
+def downgrade():
+    with op.batch_alter_table('user_bookings', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_user_bookings_user_flight', type_='unique')
@@ -0,0 +1,56 @@
+"""Delete user bookings with ON DELETE CASCADE when their flight or user is deleted
+
+The existing foreign keys were created without names, so their names are
+looked up in the database (MySQL names them user_bookings_ibfk_N), falling
+back to the naming convention that batch mode gives to unnamed constraints
+on SQLite.
+
+Revision ID: c6a18e5f3d27
+Revises: 7f2c9d4e1b36
+Create Date: 2026-10-18 17:30:42.861507
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6a18e5f3d27'
+down_revision = '7f2c9d4e1b36'
+branch_labels = None
+depends_on = None
+
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+FOREIGN_KEYS = [
+    # (name, column, referred table, referred column)
+    ('fk_user_bookings_flight_number_flights', 'flight_number', 'flights', 'flight_number'),
+    ('fk_user_bookings_user_id_users', 'user_id', 'users', 'id'),
+]
+
+
+def existing_foreign_key_name(column, default):
+    for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys('user_bookings'):
+        if foreign_key['constrained_columns'] == [column]:
+            return foreign_key['name'] or default
+    return None
+
+
+def recreate_foreign_keys(ondelete):
+    existing_names = [existing_foreign_key_name(column, name) for name, column, _, _ in FOREIGN_KEYS]
+
+    with op.batch_alter_table('user_bookings', schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+        for existing_name in existing_names:
+            if existing_name:
+                batch_op.drop_constraint(existing_name, type_='foreignkey')
+
+    with op.batch_alter_table('user_bookings', schema=None) as batch_op:
+        for name, column, referred_table, referred_column in FOREIGN_KEYS:
+            batch_op.create_foreign_key(name, referred_table, [column], [referred_column], ondelete=ondelete)
+
+
+def upgrade():
+    recreate_foreign_keys('CASCADE')
+
+
+def downgrade():
+    recreate_foreign_keys(None)
@@ -0,0 +1,123 @@
+"""Add DATETIME copies of takeoff_time and landing_time and backfill them
+
+First half of converting the flight times from strings to DATETIME columns
+without a long-running lock on the flights table. The new_takeoff_time and
+new_landing_time columns are added next to the old ones and filled in
+batches of BATCH_SIZE rows, each batch committed on its own. On MySQL,
+triggers fill them for the flights the running app inserts or updates in
+the meantime, and a catch-up pass converts any row the walk missed. The
+indexes the new columns need are built here as well, so the swap in
+6b2f8d1e4c70 only has to rename them.
+
+Revision ID: d41b7a6c2e80
+Revises: 5a7d3e91c0f2
+Create Date: 2026-10-18 12:20:05.734901
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41b7a6c2e80'
+down_revision = '5a7d3e91c0f2'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+# MySQL format of DATETIME_FORMAT, for the triggers
+MYSQL_DATETIME_FORMAT = "%Y-%m-%d %H:%i"
+TRIGGERS = ('flights_new_times_insert', 'flights_new_times_update')
+NEW_INDEXES = {
+    'ix_flights_new_takeoff_time_flight_number': ['new_takeoff_time', 'flight_number'],
+    'ix_flights_route_new_takeoff_time': ['start_destination', 'end_destination', 'new_takeoff_time'],
+}
+
+
+def is_mysql():
+    return op.get_bind().dialect.name == 'mysql'
+
+
+def create_triggers(source, target, expression):
+    """Keeps the target_* columns equal to expression (a SQL format of the source_* column) on every
+    insert and update, while the app still writes only the source_* ones. MySQL only"""
+
+    assignments = ', '.join(f"NEW.{target}{column} = {expression.format(f'NEW.{source}{column}')}"
+                            for column in ('takeoff_time', 'landing_time'))
+    for name, event in zip(TRIGGERS, ('INSERT', 'UPDATE')):
+        op.execute(sa.text(f"CREATE TRIGGER {name} BEFORE {event} ON flights FOR EACH ROW SET {assignments}"))
+
+
+def drop_triggers():
+    for name in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def backfill(source, target, source_type, target_type, convert):
+    """Copies the source_* time columns into the target_* ones, walking the table by flight_number in batches.
+
+    A catch-up pass then converts the rows the walk missed, flights inserted while it ran with a flight number
+    below the one it reached, until no target_takeoff_time is NULL anymore.
+    """
+
+    flights = sa.table('flights',
+                       sa.column('flight_number', sa.String),
+                       sa.column(f'{source}takeoff_time', source_type),
+                       sa.column(f'{source}landing_time', source_type),
+                       sa.column(f'{target}takeoff_time', target_type),
+                       sa.column(f'{target}landing_time', target_type))
+    update = flights.update(). \
+        where(flights.c.flight_number == sa.bindparam('b_flight_number')). \
+        values({f'{target}takeoff_time': sa.bindparam('b_takeoff_time'),
+                f'{target}landing_time': sa.bindparam('b_landing_time')})
+    select = sa.select(flights.c.flight_number,
+                       flights.c[f'{source}takeoff_time'],
+                       flights.c[f'{source}landing_time']). \
+        order_by(flights.c.flight_number). \
+        limit(BATCH_SIZE)
+
+    def copy(rows):
+        connection.execute(update, [{'b_flight_number': row[0],
+                                     'b_takeoff_time': convert(row[1]),
+                                     'b_landing_time': convert(row[2])} for row in rows])
+
+    connection = op.get_bind()
+    last_flight_number = ''
+    with op.get_context().autocommit_block():
+        while rows := connection.execute(select.where(flights.c.flight_number > last_flight_number)).all():
+            copy(rows)
+            last_flight_number = rows[-1][0]
+
+        while rows := connection.execute(select.where(flights.c[f'{target}takeoff_time'].is_(None))).all():
+            copy(rows)
+
+
+def upgrade():
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('new_takeoff_time', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('new_landing_time', sa.DateTime(), nullable=True))
+
+    if is_mysql():
+        create_triggers('', 'new_', f"STR_TO_DATE({{}}, '{MYSQL_DATETIME_FORMAT}')")
+
+    backfill('', 'new_', sa.String(length=16), sa.DateTime(),
+             lambda value: datetime.strptime(value, DATETIME_FORMAT))
+
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        for name, columns in NEW_INDEXES.items():
+            batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    drop_triggers()
+
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        for name in NEW_INDEXES:
+            batch_op.drop_index(name)
+
+    with op.batch_alter_table('flights', schema=None) as batch_op:
+        batch_op.drop_column('new_landing_time')
+        batch_op.drop_column('new_takeoff_time')
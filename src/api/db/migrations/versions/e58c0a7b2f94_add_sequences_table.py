@@ -0,0 +1,27 @@
+"""Add sequences table for allocating flight numbers in blocks
+
+Revision ID: e58c0a7b2f94
+Revises: 0d93b4f7a5e1
+Create Date: 2026-10-18 19:02:16.248730
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e58c0a7b2f94'
+down_revision = '0d93b4f7a5e1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sequences',
+                    sa.Column('name', sa.String(length=64), nullable=False),
+                    sa.Column('next_value', sa.BigInteger(), nullable=False),
+                    sa.PrimaryKeyConstraint('name'))
+
+
+def downgrade():
+    op.drop_table('sequences')
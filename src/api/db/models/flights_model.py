@@ -2,29 +2,47 @@ import sqlalchemy
 from sqlalchemy.orm import relationship
 
 from api.db.database import db
+from api.utilities.utils import DATETIME_FORMAT
+
+DEFAULT_CAPACITY = 180
 
 
 class Flights(db.Model):
     __tablename__ = "flights"
+    __table_args__ = (
+        # Keyset pagination walks the flights in (takeoff_time, flight_number) order
+        sqlalchemy.Index("ix_flights_takeoff_time_flight_number", "takeoff_time", "flight_number"),
+        # Route search filters on both destinations and scans a takeoff_time range
+        sqlalchemy.Index("ix_flights_route_takeoff_time", "start_destination", "end_destination", "takeoff_time"),
+        # Seats are claimed with a conditional UPDATE, the constraint is the last line of defence against overselling
+        sqlalchemy.CheckConstraint("seats_available >= 0 AND seats_available <= capacity",
+                                   name="ck_flights_seats_available"),
+    )
 
     flight_number = sqlalchemy.Column(sqlalchemy.String(6), primary_key=True,
                                       nullable=False, unique=True)
     start_destination = sqlalchemy.Column(sqlalchemy.String(255),
                                           nullable=False)
     end_destination = sqlalchemy.Column(sqlalchemy.String(255), nullable=False)
-    takeoff_time = sqlalchemy.Column(sqlalchemy.String(16), nullable=False)
-    landing_time = sqlalchemy.Column(sqlalchemy.String(16), nullable=False)
+    takeoff_time = sqlalchemy.Column(sqlalchemy.DateTime, nullable=False)
+    landing_time = sqlalchemy.Column(sqlalchemy.DateTime, nullable=False)
     price = sqlalchemy.Column(sqlalchemy.Double, nullable=False)
+    capacity = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, server_default=str(DEFAULT_CAPACITY))
+    seats_available = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, server_default=str(DEFAULT_CAPACITY))
 
+    # The bookings are deleted by the ON DELETE CASCADE of their foreign key, so deleting a flight is one
+    # statement and never loads its bookings
     user_bookings = relationship("UserBookings", back_populates="flights",
-                                 cascade="all")
+                                 cascade="all", passive_deletes=True)
 
     def to_json(self):
         return {
             'flight_number': self.flight_number,
             'start_destination': self.start_destination,
             'end_destination': self.end_destination,
-            'takeoff_time': self.takeoff_time,
-            'landing_time': self.landing_time,
-            'price': self.price
+            'takeoff_time': self.takeoff_time.strftime(DATETIME_FORMAT),
+            'landing_time': self.landing_time.strftime(DATETIME_FORMAT),
+            'price': self.price,
+            'capacity': self.capacity,
+            'seats_available': self.seats_available
         }
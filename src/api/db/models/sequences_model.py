@@ -0,0 +1,12 @@
+import sqlalchemy
+
+from api.db.database import db
+
+
+class Sequences(db.Model):
+    """Named counters, from which blocks of values are reserved (see api.services.flight_numbers_service)"""
+
+    __tablename__ = "sequences"
+
+    name = sqlalchemy.Column(sqlalchemy.String(64), primary_key=True)
+    next_value = sqlalchemy.Column(sqlalchemy.BigInteger, nullable=False)
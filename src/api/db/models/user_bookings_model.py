@@ -1,18 +1,30 @@
 import sqlalchemy
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 
 from api.db.database import db
+from api.db.types import BinaryUUID
 
 
 class UserBookings(db.Model):
     __tablename__ = "user_bookings"
+    __table_args__ = (
+        # A user can book a flight only once, the constraint replaces checking for the booking before inserting it
+        UniqueConstraint("user_id", "flight_number", name="uq_user_bookings_user_flight"),
+        UniqueConstraint("booking_id", name="uq_user_bookings_booking_id"),
+        # Covers paging through the bookings (all of them or those of one flight) in (flight_number, booking_id)
+        # order and joining them to the users without reading the table rows. See query_bookings_page for the
+        # indexes of the other filters
+        Index("ix_user_bookings_flight_booking", "flight_number", "booking_id", "user_id"),
+    )
 
-    booking_id = sqlalchemy.Column(sqlalchemy.String(255), primary_key=True,
-                                   unique=True)
-    flight_number = sqlalchemy.Column(ForeignKey('flights.flight_number'),
+    booking_id = sqlalchemy.Column(BinaryUUID, primary_key=True)
+    flight_number = sqlalchemy.Column(ForeignKey('flights.flight_number', ondelete="CASCADE",
+                                                 name="fk_user_bookings_flight_number_flights"),
                                       primary_key=True)
-    user_id = sqlalchemy.Column(ForeignKey('users.id'), primary_key=True)
+    user_id = sqlalchemy.Column(BinaryUUID,
+                                ForeignKey('users.id', ondelete="CASCADE", name="fk_user_bookings_user_id_users"),
+                                primary_key=True)
 
     users = relationship("Users", back_populates="user_bookings")
     flights = relationship("Flights", back_populates="user_bookings")
@@ -1,13 +1,14 @@
 from sqlalchemy import Column, String, Boolean
 from sqlalchemy.orm import relationship
 from api.db.database import db
+from api.db.types import BinaryUUID
 
 
 class Users(db.Model):
     __tablename__ = "users"
 
-    id = Column(String(36), primary_key=True,
-                nullable=False, unique=True)
+    id = Column(BinaryUUID, primary_key=True,
+                nullable=False)
     first_name = Column(String(255), nullable=False)
     last_name = Column(String(255), nullable=False)
     email = Column(String(255), nullable=False,
@@ -15,8 +16,9 @@ class Users(db.Model):
     verified = Column(Boolean, default=False)
     password = Column(String(255), nullable=False)
 
+    # The bookings are deleted by the ON DELETE CASCADE of their foreign key
     user_bookings = relationship("UserBookings", back_populates="users",
-                                 cascade="all")
+                                 cascade="all", passive_deletes=True)
 
     def to_json(self):
         return {
@@ -0,0 +1,165 @@
+import threading
+import time
+
+from flask import Flask
+from sqlalchemy import event, exc
+from sqlalchemy.pool import QueuePool
+
+# Metrics of the connection pool of every engine, by bind key (None is the default engine)
+pool_metrics = {}
+
+
+class MeteredQueuePool(QueuePool):
+    """QueuePool that reports how long every checkout waits for a connection and how many checkouts time out"""
+
+    metrics = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_timeout()
+            raise
+
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() replaces the pool, the new one keeps reporting to the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class PoolMetrics:
+    """Counters of the connection pool of one engine.
+
+    The checkouts, overflow, wait and hold times show whether the pool is big enough for the number of
+    threads of a worker, the connection ages show whether pool_recycle is below the server's wait_timeout.
+    """
+
+    def __init__(self, engine, clock=time.monotonic):
+        self.engine = engine
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._connected_at = {}
+        self._checked_out_at = {}
+        self.connects = 0
+        self.checkouts = 0
+        self.invalidations = 0
+        self.timeouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait_time = 0.0
+        self.checkins = 0
+        self.hold_time = 0.0
+        self.max_hold_time = 0.0
+
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "close", self._on_close)
+        event.listen(engine, "detach", self._on_close)
+        if isinstance(engine.pool, MeteredQueuePool):
+            engine.pool.metrics = self
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+            self._connected_at[id(connection_record)] = self._clock()
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+            self._checked_out_at[id(connection_record)] = self._clock()
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            checked_out_at = self._checked_out_at.pop(id(connection_record), None)
+            if checked_out_at is not None:
+                held = self._clock() - checked_out_at
+                self.checkins += 1
+                self.hold_time += held
+                self.max_hold_time = max(self.max_hold_time, held)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def _on_close(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._connected_at.pop(id(connection_record), None)
+
+    def record_wait(self, seconds):
+        with self._lock:
+            self.waits += 1
+            self.wait_time += seconds
+            self.max_wait_time = max(self.max_wait_time, seconds)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self):
+        """Returns the counters of the pool along with its current size and the ages of its connections"""
+
+        pool = self.engine.pool
+        with self._lock:
+            now = self._clock()
+            ages = [now - connected_at for connected_at in self._connected_at.values()]
+            stats = {
+                "pool": type(pool).__name__,
+                "connections": len(ages),
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "invalidations": self.invalidations,
+                "timeouts": self.timeouts,
+                "wait_time": {
+                    "total": round(self.wait_time, 6),
+                    "mean": round(self.wait_time / self.waits, 6) if self.waits else 0.0,
+                    "max": round(self.max_wait_time, 6)
+                },
+                "hold_time": {
+                    "total": round(self.hold_time, 6),
+                    "mean": round(self.hold_time / self.checkins, 6) if self.checkins else 0.0,
+                    "max": round(self.max_hold_time, 6)
+                },
+                "connection_age": {
+                    "mean": round(sum(ages) / len(ages), 3) if ages else 0.0,
+                    "max": round(max(ages), 3) if ages else 0.0
+                }
+            }
+
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "timeout": pool.timeout()
+            })
+        return stats
+
+
+def use_metered_pool(app: Flask) -> None:
+    """Makes the engines of the app use MeteredQueuePool, unless the config asks for another pool class.
+    Must be called before db.init_app, which creates the engines"""
+
+    options = dict(app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {}))
+    options.setdefault("poolclass", MeteredQueuePool)
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = options
+
+
+def attach_pool_metrics(engines) -> None:
+    """Starts collecting the metrics of every engine
+
+    Parameters:
+        engines: dict of engines by bind key, as in db.engines
+    """
+
+    for bind_key, engine in engines.items():
+        pool_metrics[bind_key] = PoolMetrics(engine)
@@ -1,32 +1,169 @@
-from api.db.database import db
-from api.db.models.flights_model import Flights
+from flask import Flask
+from sqlalchemy import and_, event, insert, or_, tuple_, update
+from sqlalchemy.orm import Session
+
+from api.db.database import db, on_replica
+from api.db.models.flights_model import DEFAULT_CAPACITY, Flights
 from api.db.models.user_bookings_model import UserBookings
 from api.db.models.users_model import Users
+from api.utilities.cache import LRUCache
+from api.utilities.metrics import instrumented
+
+# Flights are read far more often than they change, so single-flight lookups read through this cache.
+# Writes in this process invalidate their entry, writes in other processes are picked up after the TTL.
+# create_app sizes it from the config, see init_flight_cache
+flight_cache = LRUCache(maxsize=10000, ttl=60)
+
+CHANGED_FLIGHTS_KEY = "changed_flights"
+
+STREAM_BATCH_SIZE = 1000
+
+
+def init_flight_cache(app: Flask) -> None:
+    flight_cache.configure(app.config["FLIGHT_CACHE_SIZE"], app.config["FLIGHT_CACHE_TTL"])
+
+
+@instrumented
+def query_flights_page(limit, after=None):
+    """Retrieve a page of flights ordered by takeoff_time and flight_number
+
+    Parameters:
+        limit (int): the maximum number of flights to return
+        after (tuple): the (takeoff_time, flight_number) of the last flight of the previous page
+
+    Returns:
+            list of flights
+    """
+
+    query = on_replica(db.session.query(Flights))
+    if after:
+        takeoff_time, flight_number = after
+        query = query.filter(or_(Flights.takeoff_time > takeoff_time,
+                                 and_(Flights.takeoff_time == takeoff_time,
+                                      Flights.flight_number > flight_number)))
+
+    page = query.order_by(Flights.takeoff_time, Flights.flight_number).limit(limit).all()
+    return page
+
+
+@instrumented
+def query_flights_stream(batch_size=STREAM_BATCH_SIZE):
+    """Retrieve all flights through a server-side cursor, loading batch_size rows at a time
+    Returns:
+            iterable of flights
+    """
+
+    return on_replica(db.session.query(Flights)). \
+        order_by(Flights.takeoff_time, Flights.flight_number). \
+        yield_per(batch_size)
 
 
-def query_all_flights():
-    """Retrieve all flights from the database
+@instrumented
+def query_flight_legs_stream(batch_size=STREAM_BATCH_SIZE):
+    """Retrieve the columns of all flights needed by the connection graph through a server-side cursor,
+    as rows, so they don't fill the identity map of the session
     Returns:
-            list of all flights
+            iterable of rows
     """
-    all_flights = db.session.query(Flights).all()
-    return all_flights
 
+    return on_replica(db.session.query(Flights)). \
+        with_entities(Flights.flight_number,
+                      Flights.start_destination,
+                      Flights.end_destination,
+                      Flights.takeoff_time,
+                      Flights.landing_time,
+                      Flights.price). \
+        yield_per(batch_size)
 
+
+@instrumented
+def query_flights_by_route(start_destination, end_destination, depart_after=None, depart_before=None,
+                           limit=None):
+    """Retrieve the flights between two destinations taking off in the given window, ordered by takeoff_time
+
+    Parameters:
+        start_destination (str): where the flights take off
+        end_destination (str): where the flights land
+        depart_after: the earliest takeoff_time (inclusive)
+        depart_before: the latest takeoff_time (inclusive)
+        limit (int): the maximum number of flights to return
+
+    Returns:
+            list of flights
+    """
+
+    query = on_replica(db.session.query(Flights)).filter(Flights.start_destination == start_destination,
+                                                         Flights.end_destination == end_destination)
+    if depart_after is not None:
+        query = query.filter(Flights.takeoff_time >= depart_after)
+    if depart_before is not None:
+        query = query.filter(Flights.takeoff_time <= depart_before)
+
+    flights = query.order_by(Flights.takeoff_time).limit(limit).all()
+    return flights
+
+
+@instrumented
 def query_flight_by_flight_number(flight_number):
-    """Retrieves a flight from the database by flight_number (uuid)"""
+    """Retrieves a flight by flight_number (uuid), from the flight cache if possible
+
+    The cache holds detached copies of the flights, which are merged into the session without a query,
+    so the returned flight can be changed or deleted like any other loaded object.
+    Misses are read from the primary, a lagging replica could put a flight back in the cache after a write
+    invalidated it.
+    """
+
+    cached_flight = flight_cache.get(flight_number)
+    if cached_flight is None:
+        flight = db.session.get(Flights, flight_number)
+        if flight is None:
+            return None
+
+        db.session.expunge(flight)
+        flight_cache.set(flight_number, flight)
+        cached_flight = flight
+
+    return db.session.merge(cached_flight, load=False)
+
+
+def invalidate_flight(flight_number):
+    """Removes a flight changed in the current transaction from the flight cache
+
+    The entry is removed straight away and once more when the transaction ends, so a copy of the flight
+    read in between, which may not have been committed, doesn't outlive the transaction.
+    """
+
+    flight_cache.invalidate(flight_number)
+    db.session.info.setdefault(CHANGED_FLIGHTS_KEY, set()).add(flight_number)
 
-    flight = db.session.query(Flights).get(flight_number)
-    return flight
 
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_soft_rollback")
+def invalidate_changed_flights(session, *args):
+    for flight_number in session.info.pop(CHANGED_FLIGHTS_KEY, ()):
+        flight_cache.invalidate(flight_number)
 
+
+@instrumented
+def query_flight_availability(flight_number):
+    """Retrieves the capacity and the free seats of a flight, always from the database
+    Returns:
+        row with capacity and seats_available, or None if the flight doesn't exist
+    """
+
+    availability = on_replica(db.session.query(Flights.capacity, Flights.seats_available)). \
+        filter_by(flight_number=flight_number).first()
+    return availability
+
+
+@instrumented
 def query_passengers_on_flight(flight_number):
     """Retrieve all passengers (users) on a given flight
     Returns:
         list of users
     """
 
-    all_passengers = db.session.query(UserBookings). \
+    all_passengers = on_replica(db.session.query(UserBookings)). \
         join(UserBookings.users). \
         join(UserBookings.flights). \
         with_entities(UserBookings.booking_id,
@@ -38,27 +175,78 @@ def query_passengers_on_flight(flight_number):
     return all_passengers
 
 
+@instrumented
+def query_passengers_stream(flight_number, batch_size=STREAM_BATCH_SIZE):
+    """Retrieve the passengers on a given flight through a server-side cursor, loading batch_size rows at a time
+    Returns:
+        iterable of passenger rows ordered by booking_id
+    """
+
+    return on_replica(db.session.query(UserBookings)). \
+        join(UserBookings.users). \
+        with_entities(UserBookings.booking_id,
+                      Users.id,
+                      Users.email,
+                      Users.first_name,
+                      Users.last_name). \
+        filter(UserBookings.flight_number == flight_number). \
+        order_by(UserBookings.booking_id). \
+        yield_per(batch_size)
+
+
 def db_rollback():
     db.session.rollback()
 
 
-def close_db_session():
-    db.session.close()
+def db_commit():
+    db.session.commit()
+
+
+@instrumented
+def query_existing_flight_keys(keys):
+    """Checks which of the given flights already exist, with one query for all of them
+
+    Parameters:
+        keys: list of (start_destination, end_destination, takeoff_time, landing_time) tuples
+
+    Returns:
+        set of the keys that exist in the database
+    """
+
+    natural_key = tuple_(Flights.start_destination, Flights.end_destination, Flights.takeoff_time,
+                         Flights.landing_time)
+    existing_keys = db.session.query(Flights.start_destination, Flights.end_destination,
+                                     Flights.takeoff_time, Flights.landing_time). \
+        filter(natural_key.in_(keys)).all()
+    return {tuple(key) for key in existing_keys}
+
+
+@instrumented
+def bulk_insert_flights(flights):
+    """Adds a batch of flights to the DB with a single multi-row INSERT
+
+    Parameters:
+        flights: list of dicts with the column values of the flights
+    """
 
+    db.session.execute(insert(Flights), flights)
 
+
+@instrumented
 def add_flight_to_db(flight):
     """Adds the new flight to the DB"""
 
     db.session.add(flight)
-    db.session.commit()
+    db.session.flush()
 
 
+@instrumented
 def edit_flight_data(flight, json_data):
-    """Updates the user with the provided data in the body of the request
+    """Updates the flight with the provided data in the body of the request
 
     Args:
         flight: The Flight obj
-        json_data: The body of the PUT request
+        json_data: The body of the PUT request, with takeoff_time and landing_time parsed to datetime objects
     """
 
     flight.start_destination = json_data.get('start_destination', flight.start_destination)
@@ -66,9 +254,31 @@ def edit_flight_data(flight, json_data):
     flight.takeoff_time = json_data.get('takeoff_time', flight.takeoff_time)
     flight.landing_time = json_data.get('landing_time', flight.landing_time)
     flight.price = json_data.get('price', flight.price)
-    db.session.commit()
+    db.session.flush()
+    invalidate_flight(flight.flight_number)
 
 
+@instrumented
+def update_flight_capacity(flight_number, capacity):
+    """Changes the capacity of the flight and shifts its free seats by the difference, in one conditional UPDATE,
+    so bookings made since the flight was loaded are kept and counted
+    Returns:
+        True - if the capacity was changed,
+        False - if the flight has more booked seats than the new capacity
+    """
+
+    # seats_available is set first, MySQL evaluates the assignments in order and it needs the old capacity
+    result = db.session.execute(
+        update(Flights).
+        where(Flights.flight_number == flight_number, Flights.capacity - Flights.seats_available <= capacity).
+        ordered_values((Flights.seats_available, Flights.seats_available + (capacity - Flights.capacity)),
+                       (Flights.capacity, capacity)),
+        execution_options={"synchronize_session": False})
+    invalidate_flight(flight_number)
+    return result.rowcount == 1
+
+
+@instrumented
 def check_flight_existence(json_data):
     """Checks if a flight with the same start & destination, and takeoff & landing times exist
     Returns:
@@ -88,8 +298,10 @@ def check_flight_existence(json_data):
     return False
 
 
+@instrumented
 def delete_flight_from_db(flight):
-    """Deletes a flight from the database"""
+    """Deletes a flight from the database, its bookings are deleted by the database with ON DELETE CASCADE"""
 
     db.session.delete(flight)
-    db.session.commit()
+    db.session.flush()
+    invalidate_flight(flight.flight_number)
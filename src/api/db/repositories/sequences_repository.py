@@ -0,0 +1,45 @@
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from api.db.database import db
+from api.db.models.sequences_model import Sequences
+from api.utilities.metrics import instrumented
+
+
+@instrumented
+def reserve_sequence_block(name, size):
+    """Reserves the next size values of a sequence, creating the sequence if it doesn't exist yet.
+
+    The reservation is committed on its own connection straight away, so it is never rolled back together
+    with the request that needed it and two workers can never get the same values.
+
+    Returns:
+        the first value of the block, the block is [first, first + size)
+    """
+
+    advance = update(Sequences). \
+        where(Sequences.name == name). \
+        values(next_value=Sequences.next_value + size)
+
+    # The second attempt is for losing the race to create the sequence against another worker
+    for _ in range(2):
+        try:
+            with db.engine.begin() as connection:
+                if connection.dialect.update_returning:
+                    next_value = connection.execute(advance.returning(Sequences.next_value)).scalar()
+                elif connection.execute(advance).rowcount:
+                    # The UPDATE holds the row lock until the commit, so the value read is ours
+                    next_value = connection.execute(
+                        select(Sequences.next_value).where(Sequences.name == name)).scalar()
+                else:
+                    next_value = None
+
+                if next_value is None:
+                    connection.execute(insert(Sequences).values(name=name, next_value=size))
+                    next_value = size
+
+                return next_value - size
+        except IntegrityError:
+            continue
+
+    raise RuntimeError(f"Couldn't reserve values from sequence {name}!")
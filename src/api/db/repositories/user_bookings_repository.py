@@ -1,18 +1,43 @@
 import uuid
 
-from api.db.database import db
+from sqlalchemy import and_, or_, select
+
+from api.db.database import db, on_replica
 from api.db.models.flights_model import Flights
 from api.db.models.user_bookings_model import UserBookings
 from api.db.models.users_model import Users
+from api.db.repositories.flights_repository import invalidate_flight
+from api.utilities.metrics import instrumented
+
+
+@instrumented
+def query_bookings_page(limit, after=None, flight_number=None, start_destination=None, end_destination=None,
+                        depart_after=None, depart_before=None, email_prefix=None):
+    """Retrieve a page of bookings ordered by flight_number and booking_id, optionally filtered
+
+    The filters on the flights and on the users are subqueries, so the flights or users that match are found
+    through their own index first and only their bookings are read:
+        - flight_number: a range of ix_user_bookings_flight_booking
+        - from, to and the takeoff window: ix_flights_route_takeoff_time, or ix_flights_takeoff_time_flight_number
+          for a takeoff window alone, then the bookings of those flights from ix_user_bookings_flight_booking
+        - email: the unique index on users.email, then the bookings of those users from
+          uq_user_bookings_user_flight, which are sorted for the page as they aren't in flight_number order
 
+    Parameters:
+        limit (int): the maximum number of bookings to return
+        after (tuple): the (flight_number, booking_id) of the last booking of the previous page
+        flight_number (str): only bookings for this flight
+        start_destination (str): only bookings for flights taking off from here
+        end_destination (str): only bookings for flights landing here
+        depart_after: only bookings for flights taking off at or after this time
+        depart_before: only bookings for flights taking off at or before this time
+        email_prefix (str): only bookings of users whose email starts with this
 
-def query_all_bookings():
-    """Retrieve all bookings from the database
     Returns:
-            list of all bookings
+            list of bookings
     """
 
-    all_bookings = db.session.query(UserBookings). \
+    query = on_replica(db.session.query(UserBookings)). \
         join(UserBookings.users). \
         join(UserBookings.flights). \
         with_entities(UserBookings.booking_id,
@@ -20,17 +45,44 @@ def query_all_bookings():
                       Flights.price,
                       Users.email,
                       Users.first_name,
-                      Users.last_name).all()
-    return all_bookings
-
-
+                      Users.last_name)
+
+    if flight_number:
+        query = query.filter(UserBookings.flight_number == flight_number)
+
+    flight_filters = []
+    if start_destination:
+        flight_filters.append(Flights.start_destination == start_destination)
+    if end_destination:
+        flight_filters.append(Flights.end_destination == end_destination)
+    if depart_after:
+        flight_filters.append(Flights.takeoff_time >= depart_after)
+    if depart_before:
+        flight_filters.append(Flights.takeoff_time <= depart_before)
+    if flight_filters:
+        query = query.filter(UserBookings.flight_number.in_(select(Flights.flight_number).where(*flight_filters)))
+    if email_prefix:
+        query = query.filter(UserBookings.user_id.in_(
+            select(Users.id).where(Users.email.startswith(email_prefix, autoescape=True))))
+    if after:
+        after_flight_number, after_booking_id = after
+        query = query.filter(or_(UserBookings.flight_number > after_flight_number,
+                                 and_(UserBookings.flight_number == after_flight_number,
+                                      UserBookings.booking_id > after_booking_id)))
+
+    page = query.order_by(UserBookings.flight_number, UserBookings.booking_id).limit(limit).all()
+    return page
+
+
+@instrumented
 def query_booking_by_id(booking_id):
     """Retrieves a booking from the database by uuid"""
 
-    booking = db.session.query(UserBookings).filter_by(booking_id=str(booking_id)).first()
+    booking = on_replica(db.session.query(UserBookings)).filter_by(booking_id=str(booking_id)).first()
     return booking
 
 
+@instrumented
 def query_bookings_by_user_id(user_id):
     """Retrieve all user bookings by user_id
 
@@ -41,7 +93,7 @@ def query_bookings_by_user_id(user_id):
         list of all bookings of a given user
 
     """
-    all_user_bookings = db.session.query(UserBookings). \
+    all_user_bookings = on_replica(db.session.query(UserBookings)). \
         join(UserBookings.users). \
         join(UserBookings.flights). \
         with_entities(UserBookings.booking_id, Flights.flight_number, Flights.start_destination,
@@ -53,37 +105,65 @@ def query_bookings_by_user_id(user_id):
     return all_user_bookings
 
 
-def check_booking_existence(json_data):
-    """Checks if a user has already booked a given flight
+@instrumented
+def claim_seats(flight_number, seats=1):
+    """Takes seats on a flight with a single conditional UPDATE, which only locks the flight row
+    until the booking transaction is committed or rolled back
+
     Returns:
-         True - if the user has already booked the flight,
-         False - if the user hasn't booked the flight
+         True - if the seats were taken,
+         False - if the flight doesn't exist or doesn't have that many seats left
     """
 
-    existing_booking = db.session.query(UserBookings).filter_by(user_id=json_data["user_id"],
-                                                                flight_number=json_data["flight_number"]).all()
-    if existing_booking:
-        return True
+    claimed = db.session.query(Flights). \
+        filter(Flights.flight_number == flight_number, Flights.seats_available >= seats). \
+        update({Flights.seats_available: Flights.seats_available - seats}, synchronize_session=False)
+    return claimed == 1
 
-    return False
 
+@instrumented
+def release_seats(flight_number, seats=1):
+    """Gives seats back to a flight in the current transaction"""
 
+    db.session.query(Flights). \
+        filter(Flights.flight_number == flight_number). \
+        update({Flights.seats_available: Flights.seats_available + seats}, synchronize_session=False)
+
+
+@instrumented
 def delete_booking_from_db(booking):
-    """Deletes a booking from the database"""
+    """Deletes a booking from the database and gives its seat back to the flight"""
 
+    release_seats(booking.flight_number)
     db.session.delete(booking)
-    db.session.commit()
+    db.session.flush()
+    invalidate_flight(booking.flight_number)
 
 
+@instrumented
 def add_booking_to_db(new_booking):
-    """Creates a new booking with the data from the request body and adds it to the database """
+    """Adds the new booking, whose seat is already claimed, to the database
+
+    Raises:
+        IntegrityError: If the user has already booked the flight or the user or the flight don't exist
+    """
 
     db.session.add(new_booking)
-    db.session.commit()
+    db.session.flush()
+    invalidate_flight(new_booking.flight_number)
 
 
-def close_db_session():
-    db.session.close()
+@instrumented
+def add_bookings_to_db(new_bookings):
+    """Adds the bookings of a group, whose seats are already claimed, to the database in one transaction
+
+    Raises:
+        IntegrityError: If any of the users has already booked the flight, in which case none of the bookings is added
+    """
+
+    db.session.add_all(new_bookings)
+    db.session.flush()
+    invalidate_flight(new_bookings[0].flight_number)
 
 
 def db_rollback():
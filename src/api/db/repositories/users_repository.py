@@ -1,17 +1,24 @@
-from api.db.database import db
+from sqlalchemy import select
+
+from api.db.database import db, on_replica
+from api.db.models.flights_model import Flights
+from api.db.models.user_bookings_model import UserBookings
 from api.db.models.users_model import Users
+from api.utilities.metrics import instrumented
 
 
+@instrumented
 def query_all_users():
     """Retrieves all users from the db.
     Returns:
          list of all users
     """
 
-    all_users = db.session.query(Users).all()
+    all_users = on_replica(db.session.query(Users)).all()
     return all_users
 
 
+@instrumented
 def query_user_by_uuid(user_uuid):
     """Retrieves the user from the db by UUID.
 
@@ -19,10 +26,23 @@ def query_user_by_uuid(user_uuid):
         User obj
     """
 
-    user = db.session.query(Users).get(user_uuid)
+    user = on_replica(db.session.query(Users)).get(user_uuid)
     return user
 
 
+@instrumented
+def query_existing_user_ids(user_ids):
+    """Checks which of the given users exist, with a single IN query
+
+    Returns:
+        set of the ids of the users that exist
+    """
+
+    existing_user_ids = db.session.query(Users.id).filter(Users.id.in_(user_ids)).all()
+    return {user_id for user_id, in existing_user_ids}
+
+
+@instrumented
 def query_user_by_email(email):
     """Retrieves the user from the db by email.
 
@@ -30,24 +50,36 @@ def query_user_by_email(email):
         User obj
     """
 
-    user = db.session.query(Users).filter_by(email=email).first()
+    user = on_replica(db.session.query(Users)).filter_by(email=email).first()
     return user
 
 
+@instrumented
 def add_user_to_db(user):
     """Adds the created user object to the database"""
 
     db.session.add(user)
-    db.session.commit()
+    db.session.flush()
 
 
+@instrumented
 def delete_user_from_db(user):
-    """Deletes the user from the database"""
+    """Deletes the user from the database and gives the booked seats back,
+    the bookings themselves are deleted by the database with ON DELETE CASCADE
+
+    The seats are given back with a single UPDATE before the DELETE. Like claim_seats, it leaves the flight
+    cache alone, the free seats are always read with query_flight_availability.
+    """
+
+    db.session.query(Flights). \
+        filter(Flights.flight_number.in_(select(UserBookings.flight_number).where(UserBookings.user_id == user.id))). \
+        update({Flights.seats_available: Flights.seats_available + 1}, synchronize_session=False)
 
     db.session.delete(user)
-    db.session.commit()
+    db.session.flush()
 
 
+@instrumented
 def edit_user_data(user, json_data):
     """Updates the user with the provided data in the body of the request
 
@@ -60,16 +92,13 @@ def edit_user_data(user, json_data):
     user.last_name = json_data.get('last_name', user.last_name)
     user.email = json_data.get('email', user.email)
     user.password = json_data.get('password', user.password)
-    db.session.commit()
+    db.session.flush()
 
 
+@instrumented
 def change_verified_status(user: Users) -> None:
     user.verified = True
-    db.session.commit()
-
-
-def close_db_session():
-    db.session.close()
+    db.session.flush()
 
 
 def db_rollback():
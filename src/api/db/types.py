@@ -0,0 +1,26 @@
+import uuid
+
+from sqlalchemy.types import BINARY, TypeDecorator
+
+
+class BinaryUUID(TypeDecorator):
+    """UUID stored as 16 raw bytes instead of its 36 character string form.
+
+    Values are bound from canonical strings (or uuid.UUID objects) and read back as canonical strings,
+    so the rest of the code keeps working with strings.
+    """
+
+    impl = BINARY(16)
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None or isinstance(value, bytes):
+            return value
+        if not isinstance(value, uuid.UUID):
+            value = uuid.UUID(str(value))
+        return value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return value
+        return str(uuid.UUID(bytes=bytes(value)))
@@ -0,0 +1,65 @@
+import time
+
+from flask import Flask, Response, current_app, jsonify, make_response, request
+
+from api.db.database import READ_REPLICA, WROTE, db
+
+# Cookie with the time until which a client that has written reads from the primary
+READ_PRIMARY_COOKIE = "read_primary_until"
+READ_ONLY_METHODS = ("GET", "HEAD")
+
+
+def writes(view):
+    """Marks a GET view that writes, so it reads from the primary like the views of the other methods"""
+
+    view.writes = True
+    return view
+
+
+class UnitOfWork:
+    """Ends the transaction of every request in one place.
+
+    The repositories only flush their changes, so everything a request writes is committed together after
+    the view returns a successful response, and rolled back if the response is an error. The session itself
+    is removed by Flask-SQLAlchemy when the app context is torn down.
+
+    Read-only requests may read from the replica, except for views marked with @writes and clients that wrote
+    in the last READ_YOUR_WRITES_SECONDS, which read from the primary until the replica has caught up with their
+    changes.
+    """
+
+    @classmethod
+    def init_app(cls, app: Flask) -> None:
+        app.before_request(cls.choose_reads)
+        app.after_request(cls.end_transaction)
+
+    @staticmethod
+    def choose_reads() -> None:
+        try:
+            read_primary_until = float(request.cookies.get(READ_PRIMARY_COOKIE, 0))
+        except ValueError:
+            read_primary_until = 0
+        view = current_app.view_functions.get(request.endpoint)
+        db.session.info[READ_REPLICA] = request.method in READ_ONLY_METHODS and not getattr(view, "writes", False) \
+            and read_primary_until < time.time()
+
+    @staticmethod
+    def end_transaction(response: Response) -> Response:
+        session = db.session()
+        if session.in_transaction():
+            if response.status_code >= 400:
+                session.rollback()
+                return response
+
+            try:
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                return make_response(jsonify({"Message": "Couldn't save the changes. Please try again later!",
+                                              "Error": str(e)}), 500)
+
+        seconds = current_app.config["READ_YOUR_WRITES_SECONDS"]
+        if session.info.get(WROTE) and response.status_code < 400 and seconds > 0:
+            response.set_cookie(READ_PRIMARY_COOKIE, str(time.time() + seconds), max_age=seconds, httponly=True)
+
+        return response
@@ -1,7 +1,7 @@
 from flask import Blueprint
 from flask_expects_json import expects_json
 
-from api.utilities.json_schemas import bookings_schema
+from api.utilities.json_schemas import bookings_schema, group_bookings_schema
 from api.services.bookings_services import *
 from api.utilities.jwt_required_decorators import *
 
@@ -15,10 +15,23 @@ def add_booking_route():
     return add_booking_service(request)
 
 
+@crud_bookings_bp.post("/flights/<string:flight_number>/bookings:batch")
+@admin_required
+@expects_json(group_bookings_schema, check_formats=True)
+def add_group_booking_route(flight_number):
+    return add_group_booking_service(flight_number, request)
+
+
 @crud_bookings_bp.get("/bookings")
 @admin_required
 def get_bookings_route():
-    return get_bookings_service()
+    filters = {"flight_number": request.args.get("flight_number"),
+               "start_destination": request.args.get("from"),
+               "end_destination": request.args.get("to"),
+               "depart_after": request.args.get("depart_after"),
+               "depart_before": request.args.get("depart_before"),
+               "email_prefix": request.args.get("email")}
+    return get_bookings_service(filters, request.args.get("limit", type=int), request.args.get("after"))
 
 
 @crud_bookings_bp.get("/bookings/<uuid:booking_id>")
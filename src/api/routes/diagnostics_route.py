@@ -0,0 +1,27 @@
+from flask import Blueprint
+
+from api.db.pool_metrics import pool_metrics
+from api.db.repositories.flights_repository import flight_cache
+from api.utilities.jwt_required_decorators import admin_required
+from api.utilities.password_hashing import password_hasher
+
+diagnostics_bp = Blueprint("diagnostics", __name__)
+
+
+@diagnostics_bp.get("/diagnostics/cache")
+@admin_required
+def get_cache_stats_route():
+    return {"Flight cache": flight_cache.stats()}, 200
+
+
+@diagnostics_bp.get("/diagnostics/pool")
+@admin_required
+def get_pool_stats_route():
+    return {"Connection pools": {bind_key or "default": metrics.stats()
+                                 for bind_key, metrics in pool_metrics.items()}}, 200
+
+
+@diagnostics_bp.get("/diagnostics/password_hashing")
+@admin_required
+def get_password_hashing_stats_route():
+    return {"Password hashing": password_hasher.stats()}, 200
@@ -1,8 +1,11 @@
 from flask import Blueprint, request
 from flask_expects_json import expects_json
 from api.services.flights_services import *
+from api.services.bulk_flights_service import bulk_add_flights_service
+from api.services.connections_service import search_connections_service
 from api.utilities.jwt_required_decorators import admin_required
 from api.utilities.json_schemas import flights_schema, update_flight_schema
+from api.utilities.query_counter import query_budget
 
 crud_flights_bp = Blueprint("flights", __name__)
 
@@ -14,10 +17,37 @@ def add_flight_route():
     return add_flight_service(request)
 
 
+@crud_flights_bp.post("/flights/bulk")
+# Two statements per batch, so the count grows with the upload
+@query_budget(None)
+@admin_required
+def bulk_add_flights_route():
+    return bulk_add_flights_service(request, request.args.get("batch_size", type=int))
+
+
 @crud_flights_bp.get("/flights")
 @admin_required
 def get_flights_route():
-    return get_flights_service()
+    if request.accept_mimetypes.best_match(["application/json", "application/x-ndjson"]) == "application/x-ndjson":
+        return stream_flights_service()
+
+    return get_flights_service(request.args.get("limit", type=int), request.args.get("after"))
+
+
+@crud_flights_bp.get("/flights/search")
+@admin_required
+def search_flights_route():
+    return search_flights_service(request.args.get("from"), request.args.get("to"),
+                                  request.args.get("depart_after"), request.args.get("depart_before"),
+                                  request.args.get("limit", type=int))
+
+
+@crud_flights_bp.get("/flights/connections")
+@admin_required
+def search_connections_route():
+    return search_connections_service(request.args.get("from"), request.args.get("to"),
+                                      request.args.get("depart_after"), request.args.get("depart_before"),
+                                      request.args.get("mode", "earliest"), request.args.get("max_stops", type=int))
 
 
 @crud_flights_bp.get("/flights/<flight_number>")
@@ -26,9 +56,19 @@ def get_flight_route(flight_number):
     return get_flight_service(flight_number)
 
 
+@crud_flights_bp.get("/flights/<string:flight_number>/availability")
+@admin_required
+def get_flight_availability_route(flight_number):
+    return get_flight_availability_service(flight_number)
+
+
 @crud_flights_bp.get("/flights/<string:flight_number>/passengers")
 @admin_required
 def get_flight_passengers_route(flight_number):
+    mimetype = request.accept_mimetypes.best_match(["application/json", "text/csv", "application/x-ndjson"])
+    if mimetype in ("text/csv", "application/x-ndjson"):
+        return stream_flight_passengers_service(flight_number, mimetype)
+
     return get_flight_passengers_service(flight_number)
 
 
@@ -38,7 +78,7 @@ def delete_flight_route(flight_number):
     return delete_flight_service(flight_number)
 
 
-@crud_flights_bp.put("/flights/<string:flight_number_uuid>")
+@crud_flights_bp.put("/flights/<string:flight_number>")
 @admin_required
 @expects_json(update_flight_schema, check_formats=True)
 def update_flight_route(flight_number):
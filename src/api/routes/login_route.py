@@ -1,11 +1,11 @@
 from dotenv import load_dotenv
 from flask import Blueprint, request, render_template, make_response
-from flask_bcrypt import check_password_hash
 from werkzeug.exceptions import InternalServerError
 
 from api.db.repositories.users_repository import query_user_by_email
 from api.services.users_services import validate_data
 from api.utilities.jwt_creation import create_auth_jwt
+from api.utilities.password_hashing import PasswordHasherBusy, password_hasher
 
 login_bp = Blueprint("login", __name__)
 load_dotenv()
@@ -24,6 +24,8 @@ def login_users():
 
     except ValueError as e:
         return render_template('login.html', msg=str(e)), 400
+    except PasswordHasherBusy as e:
+        return render_template('login.html', msg=str(e)), 503, {"Retry-After": "1"}
     except Exception as e:
         raise InternalServerError(f'Login failed! Please try again later!, Error: {str(e)}')
 
@@ -42,7 +44,7 @@ def validate_user(raw_password, user):
     if user:
         hashed_user_password = user.password
 
-        if check_password_hash(hashed_user_password, raw_password):
+        if password_hasher.check(hashed_user_password, raw_password):
             token = create_auth_jwt(user, raw_password)
             resp = make_response(render_template('login.html', msg=str(token)))
             resp.set_cookie("token", token, httponly=True, secure=True, samesite="Strict")
@@ -9,8 +9,9 @@ from werkzeug.exceptions import InternalServerError
 
 from api.services.users_services import create_user_service, add_user_to_db
 from api.utilities.utils import handle_integrity_error
-from api.db.database import db
+from api.db.database import after_commit, db
 from api.services.mailer_service import MailerService
+from api.utilities.password_hashing import PasswordHasherBusy
 
 register_bp = Blueprint("register", __name__)
 
@@ -21,19 +22,19 @@ def register_user():
         data = request.form
         new_user = create_user_service(data)
         add_user_to_db(new_user)
-        MailerService.send_verification_email(new_user)
+        after_commit(MailerService.send_verification_email, new_user)
         return render_template('register.html', msg="New user added to DB!"), 200
     except ValueError as e:
         # Handle validation errors.
         return render_template('register.html', msg=str(e)), 400
+    except PasswordHasherBusy as e:
+        return render_template('register.html', msg=str(e)), 503, {"Retry-After": "1"}
     except IntegrityError as e:
         db.session.rollback()
         return handle_integrity_error(e)
     except Exception as e:
         # Handle any other exceptions and errors
         raise InternalServerError(f'Registration failed! Please try again later!, Error: {str(e)}')
-    finally:
-        db.session.close()
 
 
 @register_bp.get("/register")
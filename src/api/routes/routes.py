@@ -2,7 +2,9 @@ from typing import List
 
 from flask import Flask, Blueprint
 
+from api.db.unit_of_work import UnitOfWork
 from api.routes.bookings_route import crud_bookings_bp
+from api.routes.diagnostics_route import diagnostics_bp
 from api.routes.flights_route import crud_flights_bp
 from api.routes.login_route import login_bp
 from api.routes.register_route import register_bp
@@ -17,10 +19,12 @@ class Routes:
         crud_flights_bp,
         crud_bookings_bp,
         login_bp,
-        verification_bp
+        verification_bp,
+        diagnostics_bp
     ]
 
     @classmethod
     def register_blueprints(cls, app: Flask) -> None:
         for blueprint in cls._blueprints:
             app.register_blueprint(blueprint)
+        UnitOfWork.init_app(app)
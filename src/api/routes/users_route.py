@@ -27,7 +27,7 @@ def get_user_route(user_uuid):
 @rud_users_bp.delete("/users/<uuid:user_uuid>")
 @admin_required
 def delete_user_route(user_uuid):
-    delete_user_service(user_uuid)
+    return delete_user_service(user_uuid)
 
 
 @rud_users_bp.put("/users/<uuid:user_uuid>")
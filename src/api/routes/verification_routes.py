@@ -1,10 +1,13 @@
 from flask import Blueprint, request
 
+from api.db.unit_of_work import writes
 from api.services.verification_service import Verification
 
 verification_bp = Blueprint("verification", __name__)
 
+# The link in the verification email can only be a GET, but it marks the user as verified
 @verification_bp.get("/verify")
+@writes
 def verify_user_route():
     verification_token = request.args["token"]
     return Verification.verify_user(verification_token)
\ No newline at end of file
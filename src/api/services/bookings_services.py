@@ -1,86 +1,174 @@
 from sqlalchemy.exc import IntegrityError
 
-from api.services.flights_services import query_flight_by_flight_number
+from api.db.repositories.flights_repository import query_flight_by_flight_number
+from api.db.repositories.users_repository import query_existing_user_ids
 from api.services.users_services import get_user_by_uuid_service
-from api.utilities.utils import handle_integrity_error
+from api.utilities.ids import new_id
+from api.utilities.pagination import clamp_limit, decode_cursor, encode_cursor
+from api.utilities.utils import canonical_uuid, handle_integrity_error, is_duplicate_key_error, \
+    is_foreign_key_error, is_uuid, parse_datetime, row_to_json
 from api.db.repositories.user_bookings_repository import *
+from api.utilities.tracing import traced
 
 
+@traced("service")
 def add_booking_service(request):
     """Returns JSON formatted response containing a success message if the new booking was added to the DB
-     or an error message along with corresponding status codes"""
+     or an error message along with corresponding status codes
+
+    The seat is claimed with one conditional UPDATE and the booking is inserted straight away: the foreign keys
+    and the unique (user_id, flight_number) constraint detect missing users and repeated bookings, in which case
+    the rollback gives the seat back."""
 
     try:
         json_data = request.json
+        if not claim_seats(json_data["flight_number"]):
+            db_rollback()
+            return handle_unclaimed_seat(json_data["flight_number"])
 
-        user = get_user_by_uuid_service(json_data['user_id'])
-        flight = query_flight_by_flight_number(json_data["flight_number"])
+        new_booking = create_booking(json_data)
+        add_booking_to_db(new_booking)
+        return {"Message": "New booking added to DB!"}, 200
+
+    except IntegrityError as e:
+        db_rollback()
+        return handle_booking_integrity_error(e, json_data)
+    except Exception as e:
+        return {"Message": f"Couldn't create a new booking. Please try again later!", "Error": str(e)}, 500
 
-        return validate_and_add_booking(user, flight, json_data)
+
+@traced("service")
+def add_group_booking_service(flight_number, request):
+    """Returns JSON formatted response containing the ids of the new bookings if all the users were booked onto
+     the flight or an error message along with corresponding status codes
+
+    All the users are checked with one query, the seats are claimed with one conditional UPDATE and the bookings
+    are inserted in the same transaction, so either every user of the group is booked or none is."""
+
+    try:
+        # The schema accepts any spelling of a UUID, the ids read back from the DB are in the canonical one
+        user_ids = [canonical_uuid(user_id) for user_id in request.json["user_ids"]]
+        missing_user_ids = set(user_ids) - query_existing_user_ids(user_ids)
+        if missing_user_ids:
+            return {"Message": "Some of the users don't exist in the DB!",
+                    "Missing users": sorted(missing_user_ids)}, 404
+
+        if not claim_seats(flight_number, len(user_ids)):
+            db_rollback()
+            return handle_unclaimed_seat(flight_number, len(user_ids))
+
+        new_bookings = [create_booking({"user_id": user_id, "flight_number": flight_number}) for user_id in user_ids]
+        # Read before the commit at the end of the request expires the objects, which would reload every booking
+        booked = [{"booking_id": booking.booking_id, "user_id": booking.user_id} for booking in new_bookings]
+        add_bookings_to_db(new_bookings)
+        return {"Message": f"{len(new_bookings)} new bookings added to DB!", "Bookings": booked}, 200
 
     except IntegrityError as e:
         db_rollback()
+        if is_duplicate_key_error(e):
+            return {"Message": f"Some of the users have already booked flight {flight_number}!"}, 409
+        if is_foreign_key_error(e):
+            return {"Message": "Some of the users don't exist in the DB!"}, 404
         return handle_integrity_error(e)
     except Exception as e:
-        return {"Message": f"Couldn't create a new booking. Please try again later!", "Error": str(e)}, 500
-    finally:
-        close_db_session()
+        db_rollback()
+        return {"Message": f"Couldn't create the group booking. Please try again later!", "Error": str(e)}, 500
 
 
 def create_booking(json_data):
     """Creates a new booking with the data from the request body"""
 
-    new_booking = UserBookings(booking_id=uuid.uuid4(), user_id=json_data["user_id"],
+    new_booking = UserBookings(booking_id=new_id(), user_id=json_data["user_id"],
                                flight_number=json_data["flight_number"])
     return new_booking
 
 
-def validate_and_add_booking(user, flight, json_data):
-    """Checks if user, flight and booking exist
-    Args:
-        flight: retrieved flight obj from the database
-        user: retrieved user obj from the database
-        json_data: body of the post request
+def handle_unclaimed_seat(flight_number, seats=1):
+    """Returns the response for a booking whose seats couldn't be claimed
+    Returns:
+        - 404 status code if the flight doesn't exist
+        - 409 status code if the flight is sold out or doesn't have enough seats left for a group
+    """
+
+    if query_flight_by_flight_number(flight_number) is None:
+        return {"Message": f"Flight with number: {flight_number} doesn't exist in the DB!"}, 404
+
+    if seats > 1:
+        return {"Message": f"Flight with number: {flight_number} doesn't have {seats} seats left!"}, 409
+
+    return {"Message": f"Flight with number: {flight_number} is sold out!"}, 409
+
+
+def handle_booking_integrity_error(e, json_data):
+    """Maps the constraint violated by a booking insert to the response for it
     Returns:
-        - 200 status code, if booking is created
         - 409 status code if user has already booked that flight
         - 404 status code if user or flight doesn't exist
     """
-    if user is None:
-        return {"Message": f"User with uuid {json_data['user_id']} doesn't exist in the DB!"}, 404
-
-    if flight is None:
-        return {"Message": f"Flight with number: {json_data['flight_number']} doesn't exist in the DB!"}, 404
 
-    if check_booking_existence(json_data):
-        return {
-            "Message": f"User with uuid {json_data['user_id']} has already booked flight {flight.flight_number}!"}, 409
+    if is_duplicate_key_error(e):
+        return {"Message": f"User with uuid {json_data['user_id']} has already booked flight "
+                           f"{json_data['flight_number']}!"}, 409
 
-    new_booking = create_booking(json_data)
-    add_booking_to_db(new_booking)
-    return {"Message": "New booking added to DB!"}, 200
+    if is_foreign_key_error(e):
+        error_message = str(e.orig)
+        if "REFERENCES `users`" in error_message:
+            return {"Message": f"User with uuid {json_data['user_id']} doesn't exist in the DB!"}, 404
+        if "REFERENCES `flights`" in error_message:
+            return {"Message": f"Flight with number: {json_data['flight_number']} doesn't exist in the DB!"}, 404
 
+        return {"Message": f"User with uuid {json_data['user_id']} or flight with number: "
+                           f"{json_data['flight_number']} doesn't exist in the DB!"}, 404
 
-def get_bookings_service():
-    """Returns JSON formatted response containing bookings data or an error message along with
-    corresponding status codes"""
+    return handle_integrity_error(e)
 
-    try:
-        all_bookings = query_all_bookings()
 
-        if all_bookings:
-            # When querying individual rows the row is a KeyedTuple which has an _asdict method
-            bookings = [booking._asdict() for booking in all_bookings]
-            return {"All bookings": bookings}, 200
+@traced("service")
+def get_bookings_service(filters=None, limit=None, after=None):
+    """Returns JSON formatted response containing a page of bookings data or an error message along with
+    corresponding status codes
 
-        return {"Message": "The bookings table is empty"}, 404
+    Parameters:
+        filters (dict): any of flight_number, start_destination, end_destination, depart_after, depart_before
+            ("YYYY-MM-DD HH:MM") and email_prefix
+        limit (int): the maximum number of bookings on the page
+        after (str): the cursor returned as "Next" by the previous page
+    """
 
+    try:
+        filters = {key: value for key, value in (filters or {}).items() if value}
+        for key in ("depart_after", "depart_before"):
+            if key in filters:
+                filters[key] = parse_datetime(filters[key], key, end_of_day=key == "depart_before")
+
+        limit = clamp_limit(limit)
+        after_key = tuple(decode_cursor(after, 2)) if after else None
+        if after_key and not is_uuid(after_key[1]):
+            raise ValueError("Invalid pagination cursor!")
+
+        # Fetch one extra row to find out if there is a next page
+        bookings = query_bookings_page(limit + 1, after_key, **filters)
+        page = bookings[:limit]
+
+        if not page and after_key is None:
+            if filters:
+                return {"Message": "There are no bookings matching the filters"}, 404
+            return {"Message": "The bookings table is empty"}, 404
+
+        next_cursor = None
+        if len(bookings) > limit:
+            next_cursor = encode_cursor(page[-1].flight_number, page[-1].booking_id)
+
+        # When querying individual rows the row is a KeyedTuple which has an _asdict method
+        return {"All bookings": [booking._asdict() for booking in page], "Next": next_cursor}, 200
+
+    except ValueError as e:
+        return {"Message": str(e)}, 400
     except Exception as e:
         return {"Message": "Couldn't retrieve bookings from DB!", "Error": str(e)}, 500
-    finally:
-        close_db_session()
 
 
+@traced("service")
 def get_booking_service(booking_id):
     """Returns JSON formatted response containing booking data or an error message along with
     corresponding status codes"""
@@ -93,10 +181,9 @@ def get_booking_service(booking_id):
         return {"Message": f"Booking with uuid {booking_id} doesn't exist in the DB!"}, 404
     except Exception as e:
         return {"Message": f"Couldn't retrieve Booking with uuid {booking_id} from DB!", "Error": str(e)}, 500
-    finally:
-        close_db_session()
 
 
+@traced("service")
 def get_user_bookings_service(user_id):
     """Returns JSON formatted response containing the bookings of a given user or an error message along with
     corresponding status codes"""
@@ -107,7 +194,7 @@ def get_user_bookings_service(user_id):
             all_user_bookings = query_bookings_by_user_id(user_id)
             if all_user_bookings:
                 # When querying individual rows the row is a KeyedTuple which has an _asdict method
-                user_bookings = [booking._asdict() for booking in all_user_bookings]
+                user_bookings = [row_to_json(booking) for booking in all_user_bookings]
                 return {"User's Bookings": user_bookings}, 200
 
             return {"Message": f"User with uuid {user_id} has not booked any flights!"}, 404
@@ -115,10 +202,9 @@ def get_user_bookings_service(user_id):
         return {"Message": f"User with uuid {user_id} doesn't exist in the DB!"}, 404
     except Exception as e:
         return {"Message": "Couldn't retrieve user's bookings from DB!", "Error": str(e)}, 500
-    finally:
-        close_db_session()
 
 
+@traced("service")
 def delete_booking_service(booking_id):
     """Returns JSON formatted response containing a success message if the booking was deleted from the DB
      or an error message along with corresponding status codes"""
@@ -134,8 +220,6 @@ def delete_booking_service(booking_id):
     except Exception as e:
         db_rollback()
         return {"Message": f"Couldn't delete booking with uuid {booking_id} from DB!", "Error": str(e)}, 500
-    finally:
-        close_db_session()
 
 # We don't have an update_service as in the other files,
 # because we decided that the booking would be immutable,
@@ -0,0 +1,192 @@
+import csv
+import io
+import json
+
+from flask import current_app
+from jsonschema import Draft7Validator
+from sqlalchemy.exc import IntegrityError
+
+from api.db.repositories.flights_repository import bulk_insert_flights, query_existing_flight_keys, db_commit, \
+    db_rollback
+from api.services.connections_service import flight_graph
+from api.services.flights_services import new_flight_values, parse_flight_times
+from api.utilities.json_schemas import flights_schema
+from api.utilities.tracing import traced
+
+CSV_MIMETYPES = ("text/csv", "application/csv")
+NDJSON_MIMETYPES = ("application/x-ndjson", "application/jsonl", "application/json-lines")
+MAX_REPORTED_ERRORS = 1000
+
+flights_validator = Draft7Validator(flights_schema, format_checker=Draft7Validator.FORMAT_CHECKER)
+
+
+def open_upload(request):
+    """Returns the uploaded file as a text stream along with its format ("csv" or "ndjson").
+    The file is either the body of the request or the "file" field of a multipart form
+
+    Raises:
+        ValueError: If the format of the upload is not supported
+    """
+
+    if request.mimetype == "multipart/form-data":
+        upload = request.files.get("file")
+        if upload is None:
+            raise ValueError("The multipart form must contain a file field!")
+        mimetype, stream = upload.mimetype, upload.stream
+        if upload.filename.endswith(".csv"):
+            mimetype = "text/csv"
+        elif upload.filename.endswith((".ndjson", ".jsonl")):
+            mimetype = "application/x-ndjson"
+    else:
+        mimetype, stream = request.mimetype, request.stream
+
+    if mimetype in CSV_MIMETYPES:
+        upload_format = "csv"
+    elif mimetype in NDJSON_MIMETYPES:
+        upload_format = "ndjson"
+    else:
+        raise ValueError("Upload the flights as text/csv or application/x-ndjson!")
+
+    return io.TextIOWrapper(stream, encoding="utf-8", newline=""), upload_format
+
+
+def read_rows(text_stream, upload_format):
+    """Yields (row_number, row) for every flight in the upload, without reading the whole upload in memory.
+    Rows that can't be parsed are yielded as exceptions"""
+
+    if upload_format == "csv":
+        for row_number, row in enumerate(csv.DictReader(text_stream), start=1):
+            yield row_number, convert_csv_row(row)
+        return
+
+    for row_number, line in enumerate(text_stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except ValueError as e:
+            yield row_number, ValueError(f"Invalid JSON: {e}")
+
+
+def convert_csv_row(row):
+    """Converts the numeric columns of a CSV row, which are read as strings"""
+
+    try:
+        flight = {key: value for key, value in row.items() if value not in (None, "")}
+        if "price" in flight:
+            flight["price"] = float(flight["price"])
+        if "capacity" in flight:
+            flight["capacity"] = int(flight["capacity"])
+        return flight
+    except (TypeError, ValueError) as e:
+        return ValueError(f"Invalid number: {e}")
+
+
+def validate_row(row):
+    """Validates a row against flights_schema and returns it with the times parsed
+
+    Raises:
+        ValueError: If the row is not a valid flight
+    """
+
+    if isinstance(row, Exception):
+        raise row
+
+    error = next(iter(flights_validator.iter_errors(row)), None)
+    if error is not None:
+        raise ValueError(error.message)
+
+    return parse_flight_times(row)
+
+
+def natural_key(flight):
+    return flight["start_destination"], flight["end_destination"], flight["takeoff_time"], flight["landing_time"]
+
+
+def insert_batch(batch, report):
+    """Inserts the flights of the batch that are not in the DB yet and records the outcome in the report
+
+    Unlike the other services, which leave the commit to the unit of work, every batch is committed here as a
+    transaction of its own, so a large upload doesn't hold one long transaction. A batch that fails is rolled
+    back and reported row by row, the batches committed before it stay.
+    """
+
+    existing_keys = query_existing_flight_keys([natural_key(flight) for _, flight in batch])
+    new_flights = []
+    for row_number, flight in batch:
+        if natural_key(flight) in existing_keys:
+            report["Duplicates"] += 1
+        else:
+            new_flights.append((row_number, flight))
+
+    if not new_flights:
+        return
+
+    try:
+        bulk_insert_flights([flight for _, flight in new_flights])
+        db_commit()
+        report["Inserted"] += len(new_flights)
+        # The graph is reloaded on the next search, after every committed batch in case a later one raises
+        flight_graph.invalidate()
+    except IntegrityError as e:
+        db_rollback()
+        for row_number, _ in new_flights:
+            add_error(report, row_number, f"The batch of this row couldn't be inserted: {e.orig}")
+
+
+def add_error(report, row_number, message):
+    report["Failed"] += 1
+    if len(report["Errors"]) < MAX_REPORTED_ERRORS:
+        report["Errors"].append({"row": row_number, "Error": message})
+
+
+@traced("service")
+def bulk_add_flights_service(request, batch_size=None):
+    """Returns JSON formatted response containing a report of the flights added from a CSV or NDJSON upload
+    or an error message along with corresponding status codes
+
+    The upload is read as a stream and every row is validated against flights_schema. Rows that repeat a flight
+    (same destinations, takeoff and landing time) from earlier in the upload or from the DB are skipped, the rest
+    are inserted with one multi-row INSERT per batch of batch_size flights, each batch committed on its own
+    (see insert_batch).
+    """
+
+    try:
+        max_batch_size = current_app.config["BULK_INSERT_BATCH_SIZE"]
+        batch_size = min(batch_size or max_batch_size, max_batch_size)
+        if batch_size < 1:
+            return {"Message": "batch_size must be a positive integer!"}, 400
+
+        text_stream, upload_format = open_upload(request)
+        report = {"Inserted": 0, "Duplicates": 0, "Failed": 0, "Errors": []}
+        seen_keys = set()
+        batch = []
+
+        for row_number, row in read_rows(text_stream, upload_format):
+            try:
+                flight = new_flight_values(validate_row(row))
+            except ValueError as e:
+                add_error(report, row_number, str(e))
+                continue
+
+            key = natural_key(flight)
+            if key in seen_keys:
+                report["Duplicates"] += 1
+                continue
+            seen_keys.add(key)
+
+            batch.append((row_number, flight))
+            if len(batch) >= batch_size:
+                insert_batch(batch, report)
+                batch = []
+
+        if batch:
+            insert_batch(batch, report)
+
+        return report, 200
+
+    except ValueError as e:
+        return {"Message": str(e)}, 400
+    except Exception as e:
+        db_rollback()
+        return {"Message": "Couldn't import the flights. Please try again later!", "Error": str(e)}, 500
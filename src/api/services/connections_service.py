@@ -0,0 +1,282 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from datetime import timedelta
+
+from flask import current_app
+
+from api.db.repositories.flights_repository import query_flight_legs_stream
+from api.utilities.utils import DATETIME_FORMAT, parse_datetime
+from api.utilities.tracing import traced
+
+Leg = namedtuple("Leg", ["flight_number", "start_destination", "end_destination",
+                         "takeoff_time", "landing_time", "price"])
+
+
+def leg_from_flight(flight):
+    """Copies the fields the graph needs out of a Flights obj or row, so the graph never holds ORM objects"""
+
+    return Leg(flight.flight_number, flight.start_destination, flight.end_destination,
+               flight.takeoff_time, flight.landing_time, flight.price)
+
+
+class FlightGraph:
+    """Time-expanded adjacency index of all flights.
+
+    Every airport keeps its departures sorted by (takeoff_time, flight_number), so the flights that can
+    be boarded in a time window are found with a binary search. The graph is built from the DB on first
+    use, kept in sync by the flights services after every committed write and rebuilt once it is older than
+    max_age seconds, which picks up flights written by other worker processes.
+    """
+
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        # Held by the one thread that reloads the graph from the DB
+        self._reload_lock = threading.Lock()
+        self._loaded_at = None
+        self._legs = {}
+        self._departures = {}
+        self._departure_keys = {}
+
+    @property
+    def loaded(self):
+        return self._loaded_at is not None
+
+    def load(self, flights):
+        """Replaces the contents of the graph with the given flights"""
+
+        legs, departures = {}, {}
+        for flight in flights:
+            leg = leg_from_flight(flight)
+            legs[leg.flight_number] = leg
+            departures.setdefault(leg.start_destination, []).append(leg)
+
+        for airport_departures in departures.values():
+            airport_departures.sort(key=lambda leg: (leg.takeoff_time, leg.flight_number))
+
+        with self._lock:
+            self._legs = legs
+            self._departures = departures
+            self._departure_keys = {airport: [(leg.takeoff_time, leg.flight_number) for leg in airport_departures]
+                                    for airport, airport_departures in departures.items()}
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self):
+        """Makes the next search reload the graph from the DB, used after writes too big to apply one by one"""
+
+        if self.loaded:
+            self._loaded_at = float("-inf")
+
+    def _is_fresh(self):
+        return self.loaded and time.monotonic() - self._loaded_at < self.max_age
+
+    def ensure_fresh(self):
+        """Loads the graph from the DB if it was never loaded or is older than max_age
+
+        Only one thread reloads it at a time. While a stale graph is being reloaded the other threads search
+        it as it is instead of waiting, only a graph that was never loaded is waited for.
+        """
+
+        if self._is_fresh():
+            return
+
+        if not self._reload_lock.acquire(blocking=not self.loaded):
+            return
+        try:
+            # Another thread may have reloaded it while this one waited for the lock
+            if not self._is_fresh():
+                self.load(query_flight_legs_stream())
+        finally:
+            self._reload_lock.release()
+
+    def upsert(self, flight):
+        """Adds a new flight to the graph or moves an existing one to its new place"""
+
+        if not self.loaded:
+            return
+
+        leg = leg_from_flight(flight)
+        with self._lock:
+            self._discard(leg.flight_number)
+            key = (leg.takeoff_time, leg.flight_number)
+            keys = self._departure_keys.setdefault(leg.start_destination, [])
+            index = bisect_left(keys, key)
+            keys.insert(index, key)
+            self._departures.setdefault(leg.start_destination, []).insert(index, leg)
+            self._legs[leg.flight_number] = leg
+
+    def remove(self, flight_number):
+        """Removes a flight from the graph"""
+
+        if not self.loaded:
+            return
+
+        with self._lock:
+            self._discard(flight_number)
+
+    def _discard(self, flight_number):
+        leg = self._legs.pop(flight_number, None)
+        if leg is None:
+            return
+
+        keys = self._departure_keys[leg.start_destination]
+        index = bisect_left(keys, (leg.takeoff_time, leg.flight_number))
+        del keys[index]
+        del self._departures[leg.start_destination][index]
+
+    def departures(self, airport, earliest, latest):
+        """Returns the flights leaving the airport with earliest <= takeoff_time <= latest"""
+
+        with self._lock:
+            keys = self._departure_keys.get(airport)
+            if not keys:
+                return []
+            start = bisect_left(keys, (earliest,))
+            end = bisect_right(keys, (latest, chr(0x10FFFF)))
+            return self._departures[airport][start:end]
+
+    def earliest_arrival(self, origin, destination, depart_after, depart_before, max_stops,
+                         min_connection, max_layover):
+        """Finds the itinerary that lands at the destination first.
+
+        A Dijkstra search over flights ordered by landing_time: the first time a flight to the
+        destination is taken off the heap, no other itinerary can land earlier.
+
+        Returns:
+            list of legs, or None if there is no such itinerary
+        """
+
+        heap = [(leg.landing_time, leg.flight_number, 0, (leg,))
+                for leg in self.departures(origin, depart_after, depart_before)]
+        heapq.heapify(heap)
+        fewest_stops = {}
+
+        while heap:
+            landing_time, flight_number, stops, path = heapq.heappop(heap)
+            if fewest_stops.get(flight_number, max_stops + 1) <= stops:
+                continue
+            fewest_stops[flight_number] = stops
+
+            leg = path[-1]
+            if leg.end_destination == destination:
+                return list(path)
+            if stops == max_stops:
+                continue
+
+            for connection in self.departures(leg.end_destination, landing_time + min_connection,
+                                              landing_time + max_layover):
+                if connection.end_destination != origin:
+                    heapq.heappush(heap, (connection.landing_time, connection.flight_number,
+                                          stops + 1, path + (connection,)))
+
+        return None
+
+    def cheapest(self, origin, destination, depart_after, depart_before, max_stops,
+                 min_connection, max_layover):
+        """Finds the cheapest itinerary with at most max_stops stops.
+
+        A best-first search ordered by total price. Prices are never negative, so the first itinerary
+        taken off the heap that reaches the destination is the cheapest one.
+
+        Returns:
+            list of legs, or None if there is no such itinerary
+        """
+
+        heap = [(leg.price, 0, leg.landing_time, leg.flight_number, (leg,))
+                for leg in self.departures(origin, depart_after, depart_before)]
+        heapq.heapify(heap)
+        settled = {}
+
+        while heap:
+            price, stops, landing_time, flight_number, path = heapq.heappop(heap)
+            # A flight reached before was reached at a lower price, so only fewer stops make it worth expanding
+            if settled.get(flight_number, max_stops + 1) <= stops:
+                continue
+            settled[flight_number] = stops
+
+            leg = path[-1]
+            if leg.end_destination == destination:
+                return list(path)
+            if stops == max_stops:
+                continue
+
+            for connection in self.departures(leg.end_destination, landing_time + min_connection,
+                                              landing_time + max_layover):
+                if connection.end_destination != origin:
+                    heapq.heappush(heap, (price + connection.price, stops + 1, connection.landing_time,
+                                          connection.flight_number, path + (connection,)))
+
+        return None
+
+
+flight_graph = FlightGraph()
+
+
+def itinerary_to_json(legs):
+    """Returns the JSON representation of an itinerary"""
+
+    return {
+        "legs": [{
+            "flight_number": leg.flight_number,
+            "start_destination": leg.start_destination,
+            "end_destination": leg.end_destination,
+            "takeoff_time": leg.takeoff_time.strftime(DATETIME_FORMAT),
+            "landing_time": leg.landing_time.strftime(DATETIME_FORMAT),
+            "price": leg.price
+        } for leg in legs],
+        "stops": len(legs) - 1,
+        "price": round(sum(leg.price for leg in legs), 2),
+        "duration_minutes": int((legs[-1].landing_time - legs[0].takeoff_time).total_seconds() // 60)
+    }
+
+
+@traced("service")
+def search_connections_service(start_destination, end_destination, depart_after, depart_before=None,
+                               mode="earliest", max_stops=None):
+    """Returns JSON formatted response containing the best itinerary between two destinations
+    or an error message along with corresponding status codes
+
+    Parameters:
+        start_destination (str): where the itinerary starts
+        end_destination (str): where the itinerary ends
+        depart_after (str): the earliest takeoff time of the first leg
+        depart_before (str): the latest takeoff time of the first leg, defaults to a day after depart_after
+        mode (str): "earliest" for the earliest arrival or "cheapest" for the lowest total price
+        max_stops (int): the maximum number of stops between the legs
+    """
+
+    try:
+        if not start_destination or not end_destination or not depart_after:
+            return {"Message": "from, to and depart_after must be provided!"}, 400
+        if mode not in ("earliest", "cheapest"):
+            return {"Message": "mode must be either earliest or cheapest!"}, 400
+
+        config = current_app.config
+        if max_stops is None:
+            max_stops = config["CONNECTION_MAX_STOPS"]
+        if max_stops < 0:
+            return {"Message": "max_stops cannot be negative!"}, 400
+
+        depart_after = parse_datetime(depart_after, "depart_after")
+        depart_before = parse_datetime(depart_before, "depart_before", end_of_day=True) if depart_before \
+            else depart_after + timedelta(days=1)
+
+        flight_graph.max_age = config["CONNECTION_GRAPH_MAX_AGE"]
+        flight_graph.ensure_fresh()
+
+        search = flight_graph.earliest_arrival if mode == "earliest" else flight_graph.cheapest
+        legs = search(start_destination, end_destination, depart_after, depart_before, max_stops,
+                      timedelta(minutes=config["MIN_CONNECTION_MINUTES"]),
+                      timedelta(hours=config["MAX_LAYOVER_HOURS"]))
+        if legs:
+            return {"Itinerary": itinerary_to_json(legs)}, 200
+
+        return {"Message": f"There are no connections from {start_destination} to {end_destination} "
+                           f"in the given period!"}, 404
+    except ValueError as e:
+        return {"Message": str(e)}, 400
+    except Exception as e:
+        return {"Message": "Couldn't search for connections!", "Error": str(e)}, 500
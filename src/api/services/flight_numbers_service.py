@@ -0,0 +1,63 @@
+import string
+import threading
+
+from flask import current_app
+
+from api.db.repositories.sequences_repository import reserve_sequence_block
+
+FLIGHT_NUMBER_SEQUENCE = "flight_number"
+
+# Flight numbers are 6 characters. The older ones are 6 random hex digits, so allocated numbers start with
+# one of the letters after F and can never collide with them, followed by 5 base 36 digits
+FIRST_CHARACTERS = string.ascii_uppercase[6:]
+DIGITS = string.digits + string.ascii_uppercase
+MAX_FLIGHT_NUMBERS = len(FIRST_CHARACTERS) * len(DIGITS) ** 5
+
+
+def encode_flight_number(value):
+    """Encodes a sequence value as a flight number, keeping the order of the values"""
+
+    if not 0 <= value < MAX_FLIGHT_NUMBERS:
+        raise ValueError("The flight numbers are exhausted!")
+
+    characters = []
+    for _ in range(5):
+        value, digit = divmod(value, len(DIGITS))
+        characters.append(DIGITS[digit])
+    characters.append(FIRST_CHARACTERS[value])
+    return "".join(reversed(characters))
+
+
+class FlightNumberAllocator:
+    """Hands out unique flight numbers from blocks reserved in the sequences table.
+
+    Only the first allocation of every block_size numbers goes to the DB. Numbers left in the block of a worker
+    that stops are never used, which leaves gaps but no duplicates. Without a block_size the
+    FLIGHT_NUMBER_BLOCK_SIZE of the current app is used.
+    """
+
+    def __init__(self, block_size=None, sequence=FLIGHT_NUMBER_SEQUENCE,
+                 reserve=reserve_sequence_block):
+        self.block_size = block_size
+        self.sequence = sequence
+        self._reserve = reserve
+        self._lock = threading.Lock()
+        self._next = 0
+        self._end = 0
+
+    def allocate(self):
+        """Returns a new flight number"""
+
+        with self._lock:
+            if self._next >= self._end:
+                block_size = self.block_size or current_app.config["FLIGHT_NUMBER_BLOCK_SIZE"]
+                self._next = self._reserve(self.sequence, block_size)
+                self._end = self._next + block_size
+
+            value = self._next
+            self._next += 1
+
+        return encode_flight_number(value)
+
+
+flight_number_allocator = FlightNumberAllocator()
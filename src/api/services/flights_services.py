@@ -1,60 +1,165 @@
-import uuid
+import csv
+import io
+import json
+from datetime import datetime
 
+from flask import Response, stream_with_context
 from sqlalchemy.exc import IntegrityError
 
+from api.db.database import after_commit
 from api.db.repositories.flights_repository import *
-from api.utilities.utils import handle_integrity_error
+from api.services.connections_service import flight_graph
+from api.services.flight_numbers_service import flight_number_allocator
+from api.utilities.pagination import clamp_limit, decode_cursor, encode_cursor
+from api.utilities.utils import DATETIME_FORMAT, handle_integrity_error, parse_datetime
+from api.utilities.tracing import traced
 
 
+@traced("service")
 def add_flight_service(request):
     """Returns JSON formatted response containing a success message if the flight was added to the DB
      or an error message along with corresponding status codes"""
 
     try:
-        json_data = request.json
+        json_data = parse_flight_times(request.json)
         if check_flight_existence(json_data):
             return {"Message": "Cannot add the certain flight! "
                                "A flight with the same data already exist in the database!"}, 409
         new_flight = create_flight(json_data)
         add_flight_to_db(new_flight)
+        after_commit(flight_graph.upsert, new_flight)
         return {"Message": "New flight added to DB!"}, 200
+    except ValueError as e:
+        return {"Message": str(e)}, 400
     except IntegrityError as e:
         db_rollback()
-        handle_integrity_error(e)
+        return handle_integrity_error(e)
     except Exception as e:
         return {"Message": f"Couldn't create a new flight. Please try again later!", "Error": str(e)}, 500
-    finally:
-        close_db_session()
+
+
+def parse_flight_times(json_data):
+    """Returns a copy of the request body with takeoff_time and landing_time converted to datetime objects
+
+    Raises:
+        ValueError: If a time is not a valid date or the flight lands before it takes off
+    """
+
+    parsed = dict(json_data)
+    for key in ("takeoff_time", "landing_time"):
+        if key in parsed:
+            parsed[key] = datetime.strptime(parsed[key], DATETIME_FORMAT)
+
+    if "takeoff_time" in parsed and "landing_time" in parsed and parsed["landing_time"] <= parsed["takeoff_time"]:
+        raise ValueError("Landing time must be after takeoff time!")
+
+    return parsed
 
 
 def create_flight(json_data):
-    """Creates a new flight with the data from the request body"""
-
-    flight = Flights(flight_number=str(uuid.uuid4().hex)[:6].upper(),
-                     start_destination=json_data["start_destination"],
-                     end_destination=json_data["end_destination"],
-                     takeoff_time=json_data["takeoff_time"],
-                     landing_time=json_data['landing_time'],
-                     price=json_data["price"])
+    """Creates a new flight with the data from the request body, with the times already parsed"""
+
+    flight = Flights(**new_flight_values(json_data))
     return flight
 
 
-def get_flights_service():
-    """Returns JSON formatted response containing flights data or an error message along with
-    corresponding status codes"""
+def new_flight_values(json_data):
+    """Returns the column values of a new flight with the data from the request body, with the times already parsed"""
+
+    capacity = json_data.get("capacity", DEFAULT_CAPACITY)
+    return {"flight_number": flight_number_allocator.allocate(),
+            "start_destination": json_data["start_destination"],
+            "end_destination": json_data["end_destination"],
+            "takeoff_time": json_data["takeoff_time"],
+            "landing_time": json_data['landing_time'],
+            "price": json_data["price"],
+            "capacity": capacity,
+            "seats_available": capacity}
+
+
+@traced("service")
+def get_flights_service(limit=None, after=None):
+    """Returns JSON formatted response containing a page of flights data or an error message along with
+    corresponding status codes
+
+    Parameters:
+        limit (int): the maximum number of flights on the page
+        after (str): the cursor returned as "Next" by the previous page
+    """
 
     try:
-        all_flights = query_all_flights()
-        flights_list = [flight.to_json() for flight in all_flights]
-        if all_flights:
-            return {"Flights": flights_list}, 200
-        return {"Message": "The flights table is empty"}, 404
+        limit = clamp_limit(limit)
+        after_key = None
+        if after:
+            takeoff_time, flight_number = decode_cursor(after, 2)
+            after_key = (parse_cursor_time(takeoff_time), flight_number)
+
+        # Fetch one extra row to find out if there is a next page
+        flights = query_flights_page(limit + 1, after_key)
+        page = flights[:limit]
+
+        if not page and after_key is None:
+            return {"Message": "The flights table is empty"}, 404
+
+        next_cursor = None
+        if len(flights) > limit:
+            next_cursor = encode_cursor(page[-1].takeoff_time.isoformat(), page[-1].flight_number)
+
+        return {"Flights": [flight.to_json() for flight in page], "Next": next_cursor}, 200
+    except ValueError as e:
+        return {"Message": str(e)}, 400
     except Exception as e:
         return {"Message": "Couldn't retrieve flights from DB!", "Error": str(e)}, 500
-    finally:
-        close_db_session()
 
 
+def parse_cursor_time(value):
+    """Converts the takeoff_time stored in a pagination cursor back to a datetime object"""
+
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid pagination cursor!")
+
+
+@traced("service")
+def stream_flights_service():
+    """Returns a chunked NDJSON response containing all flights, one JSON object per line.
+    The rows are read through a server-side cursor, so memory use doesn't grow with the table"""
+
+    def generate():
+        for flight in query_flights_stream():
+            yield json.dumps(flight.to_json()) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@traced("service")
+def search_flights_service(start_destination, end_destination, depart_after=None, depart_before=None,
+                           limit=None):
+    """Returns JSON formatted response containing the flights between two destinations taking off in
+    the given window or an error message along with corresponding status codes"""
+
+    try:
+        if not start_destination or not end_destination:
+            return {"Message": "Both from and to must be provided!"}, 400
+
+        limit = clamp_limit(limit)
+        depart_after = parse_datetime(depart_after, "depart_after") if depart_after else None
+        depart_before = parse_datetime(depart_before, "depart_before", end_of_day=True) if depart_before else None
+
+        flights = query_flights_by_route(start_destination, end_destination, depart_after, depart_before, limit)
+        if flights:
+            return {"Flights": [flight.to_json() for flight in flights]}, 200
+
+        return {"Message": f"There are no flights from {start_destination} to {end_destination} "
+                           f"in the given period!"}, 404
+    except ValueError as e:
+        return {"Message": str(e)}, 400
+    except Exception as e:
+        return {"Message": "Couldn't search flights in DB!", "Error": str(e)}, 500
+
+
+@traced("service")
 def get_flight_service(flight_number):
     """Returns JSON formatted response containing flight data or an error message along with
     corresponding status codes"""
@@ -69,10 +174,25 @@ def get_flight_service(flight_number):
     except Exception as e:
         return {"Message": f"Couldn't retrieve flight with number {flight_number} from DB!", "Error": str(e)}, 500
 
-    finally:
-        close_db_session()
+
+@traced("service")
+def get_flight_availability_service(flight_number):
+    """Returns JSON formatted response containing the capacity and the free seats of a flight
+    or an error message along with corresponding status codes"""
+
+    try:
+        availability = query_flight_availability(flight_number)
+        if availability:
+            return {"Flight": flight_number, "capacity": availability.capacity,
+                    "seats_available": availability.seats_available}, 200
+
+        return {"Message": f"Flight with number {flight_number} doesn't exist in the DB!"}, 404
+
+    except Exception as e:
+        return {"Message": f"Couldn't retrieve availability of flight {flight_number} from DB!", "Error": str(e)}, 500
 
 
+@traced("service")
 def get_flight_passengers_service(flight_number):
     """Returns JSON formatted response containing passengers' infor or an error message along with
     corresponding status codes"""
@@ -91,10 +211,49 @@ def get_flight_passengers_service(flight_number):
         return {"Message": f"Flight with number {flight_number} doesn't exist in the DB!"}, 404
     except Exception as e:
         return {"Message": f"Couldn't retrieve passengers for flight {flight_number} from DB!", "Error": str(e)}, 500
-    finally:
-        close_db_session()
 
 
+@traced("service")
+def stream_flight_passengers_service(flight_number, mimetype):
+    """Returns a chunked passenger manifest of a flight as CSV or NDJSON, or an error message along with
+    corresponding status codes if the flight doesn't exist.
+    The rows are read through a server-side cursor, so memory use doesn't grow with the number of passengers"""
+
+    try:
+        if query_flight_by_flight_number(flight_number) is None:
+            return {"Message": f"Flight with number {flight_number} doesn't exist in the DB!"}, 404
+    except Exception as e:
+        return {"Message": f"Couldn't retrieve passengers for flight {flight_number} from DB!", "Error": str(e)}, 500
+
+    def generate():
+        passengers = query_passengers_stream(flight_number)
+        if mimetype == "text/csv":
+            yield from generate_csv([column["name"] for column in passengers.column_descriptions], passengers)
+        else:
+            for passenger in passengers:
+                yield json.dumps(passenger._asdict()) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    if mimetype == "text/csv":
+        response.headers["Content-Disposition"] = f"attachment; filename=manifest-{flight_number}.csv"
+    return response
+
+
+def generate_csv(header, rows):
+    """Yields the rows formatted as CSV lines, starting with the header line"""
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    for row in rows:
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow(row)
+    yield buffer.getvalue()
+
+
+@traced("service")
 def delete_flight_service(flight_number):
     """Returns JSON formatted response containing a success message if the flight was deleted from the DB
      or an error message along with corresponding status codes"""
@@ -103,6 +262,7 @@ def delete_flight_service(flight_number):
         flight = query_flight_by_flight_number(flight_number)
         if flight:
             delete_flight_from_db(flight)
+            after_commit(flight_graph.remove, flight_number)
             return {"Message": f"Flight with number: {flight_number} was removed successfully from the DB"}, 200
 
         return {"Message": f"Flight with number: {flight_number} doesn't exist in the DB!"}, 404
@@ -111,10 +271,8 @@ def delete_flight_service(flight_number):
         db_rollback()
         return {"Message": f"Couldn't delete flight with number: {flight_number} from DB!", "Error": str(e)}, 500
 
-    finally:
-        close_db_session()
-
 
+@traced("service")
 def update_flight_service(flight_number, request):
     """Returns JSON formatted response containing a success message if the flight was altered
     successfully in the DB or an error message along with corresponding status codes"""
@@ -122,16 +280,27 @@ def update_flight_service(flight_number, request):
     try:
         flight = query_flight_by_flight_number(flight_number)
         if flight:
-            json_data = request.json
+            json_data = parse_flight_times(request.json)
+            if "takeoff_time" in json_data or "landing_time" in json_data:
+                takeoff_time = json_data.get("takeoff_time", flight.takeoff_time)
+                if json_data.get("landing_time", flight.landing_time) <= takeoff_time:
+                    return {"Message": "Landing time must be after takeoff time!"}, 400
+
+            if "capacity" in json_data and not update_flight_capacity(flight_number, json_data["capacity"]):
+                # The cached flight may be stale, the booked seats are read again
+                availability = query_flight_availability(flight_number)
+                booked_seats = availability.capacity - availability.seats_available
+                return {"Message": f"Capacity cannot be lower than the {booked_seats} booked seats!"}, 409
+
             edit_flight_data(flight, json_data)
+            after_commit(flight_graph.upsert, flight)
 
             return {"Message": f"Flight with number: {flight_number} was updated successfully."}, 200
 
         return {"Message": f"Flight with number: {flight_number} doesn't exist in the DB!"}, 404
 
+    except ValueError as e:
+        return {"Message": str(e)}, 400
     except Exception as e:
         db_rollback()
         return {"Message": f"Couldn't update flight with number: {flight_number}", "Error": str(e)}, 500
-
-    finally:
-        close_db_session()
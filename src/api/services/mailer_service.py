@@ -4,6 +4,7 @@ from botocore.exceptions import ClientError
 
 from api.db.models.users_model import Users
 from api.utilities.jwt_creation import create_verification_jwt
+from api.utilities.tracing import traced
 
 SENDER = os.getenv("ADMIN_EMAIL")
 SUBJECT = "TONI MONTANA"
@@ -13,6 +14,7 @@ BODY_TEXT = ("This is a test")
 
 class MailerService:
     @classmethod
+    @traced("service")
     def send_verification_email(cls, user: Users) -> None:
         token = create_verification_jwt(user)
         BODY_HTML = f"""<html>
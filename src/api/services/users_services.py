@@ -1,11 +1,12 @@
 import re
-import uuid
-
-import flask_bcrypt
 
 from api.db.repositories.users_repository import *
+from api.utilities.ids import new_id
+from api.utilities.password_hashing import password_hasher
+from api.utilities.tracing import traced
 
 
+@traced("service")
 def create_user_service(data):
     """
     Creates a new user object with the provided data.
@@ -19,6 +20,9 @@ def create_user_service(data):
 
     Return:
         The created User object
+
+    Raises:
+        PasswordHasherBusy: If too many passwords are being hashed already
     """
 
     validate_data(data)
@@ -28,10 +32,10 @@ def create_user_service(data):
     email = data["email"]
     password = data["password"]
 
-    hashed_password = flask_bcrypt.generate_password_hash(password).decode("utf-8")
+    hashed_password = password_hasher.hash(password)
 
     new_user = Users(
-        id=str(uuid.uuid4()),
+        id=new_id(),
         first_name=first_name,
         last_name=last_name,
         email=email,
@@ -75,6 +79,7 @@ def validate_data(data):
                 raise ValueError(f'{new_key} is not in a valid format!')
 
 
+@traced("service")
 def get_users_service():
     """Returns JSON formatted response containing users data or an error message along with
     corresponding status codes"""
@@ -87,10 +92,9 @@ def get_users_service():
         return {"Message": "The users table is empty"}, 404
     except Exception as e:
         return {"Message": "Couldn't retrieve users from DB!", "Error": str(e)}, 500
-    finally:
-        close_db_session()
 
 
+@traced("service")
 def get_user_by_uuid_service(user_uuid):
     """Returns JSON formatted response containing flight data or an error message along with
         corresponding status codes"""
@@ -103,10 +107,9 @@ def get_user_by_uuid_service(user_uuid):
         return {"Message": f"User with uuid {user_uuid} doesn't exist in the DB!"}, 404
     except Exception as e:
         return {"Message": f"Couldn't retrieve user with uuid {user_uuid} from DB!", "Error": str(e)}, 500
-    finally:
-        close_db_session()
 
 
+@traced("service")
 def delete_user_service(user_uuid):
     """Returns JSON formatted response containing a success message if the user was deleted from the DB
      or an error message along with corresponding status codes"""
@@ -121,10 +124,9 @@ def delete_user_service(user_uuid):
     except Exception as e:
         db_rollback()
         return {"Message": f"Couldn't delete user with uuid {user_uuid} from DB!", "Error": str(e)}, 500
-    finally:
-        close_db_session()
 
 
+@traced("service")
 def update_user_service(user_uuid, request):
     """Returns JSON formatted response containing a success message if the user was altered
         successfully in the DB or an error message along with corresponding status codes"""
@@ -141,5 +143,3 @@ def update_user_service(user_uuid, request):
     except Exception as e:
         db_rollback()
         return {"Message": f"Couldn't update user with uuid {user_uuid}", "Error": str(e)}, 500
-    finally:
-        close_db_session()
@@ -4,10 +4,12 @@ from typing import Dict, Tuple
 import jwt
 
 from api.db.repositories.users_repository import change_verified_status, query_user_by_uuid
+from api.utilities.tracing import traced
 
 
 class Verification:
     @classmethod
+    @traced("service")
     def verify_user(cls, token) -> Tuple[Dict[str, str], int]:
         response, status_code = cls.verify_token(token)
         if status_code != 200:
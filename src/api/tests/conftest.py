@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from api.db.database import db
+from api.db.models.flights_model import Flights
+from api.db.models.users_model import Users
+from api.db.repositories.flights_repository import flight_cache
+from api.utilities.query_counter import QueryCounter
+
+
+@pytest.fixture
+def sqlite_app(tmp_path):
+    """Flask app on an empty SQLite database, for tests that run real SQL"""
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'api.db'}"
+    db.init_app(app)
+    flight_cache.clear()
+
+    with app.app_context():
+        db.create_all(bind_key=None)
+    yield app
+
+    flight_cache.clear()
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def add_flight(sqlite_app):
+    def add_flight(flight_number, capacity=180):
+        with sqlite_app.app_context():
+            db.session.add(Flights(flight_number=flight_number, start_destination="LHR", end_destination="SOF",
+                                   takeoff_time=datetime(2023, 8, 10, 8, 0), landing_time=datetime(2023, 8, 10, 10, 0),
+                                   price=100.0, capacity=capacity, seats_available=capacity))
+            db.session.commit()
+
+    return add_flight
+
+
+@pytest.fixture
+def add_user(sqlite_app):
+    def add_user(user_id):
+        with sqlite_app.app_context():
+            db.session.add(Users(id=user_id, first_name="Ivan", last_name="Obreshkov", email=f"{user_id}@gmail.com",
+                                 password="test1234"))
+            db.session.commit()
+
+    return add_user
+
+
+@pytest.fixture
+def queries():
+    """Counts the SQL statements executed during the test, to pin down how many statements a service issues"""
+
+    with QueryCounter() as counter:
+        yield counter
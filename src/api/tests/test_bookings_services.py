@@ -1,11 +1,23 @@
+import uuid
 from collections import namedtuple
+from datetime import datetime
 from unittest.mock import patch, MagicMock
 
+import pymysql
 import pytest
+from sqlalchemy.exc import IntegrityError
 
+from flask import request
+
+from api.db.database import db
+from api.db.models.flights_model import Flights
 from api.db.models.user_bookings_model import UserBookings
-from api.services.bookings_services import validate_and_add_booking, add_booking_service, get_bookings_service, \
-    get_booking_service, get_user_bookings_service, delete_booking_service
+from api.services.bookings_services import add_booking_service, get_bookings_service, get_booking_service, \
+    get_user_bookings_service, delete_booking_service, add_group_booking_service
+
+USER_1 = "0189c6a4-7c2e-7d4e-8f7a-3b1c2d4e5f61"
+USER_2 = "0189c6a4-7c2e-7d4e-8f7a-3b1c2d4e5f72"
+USER_3 = "0189c6a4-7c2e-7d4e-8f7a-3b1c2d4e5f63"
 
 
 @pytest.fixture
@@ -13,83 +25,193 @@ def sample_booking():
     return UserBookings(booking_id='booking_1', user_id="user_1", flight_number="F123")
 
 
-@patch("api.services.bookings_services.create_booking")
+def booking_integrity_error(code, message):
+    return IntegrityError("INSERT INTO user_bookings ...", {}, pymysql.err.IntegrityError(code, message))
+
+
+@patch("api.services.bookings_services.claim_seats")
 @patch("api.services.bookings_services.add_booking_to_db")
-@patch("api.services.bookings_services.check_booking_existence")
-def test_validate_and_add_booking(mock_check_booking_existence, mock_add_booking_to_db,
-                                  mock_create_booking):
-    mock_user = MagicMock()
-    mock_flight = MagicMock()
-    mock_json_data = {
+def test_add_booking_service(mock_add_booking_to_db, mock_claim_seats):
+    mock_request = MagicMock()
+    mock_request.json = {
         "user_id": "user_uuid",
         "flight_number": "F123",
     }
 
-    mock_check_booking_existence.return_value = False
-    mock_create_booking.return_value = sample_booking
-    response, status_code = validate_and_add_booking(mock_user, mock_flight, mock_json_data)
+    mock_claim_seats.return_value = True
+
+    response, status_code = add_booking_service(mock_request)
     assert response == {"Message": "New booking added to DB!"}
     assert status_code == 200
-    mock_add_booking_to_db.assert_called_once_with(sample_booking)
-
-
+    mock_claim_seats.assert_called_once_with("F123")
+    new_booking = mock_add_booking_to_db.call_args.args[0]
+    assert (new_booking.user_id, new_booking.flight_number) == ("user_uuid", "F123")
+
+
+@pytest.mark.parametrize("error, expected_response, expected_status_code", [
+    (booking_integrity_error(1062, "Duplicate entry 'user_uuid-F123' for key 'uq_user_bookings_user_flight'"),
+     {"Message": "User with uuid user_uuid has already booked flight F123!"}, 409),
+    (booking_integrity_error(1452, "Cannot add or update a child row: a foreign key constraint fails "
+                                   "(`db`.`user_bookings`, CONSTRAINT `user_bookings_ibfk_2` FOREIGN KEY "
+                                   "(`user_id`) REFERENCES `users` (`id`))"),
+     {"Message": "User with uuid user_uuid doesn't exist in the DB!"}, 404),
+    (booking_integrity_error(1452, "Cannot add or update a child row: a foreign key constraint fails "
+                                   "(`db`.`user_bookings`, CONSTRAINT `user_bookings_ibfk_1` FOREIGN KEY "
+                                   "(`flight_number`) REFERENCES `flights` (`flight_number`))"),
+     {"Message": "Flight with number: F123 doesn't exist in the DB!"}, 404),
+])
+@patch("api.services.bookings_services.claim_seats")
 @patch("api.services.bookings_services.add_booking_to_db")
-def test_validate_and_add_booking_user_does_not_exist(mock_add_booking_to_db):
-    mock_user = None
-    mock_flight = MagicMock()
-    mock_json_data = {
+@patch("api.services.bookings_services.db_rollback")
+def test_add_booking_service_constraint_violations(mock_db_rollback, mock_add_booking_to_db,
+                                                   mock_claim_seats, error, expected_response,
+                                                   expected_status_code):
+    mock_request = MagicMock()
+    mock_request.json = {
         "user_id": "user_uuid",
         "flight_number": "F123",
     }
+    mock_claim_seats.return_value = True
+    mock_add_booking_to_db.side_effect = error
 
-    response, status_code = validate_and_add_booking(mock_user, mock_flight, mock_json_data)
-    assert response == {"Message": f"User with uuid {mock_json_data['user_id']} doesn't exist in the DB!"}
-    assert status_code == 404
-    mock_add_booking_to_db.assert_not_called()
+    response, status_code = add_booking_service(mock_request)
+    assert response == expected_response
+    assert status_code == expected_status_code
+    mock_db_rollback.assert_called_once()
 
 
+@pytest.mark.parametrize("flight, expected_response, expected_status_code", [
+    (None, {"Message": "Flight with number: F123 doesn't exist in the DB!"}, 404),
+    (MagicMock(), {"Message": "Flight with number: F123 is sold out!"}, 409),
+])
+@patch("api.services.bookings_services.query_flight_by_flight_number")
+@patch("api.services.bookings_services.claim_seats")
 @patch("api.services.bookings_services.add_booking_to_db")
-def test_validate_and_add_booking_flight_does_not_exist(mock_add_booking_to_db):
-    mock_user = MagicMock()
-    mock_flight = None
-    mock_json_data = {
+@patch("api.services.bookings_services.db_rollback")
+def test_add_booking_service_seat_not_claimed(mock_db_rollback, mock_add_booking_to_db,
+                                             mock_claim_seats, mock_query_flight, flight, expected_response,
+                                             expected_status_code):
+    mock_request = MagicMock()
+    mock_request.json = {
         "user_id": "user_uuid",
         "flight_number": "F123",
     }
+    mock_claim_seats.return_value = False
+    mock_query_flight.return_value = flight
 
-    response, status_code = validate_and_add_booking(mock_user, mock_flight, mock_json_data)
-    assert response == {"Message": f"Flight with number: {mock_json_data['flight_number']} doesn't exist in the DB!"}
-    assert status_code == 404
+    response, status_code = add_booking_service(mock_request)
+    assert response == expected_response
+    assert status_code == expected_status_code
     mock_add_booking_to_db.assert_not_called()
+    mock_db_rollback.assert_called_once()
 
 
-@patch("api.services.bookings_services.validate_and_add_booking")
-@patch("api.services.bookings_services.query_flight_by_flight_number")
-@patch("api.services.bookings_services.get_user_by_uuid_service")
-@patch("api.services.bookings_services.close_db_session")
-def test_add_booking_service_exception(mock_close_db_session, mock_get_user_by_uuid_service,
-                                       mock_query_flight_by_flight_number,
-                                       mock_validate_and_add_booking):
+@patch("api.services.bookings_services.claim_seats")
+@patch("api.services.bookings_services.add_booking_to_db")
+def test_add_booking_service_exception(mock_add_booking_to_db, mock_claim_seats):
     mock_request = MagicMock()
 
     mock_request.json = {
         "user_id": "user_uuid",
         "flight_number": "F123",
     }
-    mock_get_user_by_uuid_service.side_effect = Exception("Test exception")
-    mock_query_flight_by_flight_number.side_effect = Exception("Test exception")
+    mock_claim_seats.return_value = True
+    mock_add_booking_to_db.side_effect = Exception("Test exception")
 
     response, status_code = add_booking_service(mock_request)
     assert response == {"Message": f"Couldn't create a new booking. Please try again later!",
                         "Error": "Test exception"}
     assert status_code == 500
-    mock_validate_and_add_booking.assert_not_called()
-    mock_close_db_session.assert_called_once()
 
 
-@patch('api.services.bookings_services.query_all_bookings')
-@patch("api.services.bookings_services.close_db_session")
-def test_get_bookings_service_not_empty(mock_close_db_session, mock_query_all_bookings):
+@patch("api.services.bookings_services.query_existing_user_ids")
+@patch("api.services.bookings_services.claim_seats")
+@patch("api.services.bookings_services.add_bookings_to_db")
+def test_add_group_booking_service(mock_add_bookings_to_db, mock_claim_seats,
+                                   mock_query_existing_user_ids):
+    mock_request = MagicMock()
+    mock_request.json = {"user_ids": [USER_1, USER_2, USER_3]}
+    mock_query_existing_user_ids.return_value = {USER_1, USER_2, USER_3}
+    mock_claim_seats.return_value = True
+
+    response, status_code = add_group_booking_service("F123", mock_request)
+    assert status_code == 200
+    assert [booking["user_id"] for booking in response["Bookings"]] == [USER_1, USER_2, USER_3]
+    mock_claim_seats.assert_called_once_with("F123", 3)
+    new_bookings = mock_add_bookings_to_db.call_args.args[0]
+    assert {booking.flight_number for booking in new_bookings} == {"F123"}
+
+
+@patch("api.services.bookings_services.query_existing_user_ids")
+@patch("api.services.bookings_services.claim_seats")
+def test_add_group_booking_service_missing_users(mock_claim_seats,
+                                                 mock_query_existing_user_ids):
+    mock_request = MagicMock()
+    mock_request.json = {"user_ids": [USER_1, USER_2, USER_3]}
+    mock_query_existing_user_ids.return_value = {USER_2}
+
+    response, status_code = add_group_booking_service("F123", mock_request)
+    assert response == {"Message": "Some of the users don't exist in the DB!",
+                        "Missing users": [USER_1, USER_3]}
+    assert status_code == 404
+    mock_claim_seats.assert_not_called()
+
+
+@patch("api.services.bookings_services.query_flight_by_flight_number")
+@patch("api.services.bookings_services.query_existing_user_ids")
+@patch("api.services.bookings_services.claim_seats")
+@patch("api.services.bookings_services.add_bookings_to_db")
+@patch("api.services.bookings_services.db_rollback")
+def test_add_group_booking_service_not_enough_seats(mock_db_rollback, mock_add_bookings_to_db,
+                                                    mock_claim_seats, mock_query_existing_user_ids,
+                                                    mock_query_flight):
+    mock_request = MagicMock()
+    mock_request.json = {"user_ids": [USER_1, USER_2]}
+    mock_query_existing_user_ids.return_value = {USER_1, USER_2}
+    mock_claim_seats.return_value = False
+    mock_query_flight.return_value = MagicMock()
+
+    response, status_code = add_group_booking_service("F123", mock_request)
+    assert response == {"Message": "Flight with number: F123 doesn't have 2 seats left!"}
+    assert status_code == 409
+    mock_add_bookings_to_db.assert_not_called()
+    mock_db_rollback.assert_called_once()
+
+
+@patch("api.services.bookings_services.query_existing_user_ids")
+@patch("api.services.bookings_services.claim_seats")
+@patch("api.services.bookings_services.add_bookings_to_db")
+@patch("api.services.bookings_services.db_rollback")
+def test_add_group_booking_service_already_booked(mock_db_rollback, mock_add_bookings_to_db,
+                                                  mock_claim_seats, mock_query_existing_user_ids):
+    mock_request = MagicMock()
+    mock_request.json = {"user_ids": [USER_1, USER_2]}
+    mock_query_existing_user_ids.return_value = {USER_1, USER_2}
+    mock_claim_seats.return_value = True
+    mock_add_bookings_to_db.side_effect = booking_integrity_error(
+        1062, "Duplicate entry 'user_2-F123' for key 'uq_user_bookings_user_flight'")
+
+    response, status_code = add_group_booking_service("F123", mock_request)
+    assert response == {"Message": "Some of the users have already booked flight F123!"}
+    assert status_code == 409
+    mock_db_rollback.assert_called_once()
+
+
+def test_add_group_booking_service_normalizes_the_user_ids(sqlite_app, add_flight, add_user):
+    add_flight("G00001")
+    add_user(USER_1)
+    add_user(USER_2)
+
+    with sqlite_app.test_request_context(json={"user_ids": [USER_1.upper(), "{" + USER_2 + "}"]}):
+        response, status_code = add_group_booking_service("G00001", request)
+        db.session.commit()
+
+    assert status_code == 200
+    assert [booking["user_id"] for booking in response["Bookings"]] == [USER_1, USER_2]
+
+
+@patch('api.services.bookings_services.query_bookings_page')
+def test_get_bookings_service_not_empty(mock_query_bookings_page):
     BookingsRow = namedtuple('BookingsRow',
                              ['booking_id', 'flight_number', 'price', 'email', 'first_name', 'last_name'])
 
@@ -99,61 +221,129 @@ def test_get_bookings_service_not_empty(mock_close_db_session, mock_query_all_bo
         BookingsRow(booking_id='8c8565cf-4384-4474-a8c7-10a62b27ceed', flight_number="F123", price=345,
                     email='ivan@gmail.com', first_name='Ivan', last_name='Obreshkov')
     ]
-    mock_query_all_bookings.return_value = bookings_data
+    mock_query_bookings_page.return_value = bookings_data
     response, status_code = get_bookings_service()
     assert status_code == 200
     assert "All bookings" in response
-    mock_close_db_session.assert_called_once()
+    assert response["Next"] is None
+    mock_query_bookings_page.assert_called_once_with(101, None)
 
 
-@patch('api.services.bookings_services.query_all_bookings')
-@patch("api.services.bookings_services.close_db_session")
-def test_get_bookings_service_empty(mock_close_db_session, mock_query_all_bookings):
-    mock_query_all_bookings.return_value = []
+@patch('api.services.bookings_services.query_bookings_page')
+def test_get_bookings_service_filtered_pages(mock_query_bookings_page):
+    BookingsRow = namedtuple('BookingsRow',
+                             ['booking_id', 'flight_number', 'price', 'email', 'first_name', 'last_name'])
+    mock_query_bookings_page.return_value = [
+        BookingsRow(booking_id=f'00000000-0000-0000-0000-00000000000{i}', flight_number="F123", price=123, email=f'user{i}@gmail.com',
+                    first_name='Dani', last_name='Ivanov') for i in range(3)
+    ]
+    filters = {"flight_number": "F123", "start_destination": None, "depart_after": "2023-08-10",
+               "email_prefix": "user"}
+
+    response, status_code = get_bookings_service(filters, limit=2)
+    assert status_code == 200
+    assert [booking["booking_id"] for booking in response["All bookings"]] == [
+        "00000000-0000-0000-0000-000000000000", "00000000-0000-0000-0000-000000000001"]
+    mock_query_bookings_page.assert_called_once_with(3, None, flight_number="F123",
+                                                     depart_after=datetime(2023, 8, 10), email_prefix="user")
+
+    mock_query_bookings_page.reset_mock()
+    mock_query_bookings_page.return_value = []
+    response, status_code = get_bookings_service(filters, limit=2, after=response["Next"])
+    assert status_code == 200
+    assert response == {"All bookings": [], "Next": None}
+    assert mock_query_bookings_page.call_args.args == (3, ("F123", "00000000-0000-0000-0000-000000000001"))
+
+
+def test_get_bookings_service_filters_on_real_data(sqlite_app, add_user):
+    with sqlite_app.app_context():
+        for flight_number, start_destination, day in (("G00001", "LHR", 10), ("G00002", "CDG", 10),
+                                                      ("G00003", "LHR", 12)):
+            db.session.add(Flights(flight_number=flight_number, start_destination=start_destination,
+                                   end_destination="SOF", takeoff_time=datetime(2023, 8, day, 8, 0),
+                                   landing_time=datetime(2023, 8, day, 10, 0), price=100.0))
+        db.session.commit()
+    for user_id in (USER_1, USER_2):
+        add_user(user_id)
+    with sqlite_app.app_context():
+        for flight_number in ("G00001", "G00002", "G00003"):
+            db.session.add(UserBookings(booking_id=str(uuid.uuid4()), flight_number=flight_number, user_id=USER_1))
+        db.session.add(UserBookings(booking_id=str(uuid.uuid4()), flight_number="G00001", user_id=USER_2))
+        db.session.commit()
+
+        def booked(filters):
+            response, _ = get_bookings_service(filters, limit=1)
+            bookings = response["All bookings"]
+            while response["Next"]:
+                response, _ = get_bookings_service(filters, limit=1, after=response["Next"])
+                bookings += response["All bookings"]
+            return sorted((booking["flight_number"], booking["email"]) for booking in bookings)
+
+        assert booked({"start_destination": "LHR", "depart_before": "2023-08-10"}) == [
+            ("G00001", f"{USER_1}@gmail.com"), ("G00001", f"{USER_2}@gmail.com")]
+        assert booked({"depart_after": "2023-08-11"}) == [("G00003", f"{USER_1}@gmail.com")]
+        assert booked({"email_prefix": USER_2[:-1]}) == [("G00001", f"{USER_2}@gmail.com")]
+
+
+@patch('api.services.bookings_services.query_bookings_page')
+def test_get_bookings_service_date_only_depart_before_is_the_end_of_the_day(mock_query_bookings_page):
+    mock_query_bookings_page.return_value = []
+    get_bookings_service({"depart_after": "2023-08-10", "depart_before": "2023-08-10"})
+    mock_query_bookings_page.assert_called_once_with(101, None, depart_after=datetime(2023, 8, 10),
+                                                     depart_before=datetime(2023, 8, 10, 23, 59, 59, 999999))
+
+
+@patch('api.services.bookings_services.query_bookings_page')
+def test_get_bookings_service_invalid_params(mock_query_bookings_page):
+    response, status_code = get_bookings_service({"depart_before": "tomorrow"})
+    assert status_code == 400
+    assert response == {"Message": "depart_before must be in the format YYYY-MM-DD HH:MM!"}
+
+    response, status_code = get_bookings_service(after="garbage")
+    assert status_code == 400
+    assert response == {"Message": "Invalid pagination cursor!"}
+    mock_query_bookings_page.assert_not_called()
+
+
+@patch('api.services.bookings_services.query_bookings_page')
+def test_get_bookings_service_empty(mock_query_bookings_page):
+    mock_query_bookings_page.return_value = []
     response, status_code = get_bookings_service()
     assert status_code == 404
     assert response == {"Message": "The bookings table is empty"}
-    mock_close_db_session.assert_called_once()
 
 
-@patch('api.services.bookings_services.query_all_bookings')
-@patch("api.services.bookings_services.close_db_session")
-def test_get_bookings_service_exception(mock_close_db_session, mock_query_all_bookings):
-    mock_query_all_bookings.side_effect = Exception("Test exception")
+@patch('api.services.bookings_services.query_bookings_page')
+def test_get_bookings_service_exception(mock_query_bookings_page):
+    mock_query_bookings_page.side_effect = Exception("Test exception")
     response, status_code = get_bookings_service()
     assert status_code == 500
     assert response == {
         "Message": "Couldn't retrieve bookings from DB!",
         "Error": "Test exception",
     }
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.bookings_services.query_booking_by_id')
-@patch("api.services.bookings_services.close_db_session")
-def test_get_booking_service_existing(mock_close_db_session, mock_query_booking, sample_booking):
+def test_get_booking_service_existing(mock_query_booking, sample_booking):
     booking_id = 'booking_1'
     mock_query_booking.return_value = sample_booking
     response, status_code = get_booking_service(booking_id)
     assert status_code == 200
     assert "Booking" in response
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.bookings_services.query_booking_by_id')
-@patch("api.services.bookings_services.close_db_session")
-def test_get_booking_service_non_existing(mock_close_db_session, mock_query_booking):
+def test_get_booking_service_non_existing(mock_query_booking):
     booking_id = 'Wrong booking'
     mock_query_booking.return_value = None
     response, status_code = get_booking_service("Wrong booking")
     assert status_code == 404
     assert response == {"Message": f"Booking with uuid {booking_id} doesn't exist in the DB!"}
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.bookings_services.query_booking_by_id')
-@patch("api.services.bookings_services.close_db_session")
-def test_get_booking_service_exception(mock_close_db_session, mock_query_booking):
+def test_get_booking_service_exception(mock_query_booking):
     booking_id = 'booking_1'
     mock_query_booking.side_effect = Exception("Test exception")
     response, status_code = get_booking_service(booking_id)
@@ -162,13 +352,11 @@ def test_get_booking_service_exception(mock_close_db_session, mock_query_booking
         "Message": f"Couldn't retrieve Booking with uuid {booking_id} from DB!",
         "Error": "Test exception",
     }
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.bookings_services.get_user_by_uuid_service')
 @patch('api.services.bookings_services.query_bookings_by_user_id')
-@patch("api.services.bookings_services.close_db_session")
-def test_get_user_bookings_service_existing_user(mock_close_db_session, mock_query_bookings_by_user_id,
+def test_get_user_bookings_service_existing_user(mock_query_bookings_by_user_id,
                                                  mock_get_user_by_uuid_service):
     user_id = "user_1"
     UsersBookingsRow = namedtuple('BookingsRow',
@@ -190,13 +378,11 @@ def test_get_user_bookings_service_existing_user(mock_close_db_session, mock_que
     response, status_code = get_user_bookings_service(user_id)
     assert status_code == 200
     assert "User's Bookings" in response
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.bookings_services.get_user_by_uuid_service')
 @patch('api.services.bookings_services.query_bookings_by_user_id')
-@patch("api.services.bookings_services.close_db_session")
-def test_get_user_bookings_service_not_existing_bookings(mock_close_db_session, mock_query_bookings_by_user_id,
+def test_get_user_bookings_service_not_existing_bookings(mock_query_bookings_by_user_id,
                                                          mock_get_user_by_uuid_service):
     user_id = "user_1"
 
@@ -205,25 +391,21 @@ def test_get_user_bookings_service_not_existing_bookings(mock_close_db_session,
     response, status_code = get_user_bookings_service(user_id)
     assert status_code == 404
     assert response == {"Message": f"User with uuid {user_id} has not booked any flights!"}
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.bookings_services.get_user_by_uuid_service')
-@patch("api.services.bookings_services.close_db_session")
-def test_get_user_bookings_service_non_existing_user(mock_close_db_session, mock_get_user_by_uuid_service):
+def test_get_user_bookings_service_non_existing_user(mock_get_user_by_uuid_service):
     user_id = "Wrong user"
 
     mock_get_user_by_uuid_service.return_value = None
     response, status_code = get_user_bookings_service(user_id)
     assert status_code == 404
     assert response == {"Message": f"User with uuid {user_id} doesn't exist in the DB!"}
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.bookings_services.get_user_by_uuid_service')
 @patch('api.services.bookings_services.query_bookings_by_user_id')
-@patch("api.services.bookings_services.close_db_session")
-def test_get_user_bookings_service_exception(mock_close_db_session, mock_query_bookings_by_user_id,
+def test_get_user_bookings_service_exception(mock_query_bookings_by_user_id,
                                              mock_get_user_by_uuid_service):
     user_id = "user_1"
 
@@ -233,26 +415,22 @@ def test_get_user_bookings_service_exception(mock_close_db_session, mock_query_b
     assert status_code == 500
     assert response == {"Message": "Couldn't retrieve user's bookings from DB!",
                         "Error": "Test exception"}
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.bookings_services.query_booking_by_id')
 @patch('api.services.bookings_services.delete_booking_from_db')
-@patch("api.services.bookings_services.close_db_session")
-def test_delete_booking_service_existing_booking(mock_close_db_session, mock_remove_booking, mock_query_booking_by_id):
+def test_delete_booking_service_existing_booking(mock_remove_booking, mock_query_booking_by_id):
     booking_id = 'booking_1'
     mock_query_booking_by_id.return_value = sample_booking
     response, status_code = delete_booking_service(booking_id)
     assert status_code == 200
     assert response == {"Message": f"User with uuid {booking_id} was removed successfully from the DB"}
     mock_remove_booking.assert_called_once_with(sample_booking)
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.bookings_services.query_booking_by_id')
 @patch('api.services.bookings_services.delete_booking_from_db')
-@patch("api.services.bookings_services.close_db_session")
-def test_delete_booking_service_non_existing_booking(mock_close_db_session, mock_remove_booking,
+def test_delete_booking_service_non_existing_booking(mock_remove_booking,
                                                      mock_query_booking_by_id):
     booking_id = 'Wrong booking'
     mock_query_booking_by_id.return_value = None
@@ -260,14 +438,12 @@ def test_delete_booking_service_non_existing_booking(mock_close_db_session, mock
     assert status_code == 404
     assert response == {"Message": f"Booking with uuid {booking_id} doesn't exist in the DB!"}
     mock_remove_booking.assert_not_called()
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.bookings_services.query_booking_by_id')
 @patch('api.services.bookings_services.delete_booking_from_db')
-@patch("api.services.bookings_services.close_db_session")
 @patch("api.services.bookings_services.db_rollback")
-def test_delete_booking_service_non_existing_booking(mock_db_rollback, mock_close_db_session, mock_remove_booking,
+def test_delete_booking_service_non_existing_booking(mock_db_rollback, mock_remove_booking,
                                                      mock_query_booking_by_id):
     booking_id = 'booking_1'
     mock_query_booking_by_id.side_effect = Exception("Test exception")
@@ -277,5 +453,4 @@ def test_delete_booking_service_non_existing_booking(mock_db_rollback, mock_clos
     assert response == {"Message": f"Couldn't delete booking with uuid {booking_id} from DB!",
                         "Error": "Test exception"}
     mock_remove_booking.assert_not_called()
-    mock_close_db_session.assert_called_once()
     mock_db_rollback.assert_called_once()
@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import jwt
+import pytest
+from flask import Flask, request
+
+from api.app import create_app
+from api.config import BaseConfig
+from api.db.database import db
+from api.db.models.flights_model import DEFAULT_CAPACITY
+from api.services.bulk_flights_service import *
+from api.services.connections_service import FlightGraph
+
+SECRET_KEY = "test_secret_key"
+
+CSV_UPLOAD = """start_destination,end_destination,takeoff_time,landing_time,price,capacity
+City A,City B,2023-08-10 10:00,2023-08-10 12:00,200,
+City A,City B,2023-08-10 10:00,2023-08-10 12:00,200,
+City C,City D,2023-08-10 14:00,2023-08-10 13:00,250,
+City C,City D,2023-08-10 14:00,2023-08-10 16:00,cheap,
+City E,City F,2023-08-10 18:00,2023-08-10 20:00,150,50
+"""
+
+NDJSON_UPLOAD = """{"start_destination": "City A", "end_destination": "City B", "takeoff_time": "2023-08-10 10:00", \
+"landing_time": "2023-08-10 12:00", "price": 200}
+{"start_destination": "City C"
+
+{"start_destination": "City C", "end_destination": "City D", "takeoff_time": "2023-08-10 14:00", \
+"landing_time": "2023-08-10 16:00", "price": 250}
+"""
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    app.config["BULK_INSERT_BATCH_SIZE"] = 2
+    return app
+
+
+@pytest.fixture
+def mock_db():
+    with patch('api.services.bulk_flights_service.query_existing_flight_keys') as mock_query_existing_flight_keys, \
+            patch('api.services.bulk_flights_service.bulk_insert_flights') as mock_bulk_insert_flights, \
+            patch('api.services.bulk_flights_service.db_commit'), \
+            patch('api.services.bulk_flights_service.flight_graph'), \
+            patch('api.services.flights_services.flight_number_allocator'):
+        mock_query_existing_flight_keys.return_value = set()
+        yield mock_query_existing_flight_keys, mock_bulk_insert_flights
+
+
+def test_bulk_add_flights_csv(app, mock_db):
+    mock_query_existing_flight_keys, mock_bulk_insert_flights = mock_db
+    with app.test_request_context("/flights/bulk", method="POST", data=CSV_UPLOAD, content_type="text/csv"):
+        response, status_code = bulk_add_flights_service(request)
+
+    assert status_code == 200
+    assert response["Inserted"] == 2
+    assert response["Duplicates"] == 1
+    assert response["Failed"] == 2
+    assert [error["row"] for error in response["Errors"]] == [3, 4]
+
+    # Both valid flights fit in one batch of BULK_INSERT_BATCH_SIZE
+    mock_bulk_insert_flights.assert_called_once()
+    inserted = mock_bulk_insert_flights.call_args.args[0]
+    assert [flight["capacity"] for flight in inserted] == [DEFAULT_CAPACITY, 50]
+    assert inserted[1]["seats_available"] == 50
+
+
+def test_bulk_add_flights_ndjson_skips_existing_flights(app, mock_db):
+    mock_query_existing_flight_keys, mock_bulk_insert_flights = mock_db
+    mock_query_existing_flight_keys.return_value = {
+        ("City A", "City B", datetime(2023, 8, 10, 10, 0), datetime(2023, 8, 10, 12, 0))}
+    with app.test_request_context("/flights/bulk", method="POST", data=NDJSON_UPLOAD,
+                                  content_type="application/x-ndjson"):
+        response, status_code = bulk_add_flights_service(request, batch_size=1)
+
+    assert status_code == 200
+    assert response["Inserted"] == 1
+    assert response["Duplicates"] == 1
+    assert response["Errors"][0]["row"] == 2
+    assert mock_query_existing_flight_keys.call_count == 2
+
+
+def test_bulk_add_flights_failed_batch(app, mock_db):
+    _, mock_bulk_insert_flights = mock_db
+    mock_bulk_insert_flights.side_effect = IntegrityError("INSERT", {}, Exception("Duplicate entry"))
+    with app.test_request_context("/flights/bulk", method="POST", data=CSV_UPLOAD, content_type="text/csv"), \
+            patch('api.services.bulk_flights_service.db_rollback') as mock_db_rollback:
+        response, status_code = bulk_add_flights_service(request)
+
+    assert status_code == 200
+    assert response["Inserted"] == 0
+    assert response["Failed"] == 4
+    mock_db_rollback.assert_called_once()
+
+
+def test_bulk_add_flights_unsupported_format(app, mock_db):
+    with app.test_request_context("/flights/bulk", method="POST", data="flights", content_type="text/plain"):
+        response, status_code = bulk_add_flights_service(request)
+
+    assert status_code == 400
+
+
+def test_bulk_added_flights_are_found_by_the_connection_search(tmp_path, monkeypatch):
+    class Config(BaseConfig):
+        SECRET_KEY = SECRET_KEY
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'api.db'}"
+        SQLALCHEMY_BINDS = {}
+
+    monkeypatch.setenv("SECRET_KEY", SECRET_KEY)
+    graph = FlightGraph()
+    app = create_app(Config)
+    client = app.test_client()
+    client.set_cookie("token", jwt.encode({"sub": "admin", "admin": True,
+                                           "exp": datetime.utcnow() + timedelta(hours=1)},
+                                          SECRET_KEY, algorithm="HS256"))
+    search = {"from": "LHR", "to": "SOF", "depart_after": "2030-01-01 00:00"}
+    upload = ("start_destination,end_destination,takeoff_time,landing_time,price\n"
+              "LHR,FRA,2030-01-01 08:00,2030-01-01 10:00,100\n"
+              "FRA,SOF,2030-01-01 11:00,2030-01-01 13:00,120\n")
+
+    with patch('api.services.connections_service.flight_graph', graph), \
+            patch('api.services.bulk_flights_service.flight_graph', graph):
+        # Loads the graph while the flights don't exist yet
+        assert client.get("/flights/connections", query_string=search).status_code == 404
+
+        response = client.post("/flights/bulk", data=upload, content_type="text/csv")
+        assert response.json["Inserted"] == 2
+
+        response = client.get("/flights/connections", query_string=search)
+        assert response.status_code == 200
+        assert [leg["start_destination"] for leg in response.json["Itinerary"]["legs"]] == ["LHR", "FRA"]
+
+    with app.app_context():
+        db.engine.dispose()
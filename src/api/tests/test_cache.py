@@ -0,0 +1,68 @@
+import pytest
+
+from api.utilities.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_cache_hit_and_miss(clock):
+    cache = LRUCache(maxsize=2, ttl=10, clock=clock)
+    assert cache.get("F123") is None
+    cache.set("F123", "flight")
+    assert cache.get("F123") == "flight"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_cache_evicts_least_recently_used(clock):
+    cache = LRUCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("F1", 1)
+    cache.set("F2", 2)
+    cache.get("F1")
+    cache.set("F3", 3)
+    assert cache.get("F2") is None
+    assert cache.get("F1") == 1
+    assert cache.get("F3") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_entries_expire(clock):
+    cache = LRUCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("F1", 1)
+    clock.now = 9.9
+    assert cache.get("F1") == 1
+    clock.now = 10
+    assert cache.get("F1") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_invalidate(clock):
+    cache = LRUCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("F1", 1)
+    cache.invalidate("F1")
+    cache.invalidate("F2")
+    assert cache.get("F1") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_cache_configure(clock):
+    cache = LRUCache(maxsize=2, ttl=10, clock=clock)
+    cache.set("F1", 1)
+    cache.configure(maxsize=0, ttl=5)
+    assert cache.get("F1") is None
+    cache.set("F1", 1)
+    assert cache.get("F1") is None
+    assert cache.stats()["maxsize"] == 0
+    assert cache.stats()["ttl"] == 5
@@ -0,0 +1,127 @@
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+from api.db.models.flights_model import Flights
+from api.config import BaseConfig
+from api.services.connections_service import FlightGraph, search_connections_service
+
+MIN_CONNECTION = timedelta(minutes=45)
+MAX_LAYOVER = timedelta(hours=24)
+DEPART_AFTER = datetime(2023, 8, 10, 0, 0)
+DEPART_BEFORE = datetime(2023, 8, 11, 0, 0)
+
+
+def make_flight(flight_number, start, end, takeoff, landing, price):
+    return Flights(flight_number=flight_number, start_destination=start, end_destination=end,
+                   takeoff_time=datetime(2023, 8, 10, *takeoff), landing_time=datetime(2023, 8, 10, *landing),
+                   price=price)
+
+
+@pytest.fixture
+def graph():
+    flight_graph = FlightGraph()
+    flight_graph.load([
+        make_flight("LHRSOF", "LHR", "SOF", (18, 0), (23, 0), 500.0),
+        make_flight("LHRFRA", "LHR", "FRA", (8, 0), (10, 0), 100.0),
+        make_flight("FRASOF", "FRA", "SOF", (11, 0), (13, 0), 120.0),
+        # Leaves before the minimum connection time after LHRFRA lands
+        make_flight("FRASF2", "FRA", "SOF", (10, 30), (12, 0), 50.0),
+        make_flight("LHRMUC", "LHR", "MUC", (7, 0), (9, 0), 60.0),
+        make_flight("MUCVIE", "MUC", "VIE", (10, 0), (11, 0), 40.0),
+        make_flight("VIESOF", "VIE", "SOF", (12, 0), (14, 0), 50.0),
+    ])
+    return flight_graph
+
+
+def flight_numbers(legs):
+    return [leg.flight_number for leg in legs]
+
+
+def test_earliest_arrival(graph):
+    legs = graph.earliest_arrival("LHR", "SOF", DEPART_AFTER, DEPART_BEFORE, 2, MIN_CONNECTION, MAX_LAYOVER)
+    assert flight_numbers(legs) == ["LHRFRA", "FRASOF"]
+
+
+def test_earliest_arrival_respects_max_stops(graph):
+    legs = graph.earliest_arrival("LHR", "SOF", DEPART_AFTER, DEPART_BEFORE, 0, MIN_CONNECTION, MAX_LAYOVER)
+    assert flight_numbers(legs) == ["LHRSOF"]
+
+
+def test_cheapest(graph):
+    legs = graph.cheapest("LHR", "SOF", DEPART_AFTER, DEPART_BEFORE, 2, MIN_CONNECTION, MAX_LAYOVER)
+    assert flight_numbers(legs) == ["LHRMUC", "MUCVIE", "VIESOF"]
+
+    legs = graph.cheapest("LHR", "SOF", DEPART_AFTER, DEPART_BEFORE, 1, MIN_CONNECTION, MAX_LAYOVER)
+    assert flight_numbers(legs) == ["LHRFRA", "FRASOF"]
+
+
+def test_no_connection(graph):
+    assert graph.earliest_arrival("SOF", "LHR", DEPART_AFTER, DEPART_BEFORE, 2, MIN_CONNECTION, MAX_LAYOVER) is None
+    assert graph.cheapest("LHR", "SOF", DEPART_AFTER, datetime(2023, 8, 10, 6, 0), 2,
+                          MIN_CONNECTION, MAX_LAYOVER) is None
+
+
+def test_date_only_depart_before_includes_that_day(graph):
+    app = Flask(__name__)
+    app.config.from_object(BaseConfig)
+    graph.max_age = app.config["CONNECTION_GRAPH_MAX_AGE"]
+
+    with app.app_context(), patch("api.services.connections_service.flight_graph", graph):
+        response, status_code = search_connections_service("LHR", "SOF", "2023-08-10", "2023-08-10")
+
+    assert status_code == 200
+    assert [leg["flight_number"] for leg in response["Itinerary"]["legs"]] == ["LHRFRA", "FRASOF"]
+
+
+def test_upsert_and_remove(graph):
+    graph.upsert(make_flight("LHRSF3", "LHR", "SOF", (6, 0), (9, 0), 700.0))
+    legs = graph.earliest_arrival("LHR", "SOF", DEPART_AFTER, DEPART_BEFORE, 2, MIN_CONNECTION, MAX_LAYOVER)
+    assert flight_numbers(legs) == ["LHRSF3"]
+
+    # Moving the flight later makes the FRA connection the earliest again
+    graph.upsert(make_flight("LHRSF3", "LHR", "SOF", (20, 0), (23, 30), 700.0))
+    legs = graph.earliest_arrival("LHR", "SOF", DEPART_AFTER, DEPART_BEFORE, 2, MIN_CONNECTION, MAX_LAYOVER)
+    assert flight_numbers(legs) == ["LHRFRA", "FRASOF"]
+
+    graph.remove("FRASOF")
+    graph.remove("VIESOF")
+    legs = graph.earliest_arrival("LHR", "SOF", DEPART_AFTER, DEPART_BEFORE, 2, MIN_CONNECTION, MAX_LAYOVER)
+    assert flight_numbers(legs) == ["LHRSOF"]
+
+
+def test_upsert_before_load_is_ignored():
+    flight_graph = FlightGraph()
+    flight_graph.upsert(make_flight("LHRSOF", "LHR", "SOF", (18, 0), (23, 0), 500.0))
+    assert not flight_graph.loaded
+    assert flight_graph.departures("LHR", DEPART_AFTER, DEPART_BEFORE) == []
+
+
+def test_stale_graph_is_reloaded_by_one_thread_while_the_others_search_it(graph):
+    reloading, release = threading.Event(), threading.Event()
+    reloads = []
+
+    def slow_query_flight_legs_stream():
+        reloads.append(threading.current_thread())
+        reloading.set()
+        release.wait(5)
+        return [make_flight("LHRSF3", "LHR", "SOF", (6, 0), (9, 0), 700.0)]
+
+    graph.invalidate()
+    with patch("api.services.connections_service.query_flight_legs_stream", slow_query_flight_legs_stream):
+        reloader = threading.Thread(target=graph.ensure_fresh)
+        reloader.start()
+        assert reloading.wait(5)
+
+        # Returns straight away and searches the old graph
+        graph.ensure_fresh()
+        assert len(graph.departures("LHR", DEPART_AFTER, DEPART_BEFORE)) == 3
+
+        release.set()
+        reloader.join(5)
+
+    assert reloads == [reloader]
+    assert flight_numbers(graph.departures("LHR", DEPART_AFTER, DEPART_BEFORE)) == ["LHRSF3"]
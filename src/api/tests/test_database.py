@@ -0,0 +1,71 @@
+import pytest
+from flask import Flask
+
+from api.db.database import READ_REPLICA, REPLICA_BIND_KEY, after_commit, db
+from api.db.models.users_model import Users
+from api.db.repositories.users_repository import add_user_to_db, query_all_users, query_user_by_email
+
+USER_ID = "0189c6a4-7c2e-7d4e-8f7a-3b1c2d4e5f60"
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tmp_path / 'primary.db'}"
+    app.config["SQLALCHEMY_BINDS"] = {REPLICA_BIND_KEY: f"sqlite:///{tmp_path / 'replica.db'}"}
+    db.init_app(app)
+
+    # The same user, with a different name on each side, shows where a query was answered
+    with app.app_context():
+        for engine, first_name in ((db.engines[None], "Primary"), (db.engines[REPLICA_BIND_KEY], "Replica")):
+            db.metadata.create_all(bind=engine)
+            with engine.begin() as connection:
+                connection.execute(Users.__table__.insert(), {"id": USER_ID, "first_name": first_name,
+                                                              "last_name": "User", "email": "user@gmail.com",
+                                                              "password": "secret"})
+    yield app
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+def test_reads_from_primary_by_default(app):
+    with app.app_context():
+        assert query_all_users()[0].first_name == "Primary"
+
+
+def test_read_only_queries_go_to_replica(app):
+    with app.app_context():
+        db.session.info[READ_REPLICA] = True
+        assert query_all_users()[0].first_name == "Replica"
+        # Not marked with on_replica
+        assert db.session.query(Users.first_name).scalar() == "Primary"
+
+
+def test_reads_own_writes_from_primary(app):
+    with app.app_context():
+        db.session.info[READ_REPLICA] = True
+        add_user_to_db(Users(id="0189c6a4-7c2e-7d4e-8f7a-3b1c2d4e5f61", first_name="New", last_name="User",
+                             email="new@gmail.com", password="secret"))
+
+        assert query_user_by_email("new@gmail.com").first_name == "New"
+        assert {user.first_name for user in query_all_users()} == {"Primary", "New"}
+
+
+def test_after_commit_callbacks_run_only_for_committed_changes(app):
+    new_user = Users(id="0189c6a4-7c2e-7d4e-8f7a-3b1c2d4e5f61", first_name="New", last_name="User",
+                     email="new@gmail.com", password="secret")
+    called = []
+    with app.app_context():
+        add_user_to_db(new_user)
+        after_commit(lambda user: called.append(user.first_name), new_user)
+        db.session.rollback()
+        assert called == []
+
+        db.session.add(new_user)
+        db.session.flush()
+        after_commit(lambda user: called.append(user.first_name), new_user)
+        after_commit(lambda: 1 / 0)
+        db.session.commit()
+        assert called == ["New"]
@@ -0,0 +1,73 @@
+import threading
+
+import pytest
+from flask import Flask
+
+from api.services.flight_numbers_service import FlightNumberAllocator, MAX_FLIGHT_NUMBERS, encode_flight_number
+
+
+class FakeSequence:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.next_value = 0
+        self.reservations = 0
+
+    def reserve(self, name, size):
+        with self.lock:
+            self.reservations += 1
+            first = self.next_value
+            self.next_value += size
+            return first
+
+
+def test_encode_flight_number():
+    assert encode_flight_number(0) == "G00000"
+    assert encode_flight_number(36) == "G00010"
+    assert encode_flight_number(MAX_FLIGHT_NUMBERS - 1) == "ZZZZZZ"
+    with pytest.raises(ValueError):
+        encode_flight_number(MAX_FLIGHT_NUMBERS)
+
+
+def test_encoded_flight_numbers_never_look_like_hex_ones():
+    for value in (0, 12345, 36 ** 5, MAX_FLIGHT_NUMBERS // 2):
+        assert encode_flight_number(value)[0] not in "0123456789ABCDEF"
+
+
+def test_allocator_reserves_one_block_per_block_size():
+    sequence = FakeSequence()
+    allocator = FlightNumberAllocator(block_size=10, reserve=sequence.reserve)
+
+    flight_numbers = [allocator.allocate() for _ in range(25)]
+    assert sequence.reservations == 3
+    assert flight_numbers == sorted(flight_numbers)
+    assert len(set(flight_numbers)) == 25
+
+
+def test_allocator_block_size_defaults_to_the_app_config():
+    sequence = FakeSequence()
+    allocator = FlightNumberAllocator(reserve=sequence.reserve)
+    app = Flask(__name__)
+    app.config["FLIGHT_NUMBER_BLOCK_SIZE"] = 4
+
+    with app.app_context():
+        for _ in range(9):
+            allocator.allocate()
+    assert sequence.reservations == 3
+    assert sequence.next_value == 12
+
+
+def test_allocators_sharing_a_sequence_never_collide():
+    sequence = FakeSequence()
+    allocators = [FlightNumberAllocator(block_size=7, reserve=sequence.reserve) for _ in range(4)]
+    flight_numbers = []
+
+    def allocate(allocator):
+        flight_numbers.extend(allocator.allocate() for _ in range(100))
+
+    threads = [threading.Thread(target=allocate, args=(allocator,)) for allocator in allocators]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(set(flight_numbers)) == 400
@@ -1,7 +1,9 @@
 from collections import namedtuple
+from datetime import datetime
 from unittest.mock import patch, MagicMock
 
 import pytest
+from flask import Flask
 
 from api.services.flights_services import *
 
@@ -12,8 +14,8 @@ def sample_flight():
         flight_number="F123",
         start_destination="City A",
         end_destination="City B",
-        takeoff_time="2023-08-10 10:00",
-        landing_time="2023-08-10 12:00",
+        takeoff_time=datetime(2023, 8, 10, 10, 0),
+        landing_time=datetime(2023, 8, 10, 12, 0),
         price=200.0
     )
 
@@ -25,16 +27,16 @@ def sample_flight_list():
             flight_number="F123",
             start_destination="City A",
             end_destination="City B",
-            takeoff_time="2023-08-10 10:00",
-            landing_time="2023-08-10 12:00",
+            takeoff_time=datetime(2023, 8, 10, 10, 0),
+            landing_time=datetime(2023, 8, 10, 12, 0),
             price=200.0
         ),
         Flights(
             flight_number="F456",
             start_destination="City C",
             end_destination="City D",
-            takeoff_time="2023-08-10 14:00",
-            landing_time="2023-08-10 16:00",
+            takeoff_time=datetime(2023, 8, 10, 14, 0),
+            landing_time=datetime(2023, 8, 10, 16, 0),
             price=250.0
         ),
     ]
@@ -48,8 +50,8 @@ def empty_flights_table():
 @patch('api.services.flights_services.check_flight_existence')
 @patch('api.services.flights_services.add_flight_to_db')
 @patch('api.services.flights_services.create_flight')
-@patch('api.services.flights_services.close_db_session')
-def test_add_flight_service(mock_close_db_session, mock_create_flight, mock_add_flight_to_db,
+@patch('api.services.flights_services.after_commit')
+def test_add_flight_service(mock_after_commit, mock_create_flight, mock_add_flight_to_db,
                             mock_check_flight_existence):
     mock_request = MagicMock()
     mock_request.json = {"data": "flight_data"}
@@ -59,13 +61,12 @@ def test_add_flight_service(mock_close_db_session, mock_create_flight, mock_add_
     assert status_code == 200
     assert response == {"Message": "New flight added to DB!"}
     mock_add_flight_to_db.called_once_with(sample_flight)
-    mock_close_db_session.assert_called_once()
+    mock_after_commit.assert_called_once_with(flight_graph.upsert, sample_flight)
 
 
 @patch('api.services.flights_services.check_flight_existence')
 @patch('api.services.flights_services.add_flight_to_db')
-@patch('api.services.flights_services.close_db_session')
-def test_add_flight_service_existing_flight(mock_close_db_session, mock_add_flight_to_db, mock_check_flight_existence):
+def test_add_flight_service_existing_flight(mock_add_flight_to_db, mock_check_flight_existence):
     mock_request = MagicMock()
     mock_request.json = {"data": "existing_flight"}
     mock_check_flight_existence.return_value = True
@@ -74,14 +75,12 @@ def test_add_flight_service_existing_flight(mock_close_db_session, mock_add_flig
     assert response == {
         'Message': 'Cannot add the certain flight! A flight with the same data already exist in the database!'}
     mock_add_flight_to_db.assert_not_called()
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.flights_services.check_flight_existence')
 @patch('api.services.flights_services.add_flight_to_db')
 @patch('api.services.flights_services.create_flight')
-@patch('api.services.flights_services.close_db_session')
-def test_add_flight_service_exception(mock_close_db_session, mock_create_flight, mock_add_flight_to_db,
+def test_add_flight_service_exception(mock_create_flight, mock_add_flight_to_db,
                                       mock_check_flight_existence):
     mock_request = MagicMock()
     mock_request.json = {"data": "existing_flight"}
@@ -92,65 +91,75 @@ def test_add_flight_service_exception(mock_close_db_session, mock_create_flight,
     assert status_code == 500
     assert response == {"Message": f"Couldn't create a new flight. Please try again later!",
                         "Error": "Test exception"}
-    mock_close_db_session.assert_called_once()
 
 
-@patch('api.services.flights_services.query_all_flights')
-@patch('api.services.flights_services.close_db_session')
-def test_get_flights_service_not_empty(mock_close_db_session, mock_query_all_flights, sample_flight_list):
-    mock_query_all_flights.return_value = sample_flight_list
+@patch('api.services.flights_services.query_flights_page')
+def test_get_flights_service_not_empty(mock_query_flights_page, sample_flight_list):
+    mock_query_flights_page.return_value = sample_flight_list
     response, status_code = get_flights_service()
     assert status_code == 200
     assert "Flights" in response
-    mock_close_db_session.assert_called_once()
+    assert response["Next"] is None
 
 
-@patch('api.services.flights_services.query_all_flights')
-@patch('api.services.flights_services.close_db_session')
-def test_get_flights_service_empty(mock_close_db_session, mock_query_all_flights):
-    mock_query_all_flights.return_value = []
+@patch('api.services.flights_services.query_flights_page')
+def test_get_flights_service_next_page(mock_query_flights_page, sample_flight_list):
+    mock_query_flights_page.return_value = sample_flight_list
+    response, status_code = get_flights_service(limit=1)
+    assert status_code == 200
+    assert len(response["Flights"]) == 1
+    assert decode_cursor(response["Next"], 2) == ["2023-08-10T10:00:00", "F123"]
+    mock_query_flights_page.assert_called_once_with(2, None)
+
+    get_flights_service(limit=1, after=response["Next"])
+    mock_query_flights_page.assert_called_with(2, (datetime(2023, 8, 10, 10, 0), "F123"))
+
+
+@patch('api.services.flights_services.query_flights_page')
+def test_get_flights_service_invalid_cursor(mock_query_flights_page):
+    response, status_code = get_flights_service(after="not a cursor")
+    assert status_code == 400
+    assert response == {"Message": "Invalid pagination cursor!"}
+    mock_query_flights_page.assert_not_called()
+
+
+@patch('api.services.flights_services.query_flights_page')
+def test_get_flights_service_empty(mock_query_flights_page):
+    mock_query_flights_page.return_value = []
     response, status_code = get_flights_service()
     assert status_code == 404
     assert response == {"Message": "The flights table is empty"}
-    mock_close_db_session.assert_called_once()
 
 
-@patch('api.services.flights_services.query_all_flights')
-@patch('api.services.flights_services.close_db_session')
-def test_get_flights_service_exception(mock_close_db_session, mock_query_all_flights):
-    mock_query_all_flights.side_effect = Exception("Test exception")
+@patch('api.services.flights_services.query_flights_page')
+def test_get_flights_service_exception(mock_query_flights_page):
+    mock_query_flights_page.side_effect = Exception("Test exception")
     response, status_code = get_flights_service()
     assert status_code == 500
     assert response == {
         "Message": "Couldn't retrieve flights from DB!",
         "Error": "Test exception",
     }
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.flights_services.query_flight_by_flight_number')
-@patch('api.services.flights_services.close_db_session')
-def test_get_flight_service_existing(mock_close_db_session, mock_query_flight, sample_flight):
+def test_get_flight_service_existing(mock_query_flight, sample_flight):
     mock_query_flight.return_value = sample_flight
     response, status_code = get_flight_service("F123")
     assert status_code == 200
     assert "Flight" in response
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.flights_services.query_flight_by_flight_number')
-@patch('api.services.flights_services.close_db_session')
-def test_get_flight_service_non_existing(mock_close_db_session, mock_query_flight):
+def test_get_flight_service_non_existing(mock_query_flight):
     mock_query_flight.return_value = None
     response, status_code = get_flight_service("Wrong FN")
     assert status_code == 404
     assert response == {"Message": "Flight with number Wrong FN doesn't exist in the DB!"}
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.flights_services.query_flight_by_flight_number')
-@patch('api.services.flights_services.close_db_session')
-def test_get_flight_service_exception(mock_close_db_session, mock_query_flight):
+def test_get_flight_service_exception(mock_query_flight):
     mock_query_flight.side_effect = Exception("Test exception")
     response, status_code = get_flight_service("F123")
     assert status_code == 500
@@ -158,13 +167,11 @@ def test_get_flight_service_exception(mock_close_db_session, mock_query_flight):
         "Message": "Couldn't retrieve flight with number F123 from DB!",
         "Error": "Test exception",
     }
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.flights_services.query_flight_by_flight_number')
 @patch('api.services.flights_services.query_passengers_on_flight')
-@patch('api.services.flights_services.close_db_session')
-def test_get_flight_passengers_service_full_flight(mock_close_db_session, mock_query_passengers, mock_query_flight):
+def test_get_flight_passengers_service_full_flight(mock_query_passengers, mock_query_flight):
     flight_number = "F123"
     mock_query_flight.return_value = sample_flight
     PassengerRow = namedtuple('PassengerRow', ['booking_id', 'uuid', 'email', 'first_name', 'last_name'])
@@ -180,25 +187,21 @@ def test_get_flight_passengers_service_full_flight(mock_close_db_session, mock_q
     response, status_code = get_flight_passengers_service(flight_number)
     assert status_code == 200
     assert f"Passengers for flight {flight_number}" in response
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.flights_services.query_flight_by_flight_number')
-@patch('api.services.flights_services.close_db_session')
-def test_get_flight_passengers_service_wrong_flight_number(mock_close_db_session, mock_query_flight):
+def test_get_flight_passengers_service_wrong_flight_number(mock_query_flight):
     flight_number = "Wrong number"
     mock_query_flight.return_value = None
 
     response, status_code = get_flight_passengers_service(flight_number)
     assert status_code == 404
     assert response == {"Message": f"Flight with number {flight_number} doesn't exist in the DB!"}
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.flights_services.query_flight_by_flight_number')
 @patch('api.services.flights_services.query_passengers_on_flight')
-@patch('api.services.flights_services.close_db_session')
-def test_get_flight_passengers_service_empty_flight(mock_close_db_session, mock_query_passengers, mock_query_flight):
+def test_get_flight_passengers_service_empty_flight(mock_query_passengers, mock_query_flight):
     flight_number = "F123"
     mock_query_flight.return_value = sample_flight
     mock_query_passengers.return_value = []
@@ -206,13 +209,11 @@ def test_get_flight_passengers_service_empty_flight(mock_close_db_session, mock_
     response, status_code = get_flight_passengers_service(flight_number)
     assert status_code == 404
     assert response == {"Message": f"Flight with number {flight_number} is empty!"}
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.flights_services.query_flight_by_flight_number')
 @patch('api.services.flights_services.query_passengers_on_flight')
-@patch('api.services.flights_services.close_db_session')
-def test_get_flight_passengers_service_exception(mock_close_db_session, mock_query_passengers, mock_query_flight):
+def test_get_flight_passengers_service_exception(mock_query_passengers, mock_query_flight):
     flight_number = "F123"
     mock_query_flight.side_effect = Exception("Test exception")
     mock_query_passengers.side_effect = Exception("Test exception")
@@ -223,13 +224,57 @@ def test_get_flight_passengers_service_exception(mock_close_db_session, mock_que
         "Message": f"Couldn't retrieve passengers for flight {flight_number} from DB!",
         "Error": "Test exception",
     }
-    mock_close_db_session.assert_called_once()
+
+
+@pytest.mark.parametrize("mimetype, expected_body", [
+    ("text/csv", "booking_id,id,email,first_name,last_name\r\n"
+                 "70e4c838,cd3348a0,dani@gmail.com,Dani,Ivanov\r\n"
+                 "8c8565cf,46916341,ivan@gmail.com,Ivan,Obreshkov\r\n"),
+    ("application/x-ndjson",
+     '{"booking_id": "70e4c838", "id": "cd3348a0", "email": "dani@gmail.com", "first_name": "Dani", '
+     '"last_name": "Ivanov"}\n'
+     '{"booking_id": "8c8565cf", "id": "46916341", "email": "ivan@gmail.com", "first_name": "Ivan", '
+     '"last_name": "Obreshkov"}\n'),
+])
+@patch('api.services.flights_services.query_flight_by_flight_number')
+@patch('api.services.flights_services.query_passengers_stream')
+def test_stream_flight_passengers_service(mock_query_passengers_stream, mock_query_flight,
+                                          sample_flight, mimetype, expected_body):
+    PassengerRow = namedtuple('PassengerRow', ['booking_id', 'id', 'email', 'first_name', 'last_name'])
+    passengers = MagicMock()
+    passengers.column_descriptions = [{"name": name} for name in PassengerRow._fields]
+    passengers.__iter__.return_value = [
+        PassengerRow(booking_id='70e4c838', id='cd3348a0', email='dani@gmail.com', first_name='Dani',
+                     last_name='Ivanov'),
+        PassengerRow(booking_id='8c8565cf', id='46916341', email='ivan@gmail.com', first_name='Ivan',
+                     last_name='Obreshkov')
+    ]
+    mock_query_flight.return_value = sample_flight
+    mock_query_passengers_stream.return_value = passengers
+
+    with Flask(__name__).test_request_context():
+        response = stream_flight_passengers_service("F123", mimetype)
+        assert response.is_streamed
+        assert response.get_data(as_text=True) == expected_body
+    assert response.mimetype == mimetype
+
+
+@patch('api.services.flights_services.query_flight_by_flight_number')
+@patch('api.services.flights_services.query_passengers_stream')
+def test_stream_flight_passengers_service_wrong_flight_number(mock_query_passengers_stream,
+                                                              mock_query_flight):
+    mock_query_flight.return_value = None
+
+    response, status_code = stream_flight_passengers_service("Wrong number", "text/csv")
+    assert status_code == 404
+    assert response == {"Message": "Flight with number Wrong number doesn't exist in the DB!"}
+    mock_query_passengers_stream.assert_not_called()
 
 
 @patch('api.services.flights_services.query_flight_by_flight_number')
 @patch('api.services.flights_services.delete_flight_from_db')
-@patch('api.services.flights_services.close_db_session')
-def test_delete_flight_service_existing_flight(mock_close_db_session, mock_delete_flight, mock_query_flight):
+@patch('api.services.flights_services.after_commit')
+def test_delete_flight_service_existing_flight(mock_after_commit, mock_delete_flight, mock_query_flight):
     flight_number = "F123"
     mock_query_flight.return_value = sample_flight
 
@@ -237,13 +282,12 @@ def test_delete_flight_service_existing_flight(mock_close_db_session, mock_delet
     assert status_code == 200
     assert response == {"Message": f"Flight with number: {flight_number} was removed successfully from the DB"}
     mock_delete_flight.assert_called_once()
-    mock_close_db_session.assert_called_once()
+    mock_after_commit.assert_called_once_with(flight_graph.remove, flight_number)
 
 
 @patch('api.services.flights_services.query_flight_by_flight_number')
 @patch('api.services.flights_services.delete_flight_from_db')
-@patch('api.services.flights_services.close_db_session')
-def test_delete_flight_service_wrong_flight_number(mock_close_db_session, mock_delete_flight, mock_query_flight):
+def test_delete_flight_service_wrong_flight_number(mock_delete_flight, mock_query_flight):
     flight_number = "Wrong number"
     mock_query_flight.return_value = None
 
@@ -251,14 +295,12 @@ def test_delete_flight_service_wrong_flight_number(mock_close_db_session, mock_d
     assert status_code == 404
     assert response == {"Message": f"Flight with number: {flight_number} doesn't exist in the DB!"}
     mock_delete_flight.assert_not_called()
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.flights_services.query_flight_by_flight_number')
 @patch('api.services.flights_services.delete_flight_from_db')
-@patch('api.services.flights_services.close_db_session')
 @patch("api.services.flights_services.db_rollback")
-def test_delete_flight_service_exception(mock_db_rollback, mock_close_db_session, mock_delete_flight,
+def test_delete_flight_service_exception(mock_db_rollback, mock_delete_flight,
                                          mock_query_flight):
     flight_number = "F123"
     mock_delete_flight.side_effect = Exception("Test exception")
@@ -269,14 +311,13 @@ def test_delete_flight_service_exception(mock_db_rollback, mock_close_db_session
     assert response == {"Message": f"Couldn't delete flight with number: {flight_number} from DB!",
                         "Error": "Test exception"}
     mock_delete_flight.assert_not_called()
-    mock_close_db_session.assert_called_once()
     mock_db_rollback.assert_called_once()
 
 
 @patch('api.services.flights_services.query_flight_by_flight_number')
 @patch('api.services.flights_services.edit_flight_data')
-@patch('api.services.flights_services.close_db_session')
-def test_update_flight_service_existing_flight(mock_close_db_session, mock_edit_flight_data, mock_query_flight):
+@patch('api.services.flights_services.after_commit')
+def test_update_flight_service_existing_flight(mock_after_commit, mock_edit_flight_data, mock_query_flight):
     flight_number = "F123"
     mock_query_flight.return_value = sample_flight
     request = MagicMock()
@@ -285,13 +326,25 @@ def test_update_flight_service_existing_flight(mock_close_db_session, mock_edit_
     assert status_code == 200
     assert response == {"Message": f"Flight with number: {flight_number} was updated successfully."}
     mock_edit_flight_data.assert_called_once_with(sample_flight, request.json)
-    mock_close_db_session.assert_called_once()
+    mock_after_commit.assert_called_once_with(flight_graph.upsert, sample_flight)
+
+
+@patch('api.services.flights_services.query_flight_by_flight_number')
+@patch('api.services.flights_services.edit_flight_data')
+def test_update_flight_service_lands_before_takeoff(mock_edit_flight_data, mock_query_flight,
+                                                    sample_flight):
+    mock_query_flight.return_value = sample_flight
+    request = MagicMock()
+    request.json = {"landing_time": "2023-08-10 09:00"}
+    response, status_code = update_flight_service("F123", request)
+    assert status_code == 400
+    assert response == {"Message": "Landing time must be after takeoff time!"}
+    mock_edit_flight_data.assert_not_called()
 
 
 @patch('api.services.flights_services.query_flight_by_flight_number')
 @patch('api.services.flights_services.edit_flight_data')
-@patch('api.services.flights_services.close_db_session')
-def test_update_flight_service_wrong_flight_number(mock_close_db_session, mock_edit_flight_data, mock_query_flight):
+def test_update_flight_service_wrong_flight_number(mock_edit_flight_data, mock_query_flight):
     flight_number = "Wrong number"
     mock_query_flight.return_value = None
     request = MagicMock()
@@ -300,14 +353,12 @@ def test_update_flight_service_wrong_flight_number(mock_close_db_session, mock_e
     assert status_code == 404
     assert response == {"Message": f"Flight with number: {flight_number} doesn't exist in the DB!"}
     mock_edit_flight_data.assert_not_called()
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.flights_services.query_flight_by_flight_number')
 @patch('api.services.flights_services.edit_flight_data')
-@patch('api.services.flights_services.close_db_session')
 @patch("api.services.flights_services.db_rollback")
-def test_update_flight_service_exception(mock_db_rollback, mock_close_db_session, mock_edit_flight_data,
+def test_update_flight_service_exception(mock_db_rollback, mock_edit_flight_data,
                                          mock_query_flight):
     flight_number = "F123"
     mock_query_flight.side_effect = Exception("Test exception")
@@ -319,5 +370,102 @@ def test_update_flight_service_exception(mock_db_rollback, mock_close_db_session
     assert response == {'Message': "Couldn't update flight with number: F123",
                         "Error": "Test exception"}
     mock_edit_flight_data.assert_not_called()
-    mock_close_db_session.assert_called_once()
     mock_db_rollback.assert_called_once()
+
+
+@patch('api.services.flights_services.query_flights_by_route')
+def test_search_flights_service_found(mock_query_flights_by_route, sample_flight_list):
+    mock_query_flights_by_route.return_value = sample_flight_list
+    response, status_code = search_flights_service("City A", "City B", "2023-08-10", "2023-08-11 09:30")
+    assert status_code == 200
+    assert len(response["Flights"]) == 2
+    mock_query_flights_by_route.assert_called_once_with("City A", "City B", datetime(2023, 8, 10),
+                                                        datetime(2023, 8, 11, 9, 30), 100)
+
+
+def test_search_flights_service_date_only_depart_before_includes_that_day(sqlite_app, add_flight):
+    # Takes off at 08:00
+    add_flight("G00001")
+    with sqlite_app.app_context():
+        response, status_code = search_flights_service("LHR", "SOF", "2023-08-10", "2023-08-10")
+
+    assert status_code == 200
+    assert [flight["flight_number"] for flight in response["Flights"]] == ["G00001"]
+
+
+@patch('api.services.flights_services.query_flights_by_route')
+def test_search_flights_service_not_found(mock_query_flights_by_route):
+    mock_query_flights_by_route.return_value = []
+    response, status_code = search_flights_service("City A", "City B")
+    assert status_code == 404
+    assert response == {"Message": "There are no flights from City A to City B in the given period!"}
+
+
+@patch('api.services.flights_services.query_flights_by_route')
+def test_search_flights_service_invalid_params(mock_query_flights_by_route):
+    response, status_code = search_flights_service("City A", None)
+    assert status_code == 400
+    assert response == {"Message": "Both from and to must be provided!"}
+
+    response, status_code = search_flights_service("City A", "City B", depart_after="next week")
+    assert status_code == 400
+    assert response == {"Message": "depart_after must be in the format YYYY-MM-DD HH:MM!"}
+    mock_query_flights_by_route.assert_not_called()
+
+
+@patch('api.services.flights_services.query_flight_availability')
+def test_get_flight_availability_service(mock_query_flight_availability):
+    AvailabilityRow = namedtuple('AvailabilityRow', ['capacity', 'seats_available'])
+    mock_query_flight_availability.return_value = AvailabilityRow(capacity=180, seats_available=12)
+    response, status_code = get_flight_availability_service("F123")
+    assert status_code == 200
+    assert response == {"Flight": "F123", "capacity": 180, "seats_available": 12}
+
+
+@patch('api.services.flights_services.query_flight_availability')
+def test_get_flight_availability_service_non_existing(mock_query_flight_availability):
+    mock_query_flight_availability.return_value = None
+    response, status_code = get_flight_availability_service("Wrong FN")
+    assert status_code == 404
+    assert response == {"Message": "Flight with number Wrong FN doesn't exist in the DB!"}
+
+
+@patch('api.services.flights_services.query_flight_by_flight_number')
+@patch('api.services.flights_services.update_flight_capacity')
+@patch('api.services.flights_services.query_flight_availability')
+@patch('api.services.flights_services.edit_flight_data')
+def test_update_flight_service_capacity_below_booked_seats(mock_edit_flight_data, mock_query_flight_availability,
+                                                           mock_update_flight_capacity, mock_query_flight,
+                                                           sample_flight):
+    AvailabilityRow = namedtuple('AvailabilityRow', ['capacity', 'seats_available'])
+    mock_query_flight.return_value = sample_flight
+    mock_update_flight_capacity.return_value = False
+    mock_query_flight_availability.return_value = AvailabilityRow(capacity=180, seats_available=30)
+    request = MagicMock()
+    request.json = {"capacity": 100}
+    response, status_code = update_flight_service("F123", request)
+    assert status_code == 409
+    assert response == {"Message": "Capacity cannot be lower than the 150 booked seats!"}
+    mock_update_flight_capacity.assert_called_once_with("F123", 100)
+    mock_edit_flight_data.assert_not_called()
+
+
+def test_update_flight_service_capacity_counts_bookings_made_since_the_flight_was_cached(sqlite_app, add_flight):
+    add_flight("G00001", capacity=180)
+    with sqlite_app.app_context():
+        # Caches the flight with all 180 seats free
+        query_flight_by_flight_number("G00001")
+        db.session.query(Flights).filter_by(flight_number="G00001").update({Flights.seats_available: 30})
+        db.session.commit()
+
+    request = MagicMock()
+    with sqlite_app.app_context():
+        request.json = {"capacity": 100}
+        assert update_flight_service("G00001", request) == \
+            ({"Message": "Capacity cannot be lower than the 150 booked seats!"}, 409)
+        db.session.rollback()
+
+        request.json = {"capacity": 160}
+        assert update_flight_service("G00001", request)[1] == 200
+        db.session.commit()
+        assert tuple(query_flight_availability("G00001")) == (160, 10)
@@ -0,0 +1,24 @@
+from api.benchmarks.http_load import SCENARIOS, percentile, run
+
+
+def test_percentile():
+    values = list(range(1, 101))
+
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([], 50) is None
+
+
+def test_run(tmp_path):
+    report = run(f"sqlite:///{tmp_path / 'http_load.db'}", flights=50, users=20, bookings=60, scenarios=SCENARIOS,
+                 requests=10, concurrency=2, seed=1, bcrypt_rounds=4)
+
+    assert [result["scenario"] for result in report["scenarios"]] == SCENARIOS
+    for result in report["scenarios"]:
+        assert result["requests"] == 10
+        assert result["errors"] == 0
+        assert result["queries"]["mean"] >= 1
+        assert result["latency_ms"]["p50"] <= result["latency_ms"]["p99"]
+    book = next(result for result in report["scenarios"] if result["scenario"] == "book")
+    assert book["statuses"] == {"200": 10}
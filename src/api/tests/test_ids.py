@@ -0,0 +1,54 @@
+import uuid
+
+import pytest
+
+from api.utilities import ids
+from api.utilities.ids import UUID7Generator, new_id, set_id_generator
+
+NOW_NS = 1_692_000_000_000 * 1_000_000
+
+
+def test_uuid7_layout():
+    generated = UUID7Generator(clock=lambda: NOW_NS)()
+    assert generated.version == 7
+    assert generated.variant == uuid.RFC_4122
+    assert generated.int >> 80 == NOW_NS // 1_000_000
+
+
+def test_uuid7_is_monotonic_within_a_millisecond():
+    generator = UUID7Generator(clock=lambda: NOW_NS)
+    generated = [generator() for _ in range(1000)]
+    assert generated == sorted(generated)
+    assert len(set(generated)) == 1000
+
+
+def test_uuid7_does_not_go_back_with_the_clock():
+    clock_values = iter([NOW_NS, NOW_NS - 5_000_000])
+    generator = UUID7Generator(clock=lambda: next(clock_values))
+    first, second = generator(), generator()
+    assert second > first
+
+
+def test_uuid7_counter_overflow_moves_to_next_millisecond():
+    generator = UUID7Generator(clock=lambda: NOW_NS)
+    first = generator()
+    generator._counter = (1 << 74) - 1
+    second = generator()
+    assert second.int >> 80 == (first.int >> 80) + 1
+
+
+@pytest.fixture
+def restore_id_generator():
+    yield
+    ids._id_generator = ids.uuid7
+
+
+def test_set_id_generator(restore_id_generator):
+    set_id_generator("uuid4")
+    assert uuid.UUID(new_id()).version == 4
+
+    set_id_generator(lambda: uuid.UUID(int=1))
+    assert new_id() == "00000000-0000-0000-0000-000000000001"
+
+    with pytest.raises(ValueError):
+        set_id_generator("sequential")
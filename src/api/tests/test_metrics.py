@@ -0,0 +1,75 @@
+import pytest
+from flask import Flask
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from api.utilities.metrics import Metrics, instrumented
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    Metrics.init_app(app)
+
+    @app.get("/flights")
+    def get_flights_route():
+        return {"Message": "The flights table is empty"}, 404
+
+    return app.test_client()
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def test_counts_and_times_requests(client):
+    requests_before = sample("http_requests_total", endpoint="get_flights_route", method="GET", status="404")
+    timed_before = sample("http_request_duration_seconds_count", endpoint="get_flights_route", method="GET")
+
+    client.get("/flights")
+    client.get("/flights")
+
+    assert sample("http_requests_total", endpoint="get_flights_route", method="GET", status="404") == \
+        requests_before + 2
+    assert sample("http_request_duration_seconds_count", endpoint="get_flights_route", method="GET") == \
+        timed_before + 2
+
+
+def test_serves_metrics(client):
+    client.get("/missing")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain")
+    assert 'http_requests_total{endpoint="unmatched",method="GET",status="404"}' in response.get_data(as_text=True)
+
+
+def test_attributes_queries_to_repository_functions(session):
+    @instrumented
+    def query_numbers():
+        return session.execute(text("SELECT 1")).all() + session.execute(text("SELECT 2")).all()
+
+    @instrumented
+    def query_numbers_stream():
+        return session.query(text("3")).yield_per(10)
+
+    before = sample("db_queries_total", repository="test_metrics.query_numbers")
+    stream_before = sample("db_queries_total", repository="test_metrics.query_numbers_stream")
+
+    query_numbers()
+    # Executed after the function has returned
+    assert list(query_numbers_stream()) == [(3,)]
+
+    assert sample("db_queries_total", repository="test_metrics.query_numbers") == before + 2
+    assert sample("db_queries_total", repository="test_metrics.query_numbers_stream") == stream_before + 1
+    assert sample("db_query_duration_seconds_count", repository="test_metrics.query_numbers") == before + 2
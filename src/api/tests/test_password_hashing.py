@@ -0,0 +1,90 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from api.routes.login_route import login_bp
+from api.routes.register_route import register_bp
+from api.utilities.password_hashing import PasswordHasher, PasswordHasherBusy, password_hasher
+
+TEMPLATES = os.path.join(os.path.dirname(os.path.dirname(__file__)), "templates")
+
+
+@pytest.fixture
+def process_pool_hasher():
+    hasher = PasswordHasher(workers=1, max_pending=4, rounds=4)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_hashes_on_worker_processes(process_pool_hasher):
+    hashed_password = process_pool_hasher.hash("test1234")
+
+    assert hashed_password.startswith("$2b$04$")
+    assert process_pool_hasher.check(hashed_password, "test1234")
+    assert not process_pool_hasher.check(hashed_password, "test12345")
+    assert process_pool_hasher.stats()["completed"] == 3
+    assert process_pool_hasher.stats()["pending"] == 0
+
+
+def test_hashes_in_request_thread_without_workers():
+    hasher = PasswordHasher(workers=0, rounds=4)
+
+    assert hasher.check(hasher.hash("test1234"), "test1234")
+
+
+def test_rejects_hashes_over_the_limit():
+    hasher = PasswordHasher(workers=0, max_pending=1, rounds=4)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=hasher._run, args=("Hashing the password", slow_hash))
+    thread.start()
+    started.wait(5)
+    try:
+        with pytest.raises(PasswordHasherBusy):
+            hasher.hash("test1234")
+    finally:
+        release.set()
+        thread.join()
+
+    assert hasher.stats()["rejected"] == 1
+    # The slot is free again once the slow hash is done
+    assert hasher.hash("test1234")
+
+
+def test_starts_a_new_pool_when_a_worker_dies(process_pool_hasher):
+    with pytest.raises(PasswordHasherBusy, match="Hashing the password failed"):
+        process_pool_hasher._run("Hashing the password", os._exit, 1)
+
+    assert process_pool_hasher.stats()["pending"] == 0
+    assert process_pool_hasher.hash("test1234").startswith("$2b$04$")
+
+
+def test_init_app_reads_config():
+    app = Flask(__name__)
+    app.config.update(PASSWORD_HASH_WORKERS=3, PASSWORD_HASH_QUEUE=6, BCRYPT_ROUNDS=10, PASSWORD_HASH_TIMEOUT=5)
+    hasher = PasswordHasher()
+
+    hasher.init_app(app)
+
+    assert app.extensions["password_hasher"] is hasher
+    assert (hasher.workers, hasher.max_pending, hasher.rounds, hasher.timeout) == (3, 6, 10, 5)
+
+
+def test_login_returns_503_when_busy(mocker):
+    app = Flask(__name__, template_folder=TEMPLATES)
+    app.register_blueprint(login_bp)
+    app.register_blueprint(register_bp)
+    mocker.patch("api.routes.login_route.query_user_by_email", return_value=SimpleNamespace(password="hash"))
+    mocker.patch.object(password_hasher, "check", side_effect=PasswordHasherBusy("Too many passwords"))
+
+    response = app.test_client().post("/login", data={"email": "ivan@gmail.com", "password": "test1234"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
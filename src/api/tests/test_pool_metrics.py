@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from api.db.pool_metrics import MeteredQueuePool, PoolMetrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=MeteredQueuePool,
+                           pool_size=1, max_overflow=1, pool_timeout=0)
+    yield engine
+    engine.dispose()
+
+
+def test_counts_checkouts_and_hold_time(engine, clock):
+    metrics = PoolMetrics(engine, clock=clock)
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        clock.now += 2.0
+    with engine.connect():
+        clock.now += 1.0
+
+    stats = metrics.stats()
+    assert stats["pool"] == "MeteredQueuePool"
+    assert stats["connects"] == 1
+    assert stats["checkouts"] == 2
+    assert stats["checked_out"] == 0
+    assert stats["hold_time"] == {"total": 3.0, "mean": 1.5, "max": 2.0}
+    assert stats["connection_age"] == {"mean": 3.0, "max": 3.0}
+    assert metrics.waits == 2
+
+
+def test_counts_overflow_and_timeouts(engine, clock):
+    metrics = PoolMetrics(engine, clock=clock)
+
+    first, second = engine.connect(), engine.connect()
+    assert metrics.stats()["overflow"] == 1
+    with pytest.raises(exc.TimeoutError):
+        engine.connect()
+    first.close()
+    second.close()
+
+    stats = metrics.stats()
+    assert stats["timeouts"] == 1
+    assert stats["checkouts"] == 2
+    assert stats["connections"] == 1
+
+
+def test_keeps_counting_after_dispose(engine, clock):
+    metrics = PoolMetrics(engine, clock=clock)
+
+    with engine.connect():
+        pass
+    engine.dispose()
+    assert metrics.stats()["connections"] == 0
+
+    with engine.connect():
+        pass
+    assert metrics.stats()["checkouts"] == 2
+    assert metrics.waits == 2
@@ -0,0 +1,99 @@
+import os
+import pstats
+import time
+from datetime import datetime, timedelta
+
+import jwt
+import pytest
+from flask import Flask
+
+from api.utilities.profiling import PROFILE_HEADER, Profiling, SamplingProfiler
+
+SECRET_KEY = "test_secret_key"
+
+
+def auth_token(admin):
+    return jwt.encode({"sub": "user_1", "admin": admin, "exp": datetime.utcnow() + timedelta(hours=1)},
+                      SECRET_KEY, algorithm="HS256")
+
+
+def busy_view():
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    return {"Message": "OK"}, 200
+
+
+def make_app(profile_dir, profiler="cprofile", sample_rate=0.0):
+    app = Flask(__name__)
+    app.config.update(PROFILE_DIR=profile_dir, PROFILER=profiler, PROFILE_SAMPLE_RATE=sample_rate,
+                      PROFILE_SAMPLING_INTERVAL_MS=1)
+    Profiling.init_app(app)
+    app.add_url_rule("/busy", "busy_view", busy_view)
+    return app
+
+
+@pytest.fixture(autouse=True)
+def secret_key(monkeypatch):
+    monkeypatch.setenv("SECRET_KEY", SECRET_KEY)
+
+
+def test_disabled_without_profile_dir():
+    app = make_app(None)
+
+    assert not app.before_request_funcs
+    assert not app.teardown_request_funcs
+
+
+def test_profiles_requests_with_admin_header(tmp_path):
+    client = make_app(str(tmp_path)).test_client()
+
+    response = client.get("/busy", headers={PROFILE_HEADER: auth_token(admin=True)})
+
+    profile = tmp_path / response.headers["X-Profile-File"]
+    assert profile.name.endswith("-GET-busy_view-" + profile.name.rsplit("-", 1)[1])
+    stats = pstats.Stats(str(profile))
+    assert any(function == "busy_view" for _, _, function in stats.stats)
+
+
+def test_ignores_header_without_admin_token(tmp_path):
+    client = make_app(str(tmp_path)).test_client()
+
+    for token in (auth_token(admin=False), "not a token"):
+        response = client.get("/busy", headers={PROFILE_HEADER: token})
+        assert "X-Profile-File" not in response.headers
+
+    assert not os.listdir(tmp_path)
+
+
+def test_samples_requests(tmp_path):
+    client = make_app(str(tmp_path), sample_rate=1.0).test_client()
+
+    response = client.get("/busy")
+
+    assert "X-Profile-File" not in response.headers
+    assert len(os.listdir(tmp_path)) == 1
+
+
+def test_sampling_profiler_writes_collapsed_stacks(tmp_path):
+    client = make_app(str(tmp_path), profiler="sampling").test_client()
+
+    response = client.get("/busy", headers={PROFILE_HEADER: auth_token(admin=True)})
+
+    profile = tmp_path / response.headers["X-Profile-File"]
+    assert profile.suffix == ".collapsed"
+    lines = profile.read_text().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert "busy_view (test_profiling.py:" in stack
+    assert int(count) > 0
+
+
+def test_sampling_profiler_only_samples_its_thread():
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.enable()
+    busy_view()
+    profiler.disable()
+
+    assert all("_sample (profiling.py" not in stack for stack in profiler.stacks)
+    assert sum(profiler.stacks.values()) > 5
@@ -0,0 +1,143 @@
+import logging
+import uuid
+
+import pytest
+from flask import request
+
+from api.db.database import db
+from api.services.bookings_services import add_booking_service, add_group_booking_service, get_bookings_service
+from api.services.flights_services import delete_flight_service
+from api.utilities.query_counter import QueryBudget, QueryCounter, query_budget
+
+
+def user_ids(count):
+    return [str(uuid.uuid4()) for _ in range(count)]
+
+
+def book(sqlite_app, flight_number, user_ids):
+    for user_id in user_ids:
+        with sqlite_app.test_request_context(json={"user_id": user_id, "flight_number": flight_number}):
+            add_booking_service(request)
+            db.session.commit()
+
+
+def test_add_booking_service_query_count(sqlite_app, add_flight, add_user):
+    add_flight("G00001")
+    user_id, = user_ids(1)
+    add_user(user_id)
+
+    with sqlite_app.test_request_context(json={"user_id": user_id, "flight_number": "G00001"}):
+        with QueryCounter() as queries:
+            response, status_code = add_booking_service(request)
+
+    assert status_code == 200
+    # Claim the seat, insert the booking
+    assert queries.count == 2
+
+
+@pytest.mark.parametrize("group_size", [2, 8])
+def test_add_group_booking_service_query_count_is_constant(sqlite_app, add_flight, add_user, group_size):
+    add_flight("G00001")
+    group = user_ids(group_size)
+    for user_id in group:
+        add_user(user_id)
+
+    with sqlite_app.test_request_context(json={"user_ids": group}):
+        with QueryCounter() as queries:
+            response, status_code = add_group_booking_service("G00001", request)
+
+    assert status_code == 200
+    # Check the users, claim the seats, insert the bookings
+    assert queries.count == 3
+
+
+@pytest.mark.parametrize("bookings", [1, 10])
+def test_delete_flight_service_query_count_is_constant(sqlite_app, add_flight, add_user, bookings):
+    add_flight("G00001")
+    passengers = user_ids(bookings)
+    for user_id in passengers:
+        add_user(user_id)
+    book(sqlite_app, "G00001", passengers)
+
+    with sqlite_app.app_context():
+        with QueryCounter() as queries:
+            response, status_code = delete_flight_service("G00001")
+
+    assert status_code == 200
+    # Load the flight, delete it, the bookings go with ON DELETE CASCADE
+    assert queries.count == 2
+
+
+def test_get_bookings_service_query_count(sqlite_app, add_flight, add_user):
+    add_flight("G00001")
+    passengers = user_ids(5)
+    for user_id in passengers:
+        add_user(user_id)
+    book(sqlite_app, "G00001", passengers)
+
+    with sqlite_app.app_context():
+        with QueryCounter() as queries:
+            response, status_code = get_bookings_service()
+
+    assert status_code == 200
+    assert len(response["All bookings"]) == 5
+    assert queries.count == 1
+
+
+def test_counters_nest(sqlite_app, queries):
+    with sqlite_app.app_context():
+        with QueryCounter() as inner:
+            db.session.execute(db.text("SELECT 1"))
+        db.session.execute(db.text("SELECT 2"))
+
+    assert inner.count == 1
+    assert queries.count == 2
+
+
+@pytest.fixture
+def client(sqlite_app):
+    sqlite_app.config["QUERY_BUDGET"] = 2
+    sqlite_app.config["N_PLUS_ONE_THRESHOLD"] = 3
+    QueryBudget.init_app(sqlite_app)
+
+    @sqlite_app.get("/queries/<int:count>")
+    def run_queries(count):
+        for _ in range(count):
+            db.session.execute(db.text("SELECT 1"))
+        return {"Message": "OK"}, 200
+
+    @sqlite_app.get("/unlimited/<int:count>")
+    @query_budget(None)
+    def run_unlimited_queries(count):
+        for number in range(count):
+            db.session.execute(db.text(f"SELECT {number}"))
+        return {"Message": "OK"}, 200
+
+    return sqlite_app.test_client()
+
+
+def test_reports_query_count_in_headers(client, caplog):
+    with caplog.at_level(logging.WARNING):
+        response = client.get("/queries/2")
+
+    assert response.headers["X-Query-Count"] == "2"
+    assert float(response.headers["X-Query-Time"]) >= 0
+    assert not caplog.records
+
+
+def test_warns_over_budget_and_on_repeated_statements(client, caplog):
+    with caplog.at_level(logging.WARNING):
+        response = client.get("/queries/3")
+
+    assert response.headers["X-Query-Count"] == "3"
+    messages = [record.getMessage() for record in caplog.records]
+    assert "GET /queries/3 issued 3 SQL statements, over its budget of 2" in messages
+    assert "GET /queries/3 executed the same statement 3 times, possibly an N+1 query: SELECT 1" in messages
+
+
+def test_route_budget_overrides_default(client, caplog):
+    with caplog.at_level(logging.WARNING):
+        response = client.get("/unlimited/5")
+
+    assert response.headers["X-Query-Count"] == "5"
+    assert not caplog.records
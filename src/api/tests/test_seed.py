@@ -0,0 +1,76 @@
+from collections import Counter
+
+import pytest
+from sqlalchemy import func, select
+
+from api.db.database import db
+from api.db.models.flights_model import Flights
+from api.db.models.sequences_model import Sequences
+from api.db.models.user_bookings_model import UserBookings
+from api.db.models.users_model import Users
+from api.services.flight_numbers_service import FLIGHT_NUMBER_SEQUENCE, encode_flight_number
+from api.utilities.seed import PASSWORD_POOL_SIZE, SyntheticData, seed_command, seed_database
+
+
+def count(model):
+    return db.session.execute(select(func.count()).select_from(model)).scalar()
+
+
+def test_bookings_are_unique_and_fit_the_flights():
+    data = SyntheticData(flights=5, users=3, bookings=12)
+
+    bookings = [data.booking(index) for index in range(data.bookings)]
+    assert len(set(bookings)) == len(bookings)
+
+    booked = Counter(flight_number for flight_number, _ in bookings)
+    for flight in data.flight_rows():
+        assert flight["seats_available"] == flight["capacity"] - booked[flight["flight_number"]]
+        assert flight["start_destination"] != flight["end_destination"]
+        assert flight["landing_time"] > flight["takeoff_time"]
+
+
+def test_same_seed_generates_the_same_data():
+    first, second, other = (SyntheticData(10, 10, 10, seed=seed) for seed in (7, 7, 8))
+    hashes = ["hash"] * PASSWORD_POOL_SIZE
+
+    assert list(first.flight_rows()) == list(second.flight_rows())
+    assert list(first.user_rows(hashes)) == list(second.user_rows(hashes))
+    assert list(first.booking_rows()) == list(second.booking_rows())
+    assert list(first.flight_rows()) != list(other.flight_rows())
+
+
+def test_rejects_more_bookings_than_seats():
+    with pytest.raises(ValueError):
+        SyntheticData(flights=1, users=1000, bookings=1000)
+    with pytest.raises(ValueError):
+        SyntheticData(flights=10, users=2, bookings=30)
+
+
+def test_seed_database(sqlite_app):
+    with sqlite_app.app_context():
+        data = seed_database(flights=20, users=30, bookings=50, bcrypt_rounds=4)
+
+        assert (count(Flights), count(Users), count(UserBookings)) == (20, 30, 50)
+        assert data.flight_numbers[0] == encode_flight_number(0)
+        assert db.session.get(Sequences, FLIGHT_NUMBER_SEQUENCE).next_value == 20
+        # The users share PASSWORD_POOL_SIZE hashes
+        assert db.session.execute(select(func.count(Users.password.distinct()))).scalar() == PASSWORD_POOL_SIZE
+
+        with pytest.raises(ValueError):
+            seed_database(flights=20, users=30, bookings=50, bcrypt_rounds=4)
+
+        seed_database(flights=10, users=10, bookings=10, bcrypt_rounds=4, reset=True)
+        assert (count(Flights), count(Users), count(UserBookings)) == (10, 10, 10)
+
+
+def test_seed_command(sqlite_app):
+    sqlite_app.cli.add_command(seed_command)
+
+    result = sqlite_app.test_cli_runner().invoke(args=["seed", "--flights", "5", "--users", "5", "--bookings", "5",
+                                                       "--bcrypt-rounds", "4"])
+    assert result.exit_code == 0, result.output
+    assert "Inserted 5 bookings" in result.output
+
+    result = sqlite_app.test_cli_runner().invoke(args=["seed", "--bcrypt-rounds", "4"])
+    assert result.exit_code == 1
+    assert "isn't empty" in result.output
@@ -0,0 +1,127 @@
+import json
+
+import pytest
+from flask import Flask
+
+from api.utilities.tracing import OTLPJsonExporter, Trace, Tracing, current_trace, traced
+
+
+@traced("repository", "flights_repository.query_flights_page")
+def query_flights_page():
+    return []
+
+
+@traced("service")
+def get_flights_service():
+    return {"All flights": query_flights_page() + query_flights_page()}, 200
+
+
+@traced("service")
+def failing_service():
+    raise ValueError("Invalid date")
+
+
+@pytest.fixture
+def trace():
+    trace = Trace()
+    token = current_trace.set(trace)
+    yield trace
+    current_trace.reset(token)
+
+
+def test_traced_is_a_no_op_outside_traces():
+    assert get_flights_service() == ({"All flights": []}, 200)
+
+
+def test_records_nested_spans(trace):
+    get_flights_service()
+
+    service_span = trace.spans[-1]
+    assert service_span.name == "get_flights_service"
+    assert service_span.layer == "service"
+    assert service_span.parent_id is None
+    repository_spans = trace.spans[:-1]
+    assert [span.name for span in repository_spans] == ["flights_repository.query_flights_page"] * 2
+    assert all(span.parent_id == service_span.span_id for span in repository_spans)
+    assert all(span.duration >= 0 for span in trace.spans)
+
+
+def test_records_errors(trace):
+    with pytest.raises(ValueError):
+        failing_service()
+
+    assert trace.spans[0].error == "ValueError: Invalid date"
+
+
+def test_server_timing_sums_spans_by_name(trace):
+    get_flights_service()
+    for span, duration in zip(trace.spans, (1_000_000, 2_000_000, 5_000_000)):
+        span.duration = duration
+
+    assert trace.server_timing() == ('get_flights_service;desc="service";dur=5.00, '
+                                     'flights_repository.query_flights_page;desc="repository";dur=3.00')
+    assert trace.server_timing(limit=1) == 'get_flights_service;desc="service";dur=5.00'
+
+
+def test_to_otlp(trace):
+    with pytest.raises(ValueError):
+        failing_service()
+
+    otlp = trace.to_otlp("flights-booking-api")
+
+    resource_spans = otlp["resourceSpans"][0]
+    assert resource_spans["resource"]["attributes"] == [{"key": "service.name",
+                                                         "value": {"stringValue": "flights-booking-api"}}]
+    span, = resource_spans["scopeSpans"][0]["spans"]
+    assert span["traceId"] == trace.trace_id and len(span["traceId"]) == 32
+    assert len(span["spanId"]) == 16
+    assert span["parentSpanId"] == ""
+    assert span["name"] == "failing_service"
+    assert int(span["endTimeUnixNano"]) >= int(span["startTimeUnixNano"])
+    assert span["status"] == {"code": 2, "message": "ValueError: Invalid date"}
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config.update(TRACING=True, TRACE_EXPORT=str(tmp_path / "traces.jsonl"), TRACE_SERVICE_NAME="api")
+    Tracing.init_app(app)
+    app.add_url_rule("/flights", "get_flights_route", get_flights_service)
+    return app
+
+
+def test_traces_requests(app, tmp_path):
+    traceparent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+    response = app.test_client().get("/flights", headers={"traceparent": traceparent})
+
+    assert response.headers["Server-Timing"].startswith('get_flights_route;desc="route";dur=')
+    assert 'get_flights_service;desc="service"' in response.headers["Server-Timing"]
+
+    app.extensions["otlp_exporter"].flush()
+    spans = json.loads((tmp_path / "traces.jsonl").read_text())["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    root_span = spans[-1]
+    assert root_span["traceId"] == "0af7651916cd43dd8448eb211c80319c"
+    assert root_span["parentSpanId"] == "b7ad6b7169203331"
+    assert root_span["kind"] == 2
+    assert {"key": "http.status_code", "value": {"intValue": "200"}} in root_span["attributes"]
+    assert current_trace.get() is None
+
+
+def test_disabled_without_tracing():
+    app = Flask(__name__)
+    app.config.update(TRACING=False)
+    Tracing.init_app(app)
+
+    assert not app.before_request_funcs
+
+
+def test_exporter_drops_traces_when_queue_is_full(tmp_path):
+    exporter = OTLPJsonExporter(str(tmp_path / "missing" / "traces.jsonl"), "api", max_queued=1)
+
+    for _ in range(50):
+        exporter.export(Trace())
+    exporter.flush()
+
+    assert exporter.dropped + exporter.failed == 50
+    assert exporter.failed >= 1
@@ -0,0 +1,28 @@
+import uuid
+
+import pytest
+
+from api.db.types import BinaryUUID
+
+USER_ID = "cd3348a0-5164-46c0-8ae1-30787c6cb6ea"
+
+
+@pytest.fixture
+def column_type():
+    return BinaryUUID()
+
+
+def test_binds_uuid_strings_and_objects_as_bytes(column_type):
+    assert column_type.process_bind_param(USER_ID, None) == uuid.UUID(USER_ID).bytes
+    assert column_type.process_bind_param(uuid.UUID(USER_ID), None) == uuid.UUID(USER_ID).bytes
+    assert column_type.process_bind_param(None, None) is None
+
+
+def test_reads_bytes_as_canonical_strings(column_type):
+    assert column_type.process_result_value(uuid.UUID(USER_ID).bytes, None) == USER_ID
+    assert column_type.process_result_value(None, None) is None
+
+
+def test_rejects_invalid_uuids(column_type):
+    with pytest.raises(ValueError):
+        column_type.process_bind_param("user_1", None)
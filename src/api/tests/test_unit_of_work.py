@@ -0,0 +1,106 @@
+import time
+from unittest.mock import patch
+
+import pytest
+from flask import Flask
+
+from api.db.database import READ_REPLICA, WROTE
+from api.db.unit_of_work import READ_PRIMARY_COOKIE, UnitOfWork, writes
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config["READ_YOUR_WRITES_SECONDS"] = 5
+    UnitOfWork.init_app(app)
+
+    @app.get("/ok")
+    def ok():
+        return {"Message": "OK"}, 200
+
+    @app.post("/ok")
+    def write():
+        return {"Message": "OK"}, 200
+
+    @app.get("/verify")
+    @writes
+    def verify():
+        return {"Message": "OK"}, 200
+
+    @app.get("/missing")
+    def missing():
+        return {"Message": "Missing"}, 404
+
+    return app.test_client()
+
+
+@pytest.fixture
+def mock_session():
+    with patch('api.db.unit_of_work.db') as mock_db:
+        mock_session = mock_db.session.return_value
+        mock_session.in_transaction.return_value = True
+        mock_session.info = mock_db.session.info = {}
+        yield mock_session
+
+
+def test_commits_successful_request(client, mock_session):
+    response = client.get("/ok")
+
+    assert response.status_code == 200
+    mock_session.commit.assert_called_once()
+    mock_session.rollback.assert_not_called()
+
+
+def test_rolls_back_failed_request(client, mock_session):
+    response = client.get("/missing")
+
+    assert response.status_code == 404
+    mock_session.rollback.assert_called_once()
+    mock_session.commit.assert_not_called()
+
+
+def test_failed_commit_returns_error(client, mock_session):
+    mock_session.commit.side_effect = Exception("Deadlock found")
+
+    response = client.get("/ok")
+
+    assert response.status_code == 500
+    assert response.json == {"Message": "Couldn't save the changes. Please try again later!",
+                             "Error": "Deadlock found"}
+    mock_session.rollback.assert_called_once()
+
+
+def test_skips_requests_without_transaction(client, mock_session):
+    mock_session.in_transaction.return_value = False
+
+    client.get("/ok")
+
+    mock_session.commit.assert_not_called()
+    mock_session.rollback.assert_not_called()
+
+
+def test_only_read_only_requests_read_from_replica(client, mock_session):
+    client.get("/ok")
+    assert mock_session.info[READ_REPLICA] is True
+
+    client.post("/ok")
+    assert mock_session.info[READ_REPLICA] is False
+
+
+def test_get_views_that_write_read_from_primary(client, mock_session):
+    client.get("/verify")
+    assert mock_session.info[READ_REPLICA] is False
+
+
+def test_reads_from_primary_after_a_write(client, mock_session):
+    mock_session.info[WROTE] = True
+    response = client.post("/ok")
+    assert READ_PRIMARY_COOKIE in response.headers["Set-Cookie"]
+
+    mock_session.info.clear()
+    client.get("/ok")
+    assert mock_session.info[READ_REPLICA] is False
+
+    client.set_cookie(READ_PRIMARY_COOKIE, str(time.time() - 1))
+    client.get("/ok")
+    assert mock_session.info[READ_REPLICA] is True
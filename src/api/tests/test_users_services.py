@@ -1,7 +1,11 @@
+import uuid
 from unittest.mock import MagicMock, patch
 
 import pytest
 
+from api.db.database import db
+from api.db.models.flights_model import Flights
+from api.db.models.user_bookings_model import UserBookings
 from api.db.models.users_model import Users
 from api.services.users_services import validate_data, get_users_service, get_user_by_uuid_service, delete_user_service, \
     update_user_service
@@ -76,28 +80,23 @@ def test_validate_data_invalid_email():
 
 
 @patch('api.services.users_services.query_all_users')
-@patch('api.services.users_services.close_db_session')
-def test_get_users_service_not_empty(mock_close_db_session, mock_query_all_users, sample_users_list):
+def test_get_users_service_not_empty(mock_query_all_users, sample_users_list):
     mock_query_all_users.return_value = sample_users_list
     response, status_code = get_users_service()
     assert status_code == 200
     assert "Users" in response
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.users_services.query_all_users')
-@patch('api.services.users_services.close_db_session')
-def test_get_users_service_empty(mock_close_db_session, mock_query_all_users):
+def test_get_users_service_empty(mock_query_all_users):
     mock_query_all_users.return_value = []
     response, status_code = get_users_service()
     assert status_code == 404
     assert response == {"Message": "The users table is empty"}
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.users_services.query_all_users')
-@patch('api.services.users_services.close_db_session')
-def test_get_users_service_exception(mock_close_db_session, mock_query_all_users):
+def test_get_users_service_exception(mock_query_all_users):
     mock_query_all_users.side_effect = Exception("Test exception")
     response, status_code = get_users_service()
     assert status_code == 500
@@ -105,33 +104,27 @@ def test_get_users_service_exception(mock_close_db_session, mock_query_all_users
         "Message": "Couldn't retrieve users from DB!",
         "Error": "Test exception",
     }
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.users_services.query_user_by_uuid')
-@patch('api.services.users_services.close_db_session')
-def test_get_user_by_uuid_service_existing(mock_close_db_session, mock_query_user, sample_user):
+def test_get_user_by_uuid_service_existing(mock_query_user, sample_user):
     mock_query_user.return_value = sample_user
     response, status_code = get_user_by_uuid_service("user1")
     assert status_code == 200
     assert "User" in response
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.users_services.query_user_by_uuid')
-@patch('api.services.users_services.close_db_session')
-def test_get_user_by_uuid_service_non_existing(mock_close_db_session, mock_query_user):
+def test_get_user_by_uuid_service_non_existing(mock_query_user):
     mock_query_user.return_value = None
     user_uuid = "Wrong user"
     response, status_code = get_user_by_uuid_service(user_uuid)
     assert status_code == 404
     assert response == {"Message": f"User with uuid {user_uuid} doesn't exist in the DB!"}
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.users_services.query_user_by_uuid')
-@patch('api.services.users_services.close_db_session')
-def test_get_user_by_uuid_service_exception(mock_close_db_session, mock_query_user):
+def test_get_user_by_uuid_service_exception(mock_query_user):
     user_uuid = "Wrong user"
     mock_query_user.side_effect = Exception("Test exception")
     response, status_code = get_user_by_uuid_service(user_uuid)
@@ -140,13 +133,11 @@ def test_get_user_by_uuid_service_exception(mock_close_db_session, mock_query_us
         "Message": f"Couldn't retrieve user with uuid {user_uuid} from DB!",
         "Error": "Test exception",
     }
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.users_services.query_user_by_uuid')
 @patch('api.services.users_services.delete_user_from_db')
-@patch('api.services.users_services.close_db_session')
-def test_delete_user_service_existing_user(mock_close_db_session, mock_delete_user, mock_query_user):
+def test_delete_user_service_existing_user(mock_delete_user, mock_query_user):
     user_uuid = "user1"
     mock_query_user.return_value = sample_user
 
@@ -154,13 +145,11 @@ def test_delete_user_service_existing_user(mock_close_db_session, mock_delete_us
     assert status_code == 200
     assert response == {"Message": f"User with uuid {user_uuid} was removed successfully from the DB"}
     mock_delete_user.assert_called_once()
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.users_services.query_user_by_uuid')
 @patch('api.services.users_services.delete_user_from_db')
-@patch('api.services.users_services.close_db_session')
-def test_delete_user_service_wrong_user_uuid(mock_close_db_session, mock_delete_user, mock_query_user):
+def test_delete_user_service_wrong_user_uuid(mock_delete_user, mock_query_user):
     user_uuid = "Wrong user"
     mock_query_user.return_value = None
 
@@ -168,14 +157,12 @@ def test_delete_user_service_wrong_user_uuid(mock_close_db_session, mock_delete_
     assert status_code == 404
     assert response == {"Message": f"User with uuid {user_uuid} doesn't exist in the DB!"}
     mock_delete_user.assert_not_called()
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.users_services.query_user_by_uuid')
 @patch('api.services.users_services.delete_user_from_db')
-@patch('api.services.users_services.close_db_session')
 @patch("api.services.users_services.db_rollback")
-def test_delete_user_service_exception(mock_db_rollback, mock_close_db_session, mock_delete_user, mock_query_user):
+def test_delete_user_service_exception(mock_db_rollback, mock_delete_user, mock_query_user):
     user_uuid = "user1"
     mock_delete_user.side_effect = Exception("Test exception")
     mock_query_user.side_effect = Exception("Test exception")
@@ -185,14 +172,33 @@ def test_delete_user_service_exception(mock_db_rollback, mock_close_db_session,
     assert response == {"Message": f"Couldn't delete user with uuid {user_uuid} from DB!",
                         "Error": "Test exception"}
     mock_delete_user.assert_not_called()
-    mock_close_db_session.assert_called_once()
     mock_db_rollback.assert_called_once()
 
 
+def test_delete_user_service_gives_the_booked_seats_back(sqlite_app, add_flight, add_user):
+    user_id, other_user_id = str(uuid.uuid4()), str(uuid.uuid4())
+    for flight_number in ("G00001", "G00002", "G00003"):
+        add_flight(flight_number, capacity=10)
+    add_user(user_id)
+    add_user(other_user_id)
+    with sqlite_app.app_context():
+        for booking_user_id, flight_number in ((user_id, "G00001"), (user_id, "G00002"), (other_user_id, "G00003")):
+            db.session.add(UserBookings(booking_id=str(uuid.uuid4()), flight_number=flight_number,
+                                        user_id=booking_user_id))
+        db.session.query(Flights).update({Flights.seats_available: 9}, synchronize_session=False)
+        db.session.commit()
+
+        response, status_code = delete_user_service(user_id)
+        db.session.commit()
+
+        assert status_code == 200
+        assert dict(db.session.query(Flights.flight_number, Flights.seats_available)) == {
+            "G00001": 10, "G00002": 10, "G00003": 9}
+
+
 @patch('api.services.users_services.query_user_by_uuid')
 @patch('api.services.users_services.edit_user_data')
-@patch('api.services.users_services.close_db_session')
-def test_update_user_service_existing_user(mock_close_db_session, mock_edit_user_data, mock_query_user):
+def test_update_user_service_existing_user(mock_edit_user_data, mock_query_user):
     user_uuid = "user1"
     mock_query_user.return_value = sample_user
     request = MagicMock()
@@ -201,13 +207,11 @@ def test_update_user_service_existing_user(mock_close_db_session, mock_edit_user
     assert status_code == 200
     assert response == {"Message": f"User with uuid {user_uuid} was updated successfully."}
     mock_edit_user_data.assert_called_once_with(sample_user, request.json)
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.users_services.query_user_by_uuid')
 @patch('api.services.users_services.edit_user_data')
-@patch('api.services.users_services.close_db_session')
-def test_update_user_service_wrong_user_number(mock_close_db_session, mock_edit_user_data, mock_query_user):
+def test_update_user_service_wrong_user_number(mock_edit_user_data, mock_query_user):
     user_uuid = "Wrong user"
     mock_query_user.return_value = None
     request = MagicMock()
@@ -216,14 +220,12 @@ def test_update_user_service_wrong_user_number(mock_close_db_session, mock_edit_
     assert status_code == 404
     assert response == {"Message": f"User with uuid {user_uuid} doesn't exist in the DB!"}
     mock_edit_user_data.assert_not_called()
-    mock_close_db_session.assert_called_once()
 
 
 @patch('api.services.users_services.query_user_by_uuid')
 @patch('api.services.users_services.edit_user_data')
-@patch('api.services.users_services.close_db_session')
 @patch("api.services.users_services.db_rollback")
-def test_update_user_service_exception(mock_db_rollback, mock_close_db_session, mock_edit_user_data, mock_query_user):
+def test_update_user_service_exception(mock_db_rollback, mock_edit_user_data, mock_query_user):
     user_uuid = "user1"
     mock_query_user.side_effect = Exception("Test exception")
     mock_edit_user_data.side_effect = Exception("Test exception")
@@ -234,5 +236,4 @@ def test_update_user_service_exception(mock_db_rollback, mock_close_db_session,
     assert response == {"Message": f"Couldn't update user with uuid {user_uuid}",
                         "Error": "Test exception"}
     mock_edit_user_data.assert_not_called()
-    mock_close_db_session.assert_called_once()
     mock_db_rollback.assert_called_once()
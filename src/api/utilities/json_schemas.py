@@ -1,3 +1,6 @@
+# "YYYY-MM-DD HH:MM" with valid month, day, hour and minute ranges
+DATETIME_PATTERN = '^\\d{4}-(0[1-9]|1[0-2])-(0[1-9]|[12]\\d|3[01]) ([01]\\d|2[0-3]):[0-5]\\d$'
+
 register_schema = {
     'type': 'object',
     'properties': {
@@ -36,14 +39,15 @@ flights_schema = {
         'start_destination': {'type': 'string'},
         'end_destination': {'type': 'string'},
         'takeoff_time': {'type': 'string',
-                         'pattern': '^\\d{4}-\\d{2}-\\d{2} \\d{2}:\\d{2}$',
+                         'pattern': DATETIME_PATTERN,
                          'examples': ["2023-06-12 15:30"]
                          },
         'landing_time': {'type': 'string',
-                         'pattern': '^\\d{4}-\\d{2}-\\d{2} \\d{2}:\\d{2}$',
+                         'pattern': DATETIME_PATTERN,
                          'examples': ["2023-06-12 17:15"]
                          },
-        'price': {'type': 'number'}
+        'price': {'type': 'number'},
+        'capacity': {'type': 'integer', 'minimum': 1}
     },
     'required': ['start_destination', 'end_destination', 'takeoff_time', 'landing_time', 'price'],
     'additionalProperties': False
@@ -55,14 +59,15 @@ update_flight_schema = {
         'start_destination': {'type': 'string'},
         'end_destination': {'type': 'string'},
         'takeoff_time': {'type': 'string',
-                         'pattern': '^\\d{4}-\\d{2}-\\d{2} \\d{2}:\\d{2}$',
+                         'pattern': DATETIME_PATTERN,
                          'examples': ["2023-06-12 15:30"]
                          },
         'landing_time': {'type': 'string',
-                         'pattern': '^\\d{4}-\\d{2}-\\d{2} \\d{2}:\\d{2}$',
+                         'pattern': DATETIME_PATTERN,
                          'examples': ["2023-06-12 17:15"]
                          },
-        'price': {'type': 'number'}
+        'price': {'type': 'number'},
+        'capacity': {'type': 'integer', 'minimum': 1}
     },
     'additionalProperties': False
 }
@@ -71,8 +76,22 @@ bookings_schema = {
     'type': 'object',
     'properties': {
         'flight_number': {'type': 'string'},
-        'user_id': {'type': 'string'},
+        'user_id': {'type': 'string', 'format': 'uuid'},
     },
     'required': ['flight_number', 'user_id'],
     'additionalProperties': False
+}
+
+group_bookings_schema = {
+    'type': 'object',
+    'properties': {
+        'user_ids': {'type': 'array',
+                     'items': {'type': 'string', 'format': 'uuid'},
+                     'minItems': 1,
+                     'maxItems': 500,
+                     'uniqueItems': True
+                     },
+    },
+    'required': ['user_ids'],
+    'additionalProperties': False
 }
\ No newline at end of file
@@ -0,0 +1,113 @@
+import os
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import Flask, Response, g, request
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, \
+    generate_latest, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Query
+
+from api.utilities.query_counter import count_query
+from api.utilities.tracing import traced
+
+# Execution option with the repository function a query returned for later execution belongs to
+REPOSITORY_OPTION = "repository"
+NO_REPOSITORY = "none"
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+REQUESTS = Counter("http_requests_total", "HTTP requests by endpoint, method and status code",
+                   ["endpoint", "method", "status"])
+REQUEST_DURATION = Histogram("http_request_duration_seconds", "Time taken to produce the response of a request",
+                             ["endpoint", "method"])
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed by repository function", ["repository"])
+DB_QUERY_DURATION = Histogram("db_query_duration_seconds", "Duration of the SQL statements by repository function",
+                              ["repository"], buckets=QUERY_BUCKETS)
+
+current_repository = ContextVar("current_repository", default=NO_REPOSITORY)
+
+
+def instrumented(function):
+    """Decorator of the repository functions, which attributes the SQL statements they execute to them in the
+    db_queries metrics and records their spans in traced requests.
+    Queries returned to be executed later, like the streams, are tagged with the function"""
+
+    name = f"{function.__module__.rsplit('.', 1)[-1]}.{function.__name__}"
+    function = traced("repository", name)(function)
+
+    @wraps(function)
+    def wrapper(*args, **kwargs):
+        token = current_repository.set(name)
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            current_repository.reset(token)
+
+        if isinstance(result, Query):
+            result = result.execution_options(**{REPOSITORY_OPTION: name})
+        return result
+
+    return wrapper
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def record_query(conn, cursor, statement, parameters, context, executemany):
+    duration = time.perf_counter() - conn.info["query_started"].pop()
+    repository = context.execution_options.get(REPOSITORY_OPTION) if context is not None else None
+    repository = repository or current_repository.get()
+    DB_QUERIES.labels(repository).inc()
+    DB_QUERY_DURATION.labels(repository).observe(duration)
+    count_query(statement, duration)
+
+
+@event.listens_for(Engine, "handle_error")
+def discard_query_timer(exception_context):
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_started"):
+        connection.info["query_started"].pop()
+
+
+class Metrics:
+    """Counts the requests of every endpoint, times them and serves the metrics at /metrics for Prometheus.
+
+    The counters are thread-safe. When PROMETHEUS_MULTIPROC_DIR is set, prometheus_client keeps them in files
+    in that directory, shared by all the gunicorn workers, and /metrics aggregates the values of all workers.
+    The directory must be emptied before the server is started.
+    """
+
+    @classmethod
+    def init_app(cls, app: Flask) -> None:
+        # Registered before the unit of work, so the after_request hook runs after the commit and times it too
+        app.before_request(cls.start_timer)
+        app.after_request(cls.record_request)
+        app.add_url_rule("/metrics", "metrics", cls.get_metrics)
+
+    @staticmethod
+    def start_timer() -> None:
+        g.request_started = time.perf_counter()
+
+    @staticmethod
+    def record_request(response: Response) -> Response:
+        started = g.pop("request_started", None)
+        if started is not None:
+            endpoint = request.endpoint or "unmatched"
+            REQUESTS.labels(endpoint, request.method, str(response.status_code)).inc()
+            REQUEST_DURATION.labels(endpoint, request.method).observe(time.perf_counter() - started)
+
+        return response
+
+    @staticmethod
+    def get_metrics() -> Response:
+        registry = REGISTRY
+        if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+
+        return Response(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
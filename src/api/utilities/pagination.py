@@ -0,0 +1,56 @@
+import base64
+import json
+
+DEFAULT_PAGE_LIMIT = 100
+MAX_PAGE_LIMIT = 1000
+
+
+def clamp_limit(limit):
+    """Returns the page size to use for a request
+
+    Parameters:
+        limit: the limit from the query string, or None if it wasn't provided
+
+    Raises:
+        ValueError: If the limit is not a positive integer
+    """
+
+    if limit is None:
+        return DEFAULT_PAGE_LIMIT
+    if limit < 1:
+        raise ValueError("Limit must be a positive integer!")
+
+    return min(limit, MAX_PAGE_LIMIT)
+
+
+def encode_cursor(*values):
+    """Encodes the sort key of the last row of a page into an opaque cursor string"""
+
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, size):
+    """Decodes a cursor created by encode_cursor
+
+    Parameters:
+        cursor (str): the cursor from the query string
+        size (int): the number of values the sort key is expected to have
+
+    Returns:
+        list with the values of the sort key
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except ValueError:
+        raise ValueError("Invalid pagination cursor!")
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid pagination cursor!")
+
+    return values
@@ -0,0 +1,143 @@
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import flask_bcrypt
+from flask import Flask
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many passwords are being hashed already, the request should be retried later"""
+
+
+def hash_password(password, rounds):
+    return flask_bcrypt.generate_password_hash(password, rounds).decode("utf-8")
+
+
+def check_password(hashed_password, password):
+    return flask_bcrypt.check_password_hash(hashed_password, password)
+
+
+class PasswordHasher:
+    """Hashes and checks passwords with bcrypt on a pool of worker processes.
+
+    bcrypt holds the CPU for 100-300 ms at the default work factor, so in the request thread a burst of logins
+    stalls every other request of the worker behind the GIL. At most max_pending hashes run or wait in the pool
+    at once, beyond that PasswordHasherBusy is raised straight away instead of letting the requests pile up.
+
+    The pool is started on first use, so each gunicorn worker gets its own one after the fork. With workers=0
+    the hashes run in the request thread, still limited to max_pending at once.
+    """
+
+    def __init__(self, workers=2, max_pending=16, rounds=12, timeout=10):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def init_app(self, app: Flask) -> None:
+        self.shutdown()
+        self.workers = app.config["PASSWORD_HASH_WORKERS"]
+        self.max_pending = app.config["PASSWORD_HASH_QUEUE"]
+        self.rounds = app.config["BCRYPT_ROUNDS"]
+        self.timeout = app.config["PASSWORD_HASH_TIMEOUT"]
+        app.extensions["password_hasher"] = self
+
+    def hash(self, password):
+        """Returns the bcrypt hash of the password, with the configured work factor"""
+
+        return self._run("Hashing the password", hash_password, password, self.rounds)
+
+    def check(self, hashed_password, password):
+        """Returns whether the password matches the hash. Hashes keep the work factor they were created with"""
+
+        return self._run("Checking the password", check_password, hashed_password, password)
+
+    def _run(self, operation, function, *args):
+        """Runs the function on the pool and waits for its result, operation names it in the error messages
+
+        Raises:
+            PasswordHasherBusy: If max_pending hashes are running or waiting already, the result didn't come
+                                within the timeout or a worker process died
+        """
+
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy("Too many passwords are being checked, please try again shortly!")
+            self._pending += 1
+
+        if not self.workers:
+            try:
+                return function(*args)
+            finally:
+                self._finish()
+
+        executor = self._get_executor()
+        try:
+            future = executor.submit(function, *args)
+        except BrokenProcessPool:
+            self._finish()
+            self._discard_executor(executor)
+            raise PasswordHasherBusy(f"{operation} failed, please try again shortly!")
+
+        # The slot is freed when the hash is done, not when the request stops waiting for it
+        future.add_done_callback(lambda _: self._finish())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            with self._lock:
+                self.timeouts += 1
+            raise PasswordHasherBusy(f"{operation} took too long, please try again shortly!")
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            raise PasswordHasherBusy(f"{operation} failed, please try again shortly!")
+
+    def _finish(self):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # Forking would copy the threads and DB connections of the app into the workers
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _discard_executor(self, executor):
+        """Drops a pool whose worker process died, the next hash starts a new one"""
+
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "rounds": self.rounds,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timeouts": self.timeouts
+            }
+
+
+password_hasher = PasswordHasher()
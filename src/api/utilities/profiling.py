@@ -0,0 +1,137 @@
+import cProfile
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+import jwt
+from flask import Flask, Response, current_app, g, request
+
+# Header with an admin auth token that asks for the request to be profiled
+PROFILE_HEADER = "X-Profile"
+
+
+class SamplingProfiler:
+    """Samples the stack of the thread that enabled it from a background thread every interval seconds.
+
+    It has the enable/disable/dump_stats interface of cProfile.Profile, but its overhead doesn't grow with the
+    number of calls, and it dumps collapsed stacks ("frame;frame;frame count" lines) that flamegraph.pl and
+    speedscope read.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = None
+        self._stopped = threading.Event()
+        self._sampler = None
+
+    def enable(self):
+        self._thread_id = threading.get_ident()
+        self._sampler = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+        self._sampler.start()
+
+    def disable(self):
+        self._stopped.set()
+        self._sampler.join()
+
+    def _sample(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def dump_stats(self, path):
+        with open(path, "w") as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+
+# Profiler class and extension of its output files, by PROFILER
+PROFILERS = {
+    "cprofile": (cProfile.Profile, "prof"),
+    "sampling": (SamplingProfiler, "collapsed")
+}
+
+
+def is_profiling_requested():
+    """Checks if the request carries an admin auth token in the X-Profile header"""
+
+    token = request.headers.get(PROFILE_HEADER)
+    if not token:
+        return False
+
+    try:
+        decoded_token = jwt.decode(token, os.getenv("SECRET_KEY"), algorithms=["HS256"])
+    except jwt.exceptions.PyJWTError:
+        return False
+    return bool(decoded_token.get("admin"))
+
+
+class Profiling:
+    """Profiles requests on demand and writes the profiles to PROFILE_DIR, one file per request.
+
+    A request is profiled when it carries an admin auth token in the X-Profile header, in which case the
+    X-Profile-File header of the response names its profile, or at random with PROFILE_SAMPLE_RATE.
+    PROFILER picks cProfile, whose pstats files snakeviz and pstats read, or the sampling profiler.
+    Without PROFILE_DIR no hook is registered, so there is no cost at all.
+    """
+
+    @classmethod
+    def init_app(cls, app: Flask) -> None:
+        if not app.config["PROFILE_DIR"]:
+            return
+
+        if app.config["PROFILER"] not in PROFILERS:
+            raise ValueError(f"Unknown profiler {app.config['PROFILER']}, use one of {', '.join(PROFILERS)}")
+        os.makedirs(app.config["PROFILE_DIR"], exist_ok=True)
+
+        app.before_request(cls.start_profiling)
+        app.after_request(cls.name_profile)
+        app.teardown_request(cls.stop_profiling)
+
+    @staticmethod
+    def start_profiling() -> None:
+        requested = is_profiling_requested()
+        if not requested and random.random() >= current_app.config["PROFILE_SAMPLE_RATE"]:
+            return
+
+        profiler_class, extension = PROFILERS[current_app.config["PROFILER"]]
+        if profiler_class is SamplingProfiler:
+            profiler = SamplingProfiler(current_app.config["PROFILE_SAMPLING_INTERVAL_MS"] / 1000)
+        else:
+            profiler = profiler_class()
+
+        try:
+            profiler.enable()
+        except ValueError:
+            # Newer Pythons allow one cProfile at a time, a concurrent request is being profiled already
+            return
+
+        endpoint = (request.endpoint or "unmatched").replace(".", "-")
+        g.profile_requested = requested
+        g.profile_path = os.path.join(current_app.config["PROFILE_DIR"],
+                                      f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{endpoint}-"
+                                      f"{uuid.uuid4().hex[:8]}.{extension}")
+        g.profiler = profiler
+
+    @staticmethod
+    def name_profile(response: Response) -> Response:
+        if g.get("profile_requested"):
+            response.headers["X-Profile-File"] = os.path.basename(g.profile_path)
+        return response
+
+    @staticmethod
+    def stop_profiling(exception=None) -> None:
+        profiler = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(g.profile_path)
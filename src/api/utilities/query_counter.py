@@ -0,0 +1,122 @@
+from collections import Counter
+from contextvars import ContextVar
+
+from flask import Flask, Response, current_app, g, request
+
+current_query_counter = ContextVar("current_query_counter", default=None)
+
+
+class QueryCounter:
+    """Counts the SQL statements executed while it is active and the time they took.
+
+    Counters can be nested, every statement is counted by all the active ones. Tests use it as a context
+    manager to pin down how many statements a service issues:
+
+        with QueryCounter() as queries:
+            add_booking_service(request)
+        assert queries.count == 2
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+        self._parent = None
+        self._token = None
+
+    def start(self):
+        self._parent = current_query_counter.get()
+        self._token = current_query_counter.set(self)
+        return self
+
+    def stop(self):
+        try:
+            current_query_counter.reset(self._token)
+        except ValueError:
+            # Stopped from another context, e.g. at the end of a streamed response
+            current_query_counter.set(self._parent)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def record(self, statement, duration):
+        counter = self
+        while counter is not None:
+            counter.count += 1
+            counter.duration += duration
+            counter.statements[statement] += 1
+            counter = counter._parent
+
+    def repeated(self, threshold):
+        """Returns (statement, times) for the statements executed at least threshold times,
+        which is what an N+1 query pattern looks like"""
+
+        return [(statement, times) for statement, times in self.statements.most_common() if times >= threshold]
+
+
+def count_query(statement, duration):
+    """Records a statement in the active counters, called for every statement by the engine hook in
+    api.utilities.metrics"""
+
+    counter = current_query_counter.get()
+    if counter is not None:
+        counter.record(statement, duration)
+
+
+def query_budget(limit):
+    """Route decorator that overrides QUERY_BUDGET for one route. None turns the budget off"""
+
+    def decorator(view):
+        view.query_budget = limit
+        return view
+
+    return decorator
+
+
+class QueryBudget:
+    """Counts the SQL statements of every request and reports them in the X-Query-Count and X-Query-Time
+    (milliseconds) headers of the response.
+
+    A warning is logged when a request issues more than the QUERY_BUDGET of its route, or executes the same
+    statement N_PLUS_ONE_THRESHOLD times or more.
+    """
+
+    @classmethod
+    def init_app(cls, app: Flask) -> None:
+        app.before_request(cls.start_counting)
+        app.after_request(cls.report)
+        app.teardown_request(cls.stop_counting)
+
+    @staticmethod
+    def start_counting() -> None:
+        g.query_counter = QueryCounter().start()
+
+    @staticmethod
+    def report(response: Response) -> Response:
+        counter = g.get("query_counter")
+        if counter is None:
+            return response
+
+        response.headers["X-Query-Count"] = str(counter.count)
+        response.headers["X-Query-Time"] = f"{counter.duration * 1000:.2f}"
+
+        view = current_app.view_functions.get(request.endpoint)
+        budget = getattr(view, "query_budget", current_app.config["QUERY_BUDGET"])
+        if budget is not None and counter.count > budget:
+            current_app.logger.warning("%s %s issued %d SQL statements, over its budget of %d",
+                                       request.method, request.path, counter.count, budget)
+
+        for statement, times in counter.repeated(current_app.config["N_PLUS_ONE_THRESHOLD"]):
+            current_app.logger.warning("%s %s executed the same statement %d times, possibly an N+1 query: %s",
+                                       request.method, request.path, times, statement)
+
+        return response
+
+    @staticmethod
+    def stop_counting(exception=None) -> None:
+        counter = g.pop("query_counter", None)
+        if counter is not None:
+            counter.stop()
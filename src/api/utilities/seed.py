@@ -1,127 +1,219 @@
-import os
+import itertools
+import math
+import random
+import time
 import uuid
+from datetime import datetime, timedelta
 
-import flask_bcrypt
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy_utils import database_exists, create_database
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from flask_bcrypt import generate_password_hash
+from sqlalchemy import func, insert, select
 
+from api.db.database import db
 from api.db.models.flights_model import Flights
 from api.db.models.user_bookings_model import UserBookings
 from api.db.models.users_model import Users
+from api.db.repositories.sequences_repository import reserve_sequence_block
+from api.services.flight_numbers_service import FLIGHT_NUMBER_SEQUENCE, encode_flight_number
 
-load_dotenv()
-
-# FIXME or remove, there is a problem with the imports
-
-# Create the database engine
-db_uri = os.getenv("MYSQL_TEST_DATABASE_URI")
-engine = create_engine(db_uri)
-
-if not database_exists(engine.url):
-    create_database(engine.url)
-
-# # Create a session
-# Session = sessionmaker(bind=engine)
-# session = Session()
-
-# # Create tables if they don't exist
-# Flights.metadata.create_all(engine)
-# Users.metadata.create_all(engine)
-# UserBookings.metadata.create_all(engine)
-
-# # Seed data for Flights
-# flights_data = [
-#     {"start_destination": "London", "end_destination": "Sofia", "takeoff_time": "2023-07-30 06:45",
-#      "landing_time": "2023-07-30 09:15", "price": 235.70, "flight_number": str(uuid.uuid4().hex)[:6].upper()},
-#     {"start_destination": "Paris", "end_destination": "Rome", "takeoff_time": "2023-08-03 11:35",
-#      "landing_time": "2023-08-03 13:10", "price": 273.40, "flight_number": str(uuid.uuid4().hex)[:6].upper()},
-#     {"start_destination": "Berlin", "end_destination": "Skopje", "takeoff_time": "2023-07-17 16:00",
-#      "landing_time": "2023-07-17 18:20", "price": 179.90, "flight_number": str(uuid.uuid4().hex)[:6].upper()},
-# ]
-
-# for flight in flights_data:
-#     new_flight = Flights(
-#         flight_number=flight["flight_number"],
-#         start_destination=flight["start_destination"],
-#         end_destination=flight["end_destination"],
-#         takeoff_time=flight["takeoff_time"],
-#         landing_time=flight["landing_time"],
-#         price=flight["price"]
-#     )
-#     session.add(new_flight)
-#     session.commit()
-
-# # Seed data for Users
-# users_data = [
-#     {
-#         "id": str(uuid.uuid4()),
-#         "first_name": "Jermain",
-#         "last_name": "Defoe",
-#         "email": "jermaind@gmail.com",
-#         "password": "password123"
-#     },
-#     {
-#         "id": str(uuid.uuid4()),
-#         "first_name": "Jane",
-#         "last_name": "Smith",
-#         "email": "janesm@gmail.com",
-#         "password": "password456"
-#     },
-#     {
-#         "id": str(uuid.uuid4()),
-#         "first_name": "Borislav",
-#         "last_name": "Angelov",
-#         "email": "boroangelov@gmail.com",
-#         "password": "password789"
-#     }
-# ]
-
-# for user in users_data:
-#     hashed_password = flask_bcrypt.generate_password_hash(user["password"]).decode("utf-8")
-#     new_user = Users(
-#         id=user["id"],
-#         first_name=user["first_name"],
-#         last_name=user["last_name"],
-#         email=user["email"],
-#         password=hashed_password
-#     )
-#     session.add(new_user)
-#     session.commit()
-
-# bookings_data = [
-#     {
-#         "user_id": users_data[2]["id"],
-#         "flight_number": flights_data[1]["flight_number"],
-#         "booking_id": uuid.uuid4()
-#     },
-#     {
-#         "user_id": users_data[1]["id"],
-#         "flight_number": flights_data[0]["flight_number"],
-#         "booking_id": uuid.uuid4()
-#     },
-#     {
-#         "user_id": users_data[0]["id"],
-#         "flight_number": flights_data[2]["flight_number"],
-#         "booking_id": uuid.uuid4()
-#     }
-# ]
-
-# for booking in bookings_data:
-#     user_id = booking["user_id"],
-#     flight_number = booking["flight_number"],
-#     booking_id = booking["booking_id"]
-
-#     user = session.get(Users, user_id)
-#     flight = session.get(Flights, flight_number)
-#     existing_booking = session.query(UserBookings).filter_by(user_id=user_id,
-#                                                                 flight_number=flight_number).all()
-#     if not existing_booking:
-#         new_booking = UserBookings(booking_id=booking_id, user_id=user_id, flight_number=flight_number)
-#         session.add(new_booking)
-#         session.commit()
-# # Commit the changes
-# session.commit()
-# session.close()
-# print("Data seeded...")
+# Code, latitude and longitude of the airports. The first ones are hubs, which get more of the flights
+AIRPORTS = [("LHR", 51.47, -0.45), ("CDG", 49.01, 2.55), ("FRA", 50.03, 8.56), ("AMS", 52.31, 4.76),
+            ("IST", 41.26, 28.74), ("MAD", 40.49, -3.57), ("MUC", 48.35, 11.79), ("FCO", 41.80, 12.25),
+            ("BCN", 41.30, 2.08), ("VIE", 48.11, 16.57), ("ZRH", 47.46, 8.55), ("CPH", 55.62, 12.66),
+            ("DUB", 53.43, -6.25), ("OSL", 60.19, 11.10), ("WAW", 52.17, 20.97), ("PRG", 50.10, 14.26),
+            ("BUD", 47.44, 19.26), ("ATH", 37.94, 23.94), ("OTP", 44.57, 26.08), ("SOF", 42.70, 23.41)]
+AIRPORT_WEIGHTS = [20 if index < 5 else 5 for index in range(len(AIRPORTS))]
+FIRST_NAMES = ["Ivan", "Maria", "Georgi", "Elena", "James", "Olivia", "Lukas", "Sophie", "Marco", "Giulia",
+               "Pierre", "Camille", "Jan", "Anna", "Mehmet", "Zeynep", "Pablo", "Lucia", "Nikos", "Eleni"]
+LAST_NAMES = ["Obreshkov", "Petrova", "Smith", "Brown", "Muller", "Schmidt", "Rossi", "Bianchi", "Martin",
+              "Bernard", "Novak", "Kowalska", "Yilmaz", "Demir", "Garcia", "Lopez", "Papadopoulos", "Jensen",
+              "Hansen", "Murphy"]
+EMAIL_DOMAINS = ["gmail.com", "yahoo.com", "outlook.com", "abv.bg", "example.com"]
+CAPACITIES = [150, 180, 189, 220]
+
+FIRST_DAY = datetime(2030, 1, 1)
+SCHEDULE_DAYS = 90
+PASSWORD_POOL_SIZE = 16
+INSERT_BATCH_SIZE = 5_000
+
+
+def flight_duration(start, end):
+    """Returns the block time of a flight between two airports, from their great-circle distance"""
+
+    (_, lat1, lon1), (_, lat2, lon2) = start, end
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    distance = 2 * 6371 * math.asin(math.sqrt(math.sin((lat2 - lat1) / 2) ** 2 +
+                                              math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2))
+    # Cruising at 800 km/h plus taxiing, rounded to 5 minutes
+    minutes = 30 + distance / 800 * 60
+    return timedelta(minutes=5 * round(minutes / 5)), distance
+
+
+def validate_counts(flights, users, bookings):
+    """Checks that the counts describe a dataset that can be generated
+
+    Raises:
+        ValueError: If there are no flights or users, or the bookings can't be spread over the flights and users without overbooking a flight
+                    or booking a user twice on the same flight
+    """
+
+    if flights < 1 or users < 1 or bookings < 0:
+        raise ValueError("There must be at least one flight and one user!")
+    if bookings > flights * min(users, min(CAPACITIES)):
+        raise ValueError("There are more bookings than seats or users to book them!")
+
+
+class SyntheticData:
+    """Flights, users and bookings derived only from the counts and the seed, so every run produces the same rows.
+
+    Booking i is of flight i % flights by user (i % flights + i // flights) % users, so no user books the same
+    flight twice and the bookings are spread evenly over the flights. Indexes after the last booking give new
+    bookings that don't repeat a seeded one.
+
+    Parameters:
+        first_flight_number: the flight number sequence value of the first flight
+    """
+
+    def __init__(self, flights, users, bookings, seed=1, first_flight_number=0):
+        validate_counts(flights, users, bookings)
+        self.flights = flights
+        self.users = users
+        self.bookings = bookings
+        self.seed = seed
+        self.flight_numbers = [encode_flight_number(first_flight_number + index) for index in range(flights)]
+        rng = random.Random(f"{seed}-users")
+        # Kept as UUID objects, BinaryUUID binds them without parsing a string for every row
+        self.user_ids = [uuid.UUID(int=rng.getrandbits(128), version=4) for _ in range(users)]
+
+    @staticmethod
+    def password(user_index):
+        """Returns the plain text password of the user, for logging in as them"""
+
+        return f"password-{user_index % PASSWORD_POOL_SIZE}"
+
+    def booking(self, index):
+        """Returns the (flight_number, user_id) of the booking with the index"""
+
+        flight_number, user_id = self.booking_key(index)
+        return flight_number, str(user_id)
+
+    def booking_key(self, index):
+        flight_index = index % self.flights
+        return self.flight_numbers[flight_index], self.user_ids[(flight_index + index // self.flights) % self.users]
+
+    def flight_rows(self):
+        rng = random.Random(f"{self.seed}-flights")
+        per_flight, extra = divmod(self.bookings, self.flights)
+        for index, flight_number in enumerate(self.flight_numbers):
+            start, end = rng.choices(AIRPORTS, AIRPORT_WEIGHTS, k=2)
+            while end is start:
+                end = rng.choices(AIRPORTS, AIRPORT_WEIGHTS)[0]
+            duration, distance = flight_duration(start, end)
+            # Departures between 06:00 and 23:55
+            takeoff_time = FIRST_DAY + timedelta(days=rng.randrange(SCHEDULE_DAYS),
+                                                 minutes=360 + 5 * rng.randrange(216))
+            capacity = rng.choice(CAPACITIES)
+            yield {"flight_number": flight_number, "start_destination": start[0], "end_destination": end[0],
+                   "takeoff_time": takeoff_time, "landing_time": takeoff_time + duration,
+                   "price": round((30 + distance * 0.12) * rng.uniform(0.6, 1.8), 2),
+                   "capacity": capacity, "seats_available": capacity - per_flight - (index < extra)}
+
+    def user(self, index, password_hash=None):
+        """Returns the column values of the user with the index"""
+
+        rng = random.Random(f"{self.seed}-user-{index}")
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        return {"id": self.user_ids[index], "first_name": first_name, "last_name": last_name,
+                "email": f"{first_name}.{last_name}{index}@{rng.choice(EMAIL_DOMAINS)}".lower(),
+                "verified": rng.random() < 0.9, "password": password_hash}
+
+    def user_rows(self, password_hashes):
+        for index in range(self.users):
+            yield self.user(index, password_hashes[index % PASSWORD_POOL_SIZE])
+
+    def booking_rows(self):
+        rng = random.Random(f"{self.seed}-bookings")
+        for index in range(self.bookings):
+            flight_number, user_id = self.booking_key(index)
+            yield {"booking_id": uuid.UUID(int=rng.getrandbits(128), version=4),
+                   "flight_number": flight_number, "user_id": user_id}
+
+
+def insert_rows(model, rows, batch_size=INSERT_BATCH_SIZE):
+    """Inserts the rows with one multi-row INSERT per batch, each batch committed on its own
+
+    Returns:
+        the number of rows inserted
+    """
+
+    rows = iter(rows)
+    inserted = 0
+    while batch := list(itertools.islice(rows, batch_size)):
+        db.session.execute(insert(model.__table__), batch)
+        db.session.commit()
+        inserted += len(batch)
+
+    return inserted
+
+
+def seed_database(flights, users, bookings, seed=1, bcrypt_rounds=12, reset=False, log=None):
+    """Fills the empty tables (or all of them after dropping and recreating them if reset is set) with
+    synthetic data. Must be called within an app context
+
+    The flight numbers are reserved from the flight number sequence, so flights created later get new numbers.
+    Only PASSWORD_POOL_SIZE passwords are hashed, the users share them.
+
+    Returns:
+        the SyntheticData that was inserted
+
+    Raises:
+        ValueError: If the counts are invalid or the tables are not empty and reset isn't set
+    """
+
+    validate_counts(flights, users, bookings)
+    log = log or (lambda message: None)
+    if reset:
+        # The replica gets the changes through replication
+        db.drop_all(bind_key=None)
+        db.create_all(bind_key=None)
+    elif any(db.session.execute(select(func.count()).select_from(model)).scalar()
+             for model in (Flights, Users, UserBookings)):
+        raise ValueError("The database isn't empty, seed it with reset to replace its data!")
+    # End the transaction of the check, the sequence is advanced on a connection of its own
+    db.session.commit()
+
+    first_flight_number = reserve_sequence_block(FLIGHT_NUMBER_SEQUENCE, flights)
+    data = SyntheticData(flights, users, bookings, seed, first_flight_number)
+    password_hashes = [generate_password_hash(data.password(index), bcrypt_rounds).decode("utf-8")
+                       for index in range(PASSWORD_POOL_SIZE)]
+
+    log(f"Inserted {insert_rows(Flights, data.flight_rows())} flights")
+    log(f"Inserted {insert_rows(Users, data.user_rows(password_hashes))} users")
+    log(f"Inserted {insert_rows(UserBookings, data.booking_rows())} bookings")
+    return data
+
+
+@click.command("seed")
+@click.option("--flights", default=10_000, show_default=True)
+@click.option("--users", default=10_000, show_default=True)
+@click.option("--bookings", default=10_000, show_default=True)
+@click.option("--seed", "seed", default=1, show_default=True, help="The same seed generates the same data.")
+@click.option("--bcrypt-rounds", type=int, help="Work factor of the password hashes, BCRYPT_ROUNDS by default.")
+@click.option("--reset", is_flag=True, help="Drop and recreate the tables first.")
+@with_appcontext
+def seed_command(flights, users, bookings, seed, bcrypt_rounds, reset):
+    """Fill the database with synthetic flights, users and bookings.
+
+    Passwords are password-0 to password-15, user i has password-(i % 16).
+    """
+
+    started = time.perf_counter()
+    try:
+        seed_database(flights, users, bookings, seed, bcrypt_rounds or current_app.config["BCRYPT_ROUNDS"], reset,
+                      log=click.echo)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+
+    click.echo(f"Seeded the database in {time.perf_counter() - started:.1f}s")
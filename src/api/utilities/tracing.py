@@ -0,0 +1,242 @@
+import json
+import os
+import queue
+import re
+import threading
+import time
+import urllib.request
+from contextvars import ContextVar
+from functools import wraps
+
+from flask import Flask, Response, current_app, g, request
+
+# W3C trace context header of incoming requests, their spans join the caller's trace
+TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+# Entries of the Server-Timing header, the slowest spans are kept
+SERVER_TIMING_LIMIT = 20
+# OTLP span kinds and status codes
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_ERROR = 2
+
+current_trace = ContextVar("current_trace", default=None)
+
+
+class Span:
+    __slots__ = ("name", "layer", "span_id", "parent_id", "start", "duration", "attributes", "error", "_started")
+
+    def __init__(self, name, layer, parent_id):
+        self.name = name
+        self.layer = layer
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start = time.time_ns()
+        self.duration = None
+        self.attributes = {}
+        self.error = None
+        self._started = time.perf_counter_ns()
+
+    def finish(self):
+        self.duration = time.perf_counter_ns() - self._started
+
+
+class Trace:
+    """The spans of one request, nested by the order in which they are started and finished"""
+
+    def __init__(self, trace_id=None, parent_id=None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.parent_id = parent_id
+        self.spans = []
+        self._open_spans = []
+
+    def start_span(self, name, layer):
+        parent_id = self._open_spans[-1].span_id if self._open_spans else self.parent_id
+        span = Span(name, layer, parent_id)
+        self._open_spans.append(span)
+        return span
+
+    def finish_span(self, span):
+        span.finish()
+        self._open_spans.remove(span)
+        self.spans.append(span)
+
+    def server_timing(self, limit=SERVER_TIMING_LIMIT):
+        """Returns the Server-Timing header with the total duration of every span name, slowest first"""
+
+        totals = {}
+        for span in self.spans:
+            layer, duration = totals.get(span.name, (span.layer, 0))
+            totals[span.name] = (layer, duration + span.duration)
+
+        slowest = sorted(totals.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+        return ", ".join(f'{name};desc="{layer}";dur={duration / 1e6:.2f}' for name, (layer, duration) in slowest)
+
+    def to_otlp(self, service_name):
+        """Returns the trace in the OTLP/JSON format of the OpenTelemetry collector's /v1/traces endpoint"""
+
+        spans = []
+        for span in self.spans:
+            attributes = [otlp_attribute("layer", span.layer)]
+            attributes.extend(otlp_attribute(key, value) for key, value in span.attributes.items())
+            otlp_span = {
+                "traceId": self.trace_id,
+                "spanId": span.span_id,
+                "parentSpanId": span.parent_id or "",
+                "name": span.name,
+                "kind": SPAN_KIND_SERVER if span.layer == "route" else SPAN_KIND_INTERNAL,
+                "startTimeUnixNano": str(span.start),
+                "endTimeUnixNano": str(span.start + span.duration),
+                "attributes": attributes
+            }
+            if span.error is not None:
+                otlp_span["status"] = {"code": STATUS_ERROR, "message": span.error}
+            spans.append(otlp_span)
+
+        return {"resourceSpans": [{
+            "resource": {"attributes": [otlp_attribute("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}]
+        }]}
+
+
+def otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def traced(layer, name=None):
+    """Decorator that records a span for every call of the function while a request is traced.
+    Outside of traced requests it only costs a context variable lookup"""
+
+    def decorator(function):
+        span_name = name or function.__qualname__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            trace = current_trace.get()
+            if trace is None:
+                return function(*args, **kwargs)
+
+            span = trace.start_span(span_name, layer)
+            try:
+                return function(*args, **kwargs)
+            except Exception as e:
+                span.error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                trace.finish_span(span)
+
+        return wrapper
+
+    return decorator
+
+
+class OTLPJsonExporter:
+    """Exports traces as OTLP/JSON from a background thread, so requests never wait for it.
+
+    The target is either the URL of a collector's OTLP/HTTP traces endpoint, e.g. http://localhost:4318/v1/traces,
+    or a file, to which every trace is appended as one line. When the queue is full, traces are dropped.
+    """
+
+    def __init__(self, target, service_name, max_queued=1000):
+        self.target = target
+        self.service_name = service_name
+        self.dropped = 0
+        self.failed = 0
+        self._queue = queue.Queue(maxsize=max_queued)
+        self._worker = threading.Thread(target=self._run, name="otlp-exporter", daemon=True)
+        self._worker.start()
+
+    def export(self, trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Waits until every queued trace has been exported"""
+
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                self._send(json.dumps(trace.to_otlp(self.service_name), separators=(",", ":")))
+            except Exception:
+                self.failed += 1
+            finally:
+                self._queue.task_done()
+
+    def _send(self, payload):
+        if self.target.startswith(("http://", "https://")):
+            export_request = urllib.request.Request(self.target, data=payload.encode("utf-8"), method="POST",
+                                                    headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(export_request, timeout=5):
+                pass
+        else:
+            with open(self.target, "a") as file:
+                file.write(payload + "\n")
+
+
+class Tracing:
+    """Traces every request: the route is the root span, and the functions decorated with @traced, the
+    services and the repositories, record nested spans.
+
+    The spans are summed up by name in the Server-Timing header of the response and, with TRACE_EXPORT set,
+    exported as OTLP/JSON. Nothing is registered unless TRACING is on, as the header exposes function names.
+    """
+
+    @classmethod
+    def init_app(cls, app: Flask) -> None:
+        if not app.config["TRACING"]:
+            return
+
+        if app.config["TRACE_EXPORT"]:
+            app.extensions["otlp_exporter"] = OTLPJsonExporter(app.config["TRACE_EXPORT"],
+                                                               app.config["TRACE_SERVICE_NAME"])
+        app.before_request(cls.start_trace)
+        app.after_request(cls.finish_trace)
+        app.teardown_request(cls.end_trace)
+
+    @staticmethod
+    def start_trace() -> None:
+        trace_id = parent_id = None
+        traceparent = TRACEPARENT.match(request.headers.get("traceparent", ""))
+        if traceparent:
+            trace_id, parent_id = traceparent.groups()
+
+        trace = Trace(trace_id, parent_id)
+        g.trace_token = current_trace.set(trace)
+        g.root_span = trace.start_span(request.endpoint or "unmatched", "route")
+
+    @staticmethod
+    def finish_trace(response: Response) -> Response:
+        root_span = g.pop("root_span", None)
+        if root_span is None:
+            return response
+
+        trace = current_trace.get()
+        root_span.attributes.update({"http.method": request.method, "http.target": request.path,
+                                     "http.status_code": response.status_code})
+        if response.status_code >= 500:
+            root_span.error = response.status
+        trace.finish_span(root_span)
+
+        response.headers["Server-Timing"] = trace.server_timing()
+        exporter = current_app.extensions.get("otlp_exporter")
+        if exporter is not None:
+            exporter.export(trace)
+        return response
+
+    @staticmethod
+    def end_trace(exception=None) -> None:
+        token = g.pop("trace_token", None)
+        if token is not None:
+            try:
+                current_trace.reset(token)
+            except ValueError:
+                # Ended from another context, e.g. at the end of a streamed response
+                current_trace.set(None)
@@ -1,8 +1,85 @@
 import re
+import uuid
+from datetime import datetime, time
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M"
+
+# MySQL error codes of the constraint violations the services map to responses
+MYSQL_DUPLICATE_ENTRY = 1062
+MYSQL_NO_REFERENCED_ROW = 1452
 
 
 def handle_integrity_error(e):
     pattern = r"\"(.*?)\""
     matches = re.findall(pattern, str(e))
     if matches:
-        return {"Error": f"{matches[0]}"}, 409
\ No newline at end of file
+        return {"Error": f"{matches[0]}"}, 409
+
+
+def is_duplicate_key_error(e):
+    """Checks if an IntegrityError was caused by a unique or primary key constraint"""
+
+    return _integrity_error_code(e) == MYSQL_DUPLICATE_ENTRY or "UNIQUE constraint failed" in str(e.orig)
+
+
+def is_foreign_key_error(e):
+    """Checks if an IntegrityError was caused by a foreign key pointing to a row that doesn't exist"""
+
+    return _integrity_error_code(e) == MYSQL_NO_REFERENCED_ROW or "FOREIGN KEY constraint failed" in str(e.orig)
+
+
+def _integrity_error_code(e):
+    args = getattr(e.orig, "args", ())
+    if args and isinstance(args[0], int):
+        return args[0]
+    return None
+
+
+def parse_datetime(value, name, end_of_day=False):
+    """Parses a "YYYY-MM-DD HH:MM" (or "YYYY-MM-DD") query parameter
+
+    A date without a time is the start of that day, or its end with end_of_day, which inclusive upper bounds
+    use so they don't leave out the flights of their last day.
+
+    Raises:
+        ValueError: If the value is not in one of the supported formats
+    """
+
+    try:
+        return datetime.strptime(value, DATETIME_FORMAT)
+    except ValueError:
+        pass
+
+    try:
+        day = datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"{name} must be in the format YYYY-MM-DD HH:MM!")
+    return datetime.combine(day, time.max) if end_of_day else day
+
+
+def is_uuid(value):
+    """Checks if the value is a UUID string, which the UUID columns can bind"""
+
+    try:
+        uuid.UUID(str(value))
+        return True
+    except ValueError:
+        return False
+
+
+def canonical_uuid(value):
+    """Returns the UUID in the lowercase, hyphenated form the ids are stored and returned in
+
+    Raises:
+        ValueError: If the value is not a UUID
+    """
+
+    return str(uuid.UUID(str(value)))
+
+
+def row_to_json(row):
+    """Converts a queried row (which has an _asdict method) to a dict, formatting datetime values
+    the same way as the API accepts them"""
+
+    return {key: value.strftime(DATETIME_FORMAT) if isinstance(value, datetime) else value
+            for key, value in row._asdict().items()}